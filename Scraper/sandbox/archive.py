@@ -0,0 +1,87 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from seen_index import normalize_url
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+ARCHIVE_DIR = 'page_archive'
+COMPRESSION_LEVEL = 10  # pages are written once and read rarely
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS pages (
+    url TEXT NOT NULL,
+    fetched_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    source_url TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    PRIMARY KEY (url, fetched_at)
+);
+CREATE INDEX IF NOT EXISTS idx_pages_kind ON pages(kind, url, fetched_at);
+'''
+
+
+class PageArchive:
+    """Every fetched page's HTML, zstd-compressed and stored by content hash.
+
+    Blobs live under blobs/<2 hex>/<sha256>.html.zst, so a page that did not
+    change between crawls is stored once. index.db records each fetch by
+    normalized URL and fetch time, with the page kind (the WaitPolicy kinds:
+    facebook_event, eventbrite_listing, ...) and the URL as it was fetched.
+    put() may be called from browser worker threads.
+    """
+
+    def __init__(self, root=ARCHIVE_DIR, level=COMPRESSION_LEVEL):
+        if zstandard is None:
+            raise RuntimeError("The page archive needs the zstandard package")
+        self.root = root
+        self.level = level
+        os.makedirs(os.path.join(root, 'blobs'), exist_ok=True)
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(os.path.join(root, 'index.db'), check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, 'blobs', digest[:2], digest + '.html.zst')
+
+    def put(self, url, kind, html, fetched_at=None):
+        # -> the page's digest
+        data = html.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._blob_path(digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, 'wb') as f:
+                f.write(zstandard.ZstdCompressor(level=self.level).compress(data))
+            os.replace(tmp_path, path)
+        with self._lock, self.connection:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages (url, fetched_at, kind, source_url, digest, size) VALUES (?, ?, ?, ?, ?, ?)',
+                (normalize_url(url), fetched_at or time.time(), kind, url, digest, len(data)),
+            )
+        return digest
+
+    def get(self, digest):
+        with open(self._blob_path(digest), 'rb') as f:
+            return zstandard.ZstdDecompressor().decompress(f.read()).decode('utf-8')
+
+    def latest(self, kinds=None):
+        # -> [(source_url, kind, fetched_at, digest)], the newest fetch of every URL
+        sql = 'SELECT source_url, kind, max(fetched_at), digest FROM pages'
+        params = []
+        if kinds:
+            sql += f" WHERE kind IN ({','.join('?' * len(kinds))})"
+            params = list(kinds)
+        with self._lock:
+            return self.connection.execute(sql + ' GROUP BY url ORDER BY url', params).fetchall()
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,216 @@
+import argparse
+import gzip
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+import numpy as np
+from dates import event_start, iso_date, read_dates
+from dedup import normalize_title, shingles
+from seen_index import normalize_url
+
+NUM_PERM = 64
+BANDS = 16
+PRIME = (1 << 31) - 1
+TIME_WINDOW = 6 * 3600  # seconds; sources disagree on start times by a few hours
+CELL_SIZE = 0.01  # degrees, ~1.1 km north-south
+SIMILARITY_THRESHOLD = 0.6  # estimated Jaccard over title shingles
+CANONICAL_FILE = 'canonical_ids.json'
+TIME_BITS = 33  # epoch seconds fit until 2242
+MAX_NEIGHBOURS = 4  # candidates per event in a band bucket; labels only need connectivity
+
+
+def load_events(path):
+    if path.endswith('.jsonl.gz'):
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    elif path.endswith('.jsonl'):
+        with open(path, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+    else:
+        with open(path) as f:
+            events = json.load(f)
+
+    # Rows from before StartDateTime existed: a Date without a year is read as
+    # of when the file was written, not as of today
+    written = datetime.fromtimestamp(os.path.getmtime(path))
+    for event in events:
+        if not event.get('StartDateTime') and event.get('Date'):
+            start, end, start_time, end_time = read_dates(event['Date'], written)
+            event['StartDateTime'], event['EndDateTime'] = iso_date(start, start_time), iso_date(end, end_time)
+    return events
+
+
+def start_timestamp(event):
+    start = event_start(event)
+    return start.timestamp() if start else np.nan
+
+
+def event_coordinates(event):
+    location = event.get('Location') if isinstance(event.get('Location'), dict) else event
+    latitude, longitude = location.get('Latitude'), location.get('Longitude')
+    if latitude is None or longitude is None:
+        return np.nan, np.nan
+    return float(latitude), float(longitude)
+
+
+class EventColumns:
+    """The fields dedup needs, one NumPy array per column.
+
+    Title shingles are kept CSR-style: the crc32 hashes of event i are
+    hashes[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, events):
+        self.size = len(events)
+        counts = np.empty(self.size, dtype=np.int64)
+        hashes = []
+        by_title = {}  # recurring events repeat their titles a lot
+        for index, event in enumerate(events):
+            title = event.get('Title')
+            if title not in by_title:
+                by_title[title] = [zlib.crc32(shingle.encode()) for shingle in shingles(normalize_title(title))]
+            counts[index] = len(by_title[title])
+            hashes.extend(by_title[title])
+        self.hashes = np.array(hashes, dtype=np.uint64)
+        self.offsets = np.zeros(self.size + 1, dtype=np.int64)
+        np.cumsum(counts, out=self.offsets[1:])
+        self.start = np.array([start_timestamp(event) for event in events], dtype=np.float64)
+        coordinates = np.array([event_coordinates(event) for event in events], dtype=np.float64).reshape(-1, 2)
+        self.latitude, self.longitude = coordinates[:, 0], coordinates[:, 1]
+
+
+def minhash_signatures(columns, num_perm=NUM_PERM, seed=1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, PRIME, num_perm, dtype=np.uint64)
+    b = rng.integers(0, PRIME, num_perm, dtype=np.uint64)
+    signatures = np.empty((columns.size, num_perm), dtype=np.uint64)
+    starts = columns.offsets[:-1]
+    for perm in range(num_perm):
+        # hash < 2**32 and a < 2**31, so a * hash + b stays inside uint64
+        values = (columns.hashes * a[perm] + b[perm]) % PRIME
+        signatures[:, perm] = np.minimum.reduceat(values, starts)
+    return signatures
+
+
+def _band_groups(signatures, bands):
+    # -> group id per (band, event); events share a group when a whole band matches
+    rows = signatures.shape[1] // bands
+    multipliers = np.random.default_rng(bands).integers(1, 1 << 63, rows, dtype=np.uint64) | np.uint64(1)
+    groups = np.empty((bands, signatures.shape[0]), dtype=np.int64)
+    offset = 0
+    for band in range(bands):
+        # Values are < 2**31, so mixing them into one uint64 key rarely collides
+        band_values = (signatures[:, band * rows:(band + 1) * rows] * multipliers).sum(axis=1)
+        _, inverse = np.unique(band_values, return_inverse=True)
+        groups[band] = inverse.ravel() + offset
+        offset += inverse.max() + 1
+    return groups
+
+
+def _window_pairs(keys, window, max_neighbours=MAX_NEIGHBOURS):
+    # keys sorted; (i, j > i) with keys[j] - keys[i] <= window, for at most the next max_neighbours j.
+    # A run of copies of one event becomes a chain instead of all its pairs.
+    ends = np.searchsorted(keys, keys + window, side='right')
+    counts = np.minimum(ends - np.arange(len(keys)) - 1, max_neighbours)
+    left = np.repeat(np.arange(len(keys)), counts)
+    ramp = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return left, left + 1 + ramp
+
+
+def candidate_pairs(columns, signatures, bands=BANDS, window=TIME_WINDOW):
+    # LSH band collisions, restricted to a start-time window within each band bucket
+    start = np.where(np.isnan(columns.start), 0, columns.start).astype(np.int64)
+    groups = _band_groups(signatures, bands)
+    events = np.tile(np.arange(columns.size), bands)
+    keys = (groups.ravel() << TIME_BITS) | np.tile(start, bands)
+    order = np.argsort(keys, kind='stable')
+    left, right = _window_pairs(keys[order], window)
+    left, right = events[order][left], events[order][right]
+    pairs = np.unique(np.minimum(left, right) * columns.size + np.maximum(left, right))
+    pairs = pairs[pairs // columns.size != pairs % columns.size]
+    return pairs // columns.size, pairs % columns.size
+
+
+def near_cells(columns, left, right, cell_size=CELL_SIZE):
+    # Grid join: pairs with coordinates on both sides must be in the same or a neighbouring cell
+    row = np.floor(columns.latitude / cell_size)
+    col = np.floor(columns.longitude / cell_size)
+    unknown = np.isnan(row[left]) | np.isnan(row[right])
+    with np.errstate(invalid='ignore'):
+        near = (np.abs(row[left] - row[right]) <= 1) & (np.abs(col[left] - col[right]) <= 1)
+    return unknown | near
+
+
+def canonical_labels(size, left, right):
+    # Connected components by min-label propagation with pointer jumping
+    labels = np.arange(size)
+    while True:
+        previous = labels.copy()
+        smallest = np.minimum(labels[left], labels[right])
+        np.minimum.at(labels, left, smallest)
+        np.minimum.at(labels, right, smallest)
+        labels = labels[labels]
+        if np.array_equal(labels, previous):
+            return labels
+
+
+def exact_duplicates(events):
+    # -> label per event, shared by copies with the same normalized URL or the same title and start.
+    # Corpora built from repeated runs hold each event many times; only one copy needs MinHash.
+    first = {}
+    left, right = [], []
+    for index, event in enumerate(events):
+        url = event.get('EventUrl')
+        start = event_start(event)
+        keys = [('url', normalize_url(url))] if url else []
+        if start is not None:
+            keys.append(('title', normalize_title(event.get('Title')), start.timestamp()))
+        for key in keys:
+            if key in first:
+                left.append(first[key])
+                right.append(index)
+            else:
+                first[key] = index
+    return canonical_labels(len(events), np.array(left, dtype=np.int64), np.array(right, dtype=np.int64))
+
+
+def batch_dedup(events, threshold=SIMILARITY_THRESHOLD, window=TIME_WINDOW):
+    exact = exact_duplicates(events)
+    unique = np.flatnonzero(exact == np.arange(len(events)))
+    columns = EventColumns([events[index] for index in unique])
+    signatures = minhash_signatures(columns)
+    left, right = candidate_pairs(columns, signatures, window=window)
+    keep = near_cells(columns, left, right)
+    left, right = left[keep], right[keep]
+    similarity = (signatures[left] == signatures[right]).mean(axis=1)
+    keep = similarity >= threshold
+    labels = unique[canonical_labels(columns.size, left[keep], right[keep])]
+    # Every copy takes its first copy's label; exact labels are the smallest index, so they are in unique
+    return labels[np.searchsorted(unique, exact)]
+
+
+def event_id(event, index):
+    url = event.get('EventUrl')
+    return normalize_url(url) if url else f"#{index}"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Deduplicate a historical event corpus and write a canonical-ID mapping")
+    parser.add_argument('paths', nargs='+', help=".json, .jsonl or .jsonl.gz event files")
+    parser.add_argument('--output', default=CANONICAL_FILE)
+    parser.add_argument('--threshold', type=float, default=SIMILARITY_THRESHOLD)
+    parser.add_argument('--window', type=float, default=TIME_WINDOW / 3600, help="start-time window in hours (default: %(default)s)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    events = [event for path in args.paths for event in load_events(path)]
+    labels = batch_dedup(events, args.threshold, int(args.window * 3600))
+    ids = [event_id(event, index) for index, event in enumerate(events)]
+    mapping = {ids[index]: ids[label] for index, label in enumerate(labels)}
+    with open(args.output, 'w') as f:
+        json.dump(mapping, f, indent=4)
+
+    canonical = len(set(labels.tolist()))
+    print(f"{len(events)} events -> {canonical} canonical in {time.perf_counter() - started:.2f}s -> {args.output}")
@@ -0,0 +1,144 @@
+import argparse
+import glob
+import json
+import os
+import re
+import time
+from dates import _normalize, normalize_dates
+from scraper import extract_start_end_time
+
+
+def legacy_extract_start_end_time(date_str):
+    # The regex cascade as it was, kept for comparison
+    if date_str is None:
+        return None, None
+
+    # If "-" is not present in the string, it means it is just a start time
+    if "-" not in date_str:
+        start_time_match = re.search(r'(\d{1,2}:\d{2}\s*(?:AM|PM)?)', date_str)
+        if start_time_match:
+            start_time = start_time_match.group(1)
+            return start_time.strip(), None
+        else:
+            return None, None
+
+    # For events that start and end on different days
+    day_match = re.search(r'(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))\s*-\s*(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))', date_str)
+    if day_match:
+        start_time = day_match.group(1)
+        end_time = day_match.group(2)
+        return start_time.strip(), end_time.strip()
+
+    # Converta os dias da semana para inglês
+    date_str = re.sub(r'\b(?:lun(?:di)?|mon(?:day)?)\b', 'Monday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:mar(?:di)?|tue(?:sday)?)\b', 'Tuesday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:mer(?:credi)?|wed(?:nesday)?)\b', 'Wednesday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:jeu(?:di)?|thu(?:rsday)?)\b', 'Thursday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:ven(?:dredi)?|fri(?:day)?)\b', 'Friday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:sam(?:edi)?|sat(?:urday)?)\b', 'Saturday', date_str, flags=re.IGNORECASE)
+    date_str = re.sub(r'\b(?:dim(?:anche)?|sun(?:day)?)\b', 'Sunday', date_str, flags=re.IGNORECASE)
+
+    # Pattern for start and end time in the same day
+    same_day_match = re.search(r'(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))\s*-\s*(\d{1,2}:\d{2} (?:AM|PM))', date_str)
+    if same_day_match:
+        start_time = same_day_match.group(1)
+        end_time = same_day_match.group(2)
+        return start_time.strip(), end_time.strip()
+
+    # AM/PM Format
+    am_pm_match = re.search(r'(\d{1,2}:\d{2}\s*(?:AM|PM))\s*-\s*(\d{1,2}:\d{2}\s*(?:AM|PM))', date_str)
+    if am_pm_match:
+        start_time, end_time = am_pm_match.groups()
+        return start_time.strip(), end_time.strip()
+
+    # 24hrs Format
+    hrs_24_match = re.search(r'(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})', date_str)
+    if hrs_24_match:
+        start_time, end_time = hrs_24_match.groups()
+        return start_time.strip(), end_time.strip()
+
+    # Handle times like "9pm" and "11pm"
+    pm_match = re.search(r'(\d{1,2})pm', date_str, flags=re.IGNORECASE)
+    if pm_match:
+        start_hour = int(pm_match.group(1))
+        if start_hour < 12:
+            start_hour += 12
+        start_time = f"{start_hour:02}:00"
+
+        # Assume the event ends after the start time
+        end_hour = start_hour + 2  # Adding 2 hours as a default duration
+        if end_hour >= 24:
+            end_hour -= 12
+        end_time = f"{end_hour:02}:00"
+
+        return start_time.strip(), end_time
+
+    # Handle times like "9am" and "11am"
+    am_match = re.search(r'(\d{1,2})am', date_str, flags=re.IGNORECASE)
+    if am_match:
+        start_hour = int(am_match.group(1))
+        if start_hour == 12:
+            start_hour = 0
+        start_time = f"{start_hour:02}:00"
+
+        # Assume the event ends after the start time
+        end_hour = start_hour + 2  # Adding 2 hours as a default duration
+        if end_hour >= 12:
+            end_hour -= 12
+        end_time = f"{end_hour:02}:00"
+
+        return start_time.strip(), end_time
+
+    return None, None
+
+
+def load_dates(paths):
+    dates = []
+    for path in paths:
+        with open(path) as f:
+            dates.extend(event.get('Date') for event in json.load(f) if event.get('Date'))
+    return dates
+
+
+def time_per_call(function, dates, repeat, before=None):
+    best = None
+    for _ in range(repeat):
+        if before:
+            before()
+        started = time.perf_counter()
+        results = [function(date) for date in dates]
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(dates), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare date extraction speed and coverage on the JSON fixtures")
+    parser.add_argument('paths', nargs='*', help="event JSON files (default: JSONs/*.json)")
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'JSONs', '*.json')))
+    dates = load_dates(paths)
+    if not dates:
+        parser.error("no Date fields found")
+
+    print(f"{len(dates)} dates, {len(set(dates))} distinct")
+    print(f"{'extractor':<24}{'us/date':>10}{'speedup':>10}{'start':>8}{'end':>8}")
+
+    baseline, results = time_per_call(legacy_extract_start_end_time, dates, args.repeat)
+    starts, ends = sum(1 for start, _ in results if start), sum(1 for _, end in results if end)
+    print(f"{'legacy regex cascade':<24}{baseline * 1e6:>10.2f}{1:>9.1f}x{starts:>8}{ends:>8}")
+
+    for name, function, before in [
+        ('engine, cold cache', normalize_dates, _normalize.cache_clear),
+        ('engine, warm cache', normalize_dates, None),
+        ('extract_start_end_time', extract_start_end_time, None),
+    ]:
+        per_call, results = time_per_call(function, dates, args.repeat, before)
+        starts, ends = sum(1 for start, _ in results if start), sum(1 for _, end in results if end)
+        print(f"{name:<24}{per_call * 1e6:>10.2f}{baseline / per_call:>9.1f}x{starts:>8}{ends:>8}")
+
+
+if __name__ == "__main__":
+    main()
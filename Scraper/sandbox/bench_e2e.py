@@ -0,0 +1,145 @@
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+from geopy.geocoders import Nominatim
+import scraper
+from geocache import GeocodeCache
+from geocoding import TokenBucket
+from metrics import metrics, percentile
+from mock_site import EVENT_COUNT, MockSite, synthetic_events
+
+RSS_POLL = 0.25
+GEOCODE_RATE = 50  # requests per second to the fake Nominatim; the real one allows 1
+
+
+def process_tree_rss(pid):
+    # -> resident bytes of pid and all its descendants (Chrome runs under chromedriver), from /proc
+    children = {}
+    rss = {}
+    for entry in os.listdir('/proc'):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f'/proc/{entry}/stat') as f:
+                fields = f.read().rsplit(')', 1)[1].split()
+            children.setdefault(int(fields[1]), []).append(int(entry))
+            rss[int(entry)] = int(fields[21]) * os.sysconf('SC_PAGE_SIZE')
+        except (OSError, IndexError, ValueError):
+            # The process exited while we were reading
+            continue
+    total = 0
+    stack = [pid]
+    while stack:
+        current = stack.pop()
+        total += rss.get(current, 0)
+        stack.extend(children.get(current, []))
+    return total
+
+
+class PeakRss:
+    """Samples the RSS of this process and its browsers every RSS_POLL seconds."""
+
+    def __init__(self, interval=RSS_POLL):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak = max(self.peak, process_tree_rss(os.getpid()))
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        if os.path.isdir('/proc'):
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        # Without /proc, at least this process's own peak
+        self.peak = max(self.peak, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024)
+
+
+def point_scraper_at(site, geocode_rate=GEOCODE_RATE):
+    # main()'s sources and geocoder, aimed at the mock site, with a cold cache and no gazetteer
+    templates = {'Facebook': site.base_url + '/events/explore/{slug}/', 'Eventbrite': site.base_url + '/d/{slug}/all-events/'}
+    for source in scraper.SOURCES:
+        source['url_template'] = templates[source['name']]
+    host, port = site.server.server_address[:2]
+    scraper.geocoder.geolocator = Nominatim(user_agent="event_scraper", domain=f"{host}:{port}", scheme='http')
+    scraper.geocoder.bucket = TokenBucket(geocode_rate, 1)
+    scraper.geocoder.local = None
+    scraper.geocode_cache = scraper.geocoder.cache = GeocodeCache(path=None)
+
+
+def page_latencies():
+    # -> {kind: [seconds]} per page: the load plus the waits for its fields
+    latencies = {}
+    for page in scraper.page_latency.pages:
+        latencies.setdefault(page['kind'], []).append(page['load'] + sum(seconds for _, seconds in page['waits'].values()))
+    return latencies
+
+
+def counter(name):
+    return sum(value for (series, _), value in metrics.counters.items() if series == name)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the scraper end to end against a local mock of Facebook, Eventbrite and Nominatim")
+    parser.add_argument('--events', type=int, default=EVENT_COUNT, help="events on each mock site (default: %(default)s)")
+    parser.add_argument('--latency', type=float, default=0.2, help="seconds per mock page, ±50%% (default: %(default)s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of event pages answered with a 500")
+    parser.add_argument('--geocode-rate', type=float, default=GEOCODE_RATE)
+    parser.add_argument('--output', default='bench_e2e.json', help="where to write the results (default: %(default)s)")
+    args, scraper_args = parser.parse_known_args()
+
+    site = MockSite(synthetic_events(args.events), args.latency, args.error_rate).start()
+    point_scraper_at(site, args.geocode_rate)
+    output = os.path.abspath(args.output)
+
+    # The scraper's own files (events, report, journal) go to a scratch directory
+    workdir = tempfile.mkdtemp(prefix='bench_e2e_')
+    os.chdir(workdir)
+    sys.argv = ['scraper.py', '--headless', *scraper_args]
+    print(f"Mock site at {site.base_url}, scraper running in {workdir} with {' '.join(sys.argv[1:])}")
+
+    with PeakRss() as rss:
+        started = time.perf_counter()
+        scraper.main()
+        elapsed = time.perf_counter() - started
+    site.stop()
+
+    events = counter('events_emitted') + counter('duplicates')
+    latencies = page_latencies()
+    all_latencies = sorted(seconds for values in latencies.values() for seconds in values)
+    results = {
+        'events': events,
+        'seconds': elapsed,
+        'events_per_second': events / elapsed,
+        'pages': len(all_latencies),
+        'page_p95': percentile(all_latencies, 95),
+        'page_p95_by_kind': {kind: percentile(sorted(values), 95) for kind, values in latencies.items()},
+        'peak_rss_mb': rss.peak / 2 ** 20,
+        'scraper_args': sys.argv[1:],
+        'mock': {'events': args.events, 'latency': args.latency, 'error_rate': args.error_rate},
+    }
+    with open(output, 'w') as f:
+        json.dump(results, f, indent=4)
+
+    print(f"{events} events in {elapsed:.1f}s: {results['events_per_second']:.2f} events/s")
+    print(f"{results['pages']} pages, p95 latency {results['page_p95'] or 0:.2f}s")
+    for kind, p95 in results['page_p95_by_kind'].items():
+        print(f"    {kind}: p95 {p95:.2f}s")
+    print(f"Peak RSS {results['peak_rss_mb']:.0f} MB (scraper and browsers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import glob
+import os
+import time
+from bs4 import BeautifulSoup
+from parsing import available_backends, compile_plan
+from scraper import SOURCES
+
+
+def legacy_extract(markup, selectors):
+    # The listing loop as it was: full html.parser tree, one find() per field
+    webpage = BeautifulSoup(markup, 'html.parser')
+    cards = []
+    for event in webpage.find_all(selectors['event']['tag'], class_=selectors['event'].get('class')):
+        event_link = event.find('a', href=True)
+        if not event_link:
+            continue
+        event_info = {}
+        for key, selector in selectors.items():
+            if key != 'event':
+                element = event.find(selector['tag'], class_=selector.get('class'))
+                if key == 'ImageURL':
+                    event_info[key] = element['src'] if element and 'src' in element.attrs else None
+                else:
+                    event_info[key] = element.text.strip() if element else None
+        cards.append((event_info, event_link['href']))
+    return cards
+
+
+def time_per_page(extract, pages, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        cards = sum(len(extract(page)) for page in pages)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(pages), cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare listing-page extraction speed on saved pages")
+    parser.add_argument('pages', help="directory of saved listing pages (*.html) or a glob")
+    parser.add_argument('--source', default='Eventbrite', choices=[source['name'] for source in SOURCES])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    pattern = os.path.join(args.pages, '*.html') if os.path.isdir(args.pages) else args.pages
+    paths = sorted(glob.glob(pattern))
+    if not paths:
+        parser.error(f"no pages match {pattern}")
+
+    pages = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            pages.append(f.read())
+
+    selectors = next(source['selectors'] for source in SOURCES if source['name'] == args.source)
+
+    baseline, cards = time_per_page(lambda page: legacy_extract(page, selectors), pages, args.repeat)
+    print(f"{len(pages)} pages, {cards} cards")
+    print(f"{'extractor':<24}{'ms/page':>10}{'speedup':>10}")
+    print(f"{'legacy html.parser':<24}{baseline * 1000:>10.2f}{1:>9.1f}x")
+
+    for backend in available_backends():
+        plan = compile_plan(selectors, backend)
+        per_page, plan_cards = time_per_page(plan.extract, pages, args.repeat)
+        note = '' if plan_cards == cards else f"  ({plan_cards} cards!)"
+        print(f"{'plan ' + backend:<24}{per_page * 1000:>10.2f}{baseline / per_page:>9.1f}x{note}")
+
+
+if __name__ == "__main__":
+    main()
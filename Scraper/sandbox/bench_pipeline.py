@@ -0,0 +1,264 @@
+import argparse
+import json
+import os
+import sys
+import time
+from html import escape
+from bs4 import BeautifulSoup
+from selenium.common.exceptions import NoSuchElementException
+import scraper
+from browser import PAGE_STATE_JS
+from dates import _normalize
+from dedup import DedupEngine
+from http_fetch import page_url
+from parsing import compile_plan
+from scraper import SOURCES, extract_start_end_time, scrape_eventbrite_events, scrape_facebook_events
+from seen_index import normalize_url
+
+CORPUS = ['JSONs/events.json', 'JSONs/eventbrite.json', 'JSONs/facebook.json']
+BASELINE_FILE = 'bench_baseline.json'
+THRESHOLD = 0.25  # fail when a stage is this much slower than its baseline
+EVENTBRITE_PAGE_SIZE = 10
+MONTREAL = (45.5019, -73.5674)
+
+FACEBOOK_CARD = '<div class="{card}"><a href="{url}">{title}</a></div>'
+FACEBOOK_EVENT = '''<html><body>
+<span class="x1lliihq x6ikm8r x10wlt62 x1n2onr6">{title}</span>
+<div class="x1e56ztr x1xmf6yo">{date}</div>
+<div class="xdj266r x11i5rnm xat24cr x1mh8g0r x1vvkbs">{description}</div>
+<span class="xt0psk2">{location}</span>
+</body></html>'''
+EVENTBRITE_CARD = '''<div class="{card}"><a href="{url}">
+<h2 class="event-card__title">{title}</h2><p class="event-card__date">{date}</p>
+<p class="location-info__address-text">{location}</p><p class="event-card__price">{price}</p>
+</a></div>'''
+EVENTBRITE_EVENT = '''<html><body>
+<h1 class="event-title css-0">{title}</h1>
+<p class="summary">{description}</p>
+<span class="date-info__full-datetime">{date}</span>
+<p class="location-info__address-text">{location}</p>
+</body></html>'''
+PAGINATION = '<li data-spec="pagination-parent">{page} of {page_count}</li>'
+
+
+def load_corpus(paths=CORPUS):
+    events = []
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            events.extend(json.load(f))
+    return events
+
+
+def location_text(event):
+    location = event.get('Location')
+    return location.get('Location') if isinstance(location, dict) else location
+
+
+def _fields(event):
+    return {key: escape(str(event.get(key) or '')) for key in ('Title', 'Date', 'Description', 'Price')} | {'Location': escape(location_text(event) or '')}
+
+
+def synthesize_fixtures(events):
+    # Listing and detail pages built from the corpus with the markup the parsers
+    # read; recorded pages in the same layout can be loaded with load_fixtures()
+    pages = {}
+    listings = {}
+    sources = {source['name']: source for source in SOURCES}
+
+    facebook = [event for event in events if 'facebook.com' in (event.get('EventUrl') or '')]
+    card_class = sources['Facebook']['selectors']['event']['class']
+    cards = []
+    for event in facebook:
+        fields = _fields(event)
+        cards.append(FACEBOOK_CARD.format(card=card_class, url=escape(event['EventUrl']), title=fields['Title']))
+        pages[normalize_url(event['EventUrl'])] = FACEBOOK_EVENT.format(title=fields['Title'], date=fields['Date'], description=fields['Description'], location=fields['Location'])
+    pages[normalize_url(sources['Facebook']['url'])] = '<html><body>' + ''.join(cards) + '</body></html>'
+    listings['Facebook'] = [sources['Facebook']['url']]
+
+    eventbrite = [event for event in events if 'eventbrite.' in (event.get('EventUrl') or '')]
+    card_class = sources['Eventbrite']['selectors']['event']['class']
+    listing_url = sources['Eventbrite']['url']
+    page_count = max(1, -(-len(eventbrite) // EVENTBRITE_PAGE_SIZE))
+    listings['Eventbrite'] = [listing_url if page == 1 else page_url(listing_url, page) for page in range(1, page_count + 1)]
+    for page, url in enumerate(listings['Eventbrite']):
+        cards = []
+        for event in eventbrite[page * EVENTBRITE_PAGE_SIZE:(page + 1) * EVENTBRITE_PAGE_SIZE]:
+            fields = _fields(event)
+            cards.append(EVENTBRITE_CARD.format(card=card_class, url=escape(event['EventUrl']), title=fields['Title'], date=fields['Date'], location=fields['Location'], price=fields['Price']))
+            pages[normalize_url(event['EventUrl'])] = EVENTBRITE_EVENT.format(title=fields['Title'], description=fields['Description'], date=fields['Date'], location=fields['Location'])
+        cards.append(PAGINATION.format(page=page + 1, page_count=page_count))
+        pages[normalize_url(url)] = '<html><body>' + ''.join(cards) + '</body></html>'
+
+    return {'pages': pages, 'listings': listings}
+
+
+def load_fixtures(directory):
+    # manifest.json: {"pages": {url: file}, "listings": {source: [url, ...]}}
+    with open(os.path.join(directory, 'manifest.json'), encoding='utf-8') as f:
+        manifest = json.load(f)
+    pages = {}
+    for url, filename in manifest['pages'].items():
+        with open(os.path.join(directory, filename), encoding='utf-8') as f:
+            pages[normalize_url(url)] = f.read()
+    return {'pages': pages, 'listings': manifest['listings']}
+
+
+class FixtureDriver:
+    """Stands in for a Chrome driver by serving recorded pages by URL.
+
+    Covers what the scrape functions and WaitPolicy use: get, page_source,
+    CSS find_element and the scroll state script. Every card is on the page
+    from the start, so scrolling stops at once.
+    """
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.current_url = None
+        self.page_source = ''
+        self._soup = None
+
+    def get(self, url):
+        self.current_url = url
+        self.page_source = self.pages.get(normalize_url(url), '<html><body></body></html>')
+        self._soup = None
+
+    @property
+    def soup(self):
+        if self._soup is None:
+            self._soup = BeautifulSoup(self.page_source, 'lxml')
+        return self._soup
+
+    def implicitly_wait(self, seconds):
+        pass
+
+    def find_element(self, by, selector):
+        element = self.soup.select_one(selector)
+        if element is None:
+            raise NoSuchElementException(selector)
+        return element
+
+    def execute_script(self, script, *args):
+        if script == PAGE_STATE_JS:
+            return len(self.page_source), len(self.soup.select(args[0]))
+        return None
+
+
+class FixtureGeocoder:
+    # Offline answers for GeocodingService.local: the corpus's own coordinates, else downtown Montreal
+    def __init__(self, events):
+        self.coordinates = {}
+        for event in events:
+            location = event.get('Location') if isinstance(event.get('Location'), dict) else event
+            if location.get('Latitude') not in (None, 'None'):
+                self.coordinates[location_text(event)] = (float(location['Latitude']), float(location['Longitude']))
+
+    def geocode(self, location):
+        return self.coordinates.get(location, MONTREAL)
+
+    def reverse(self, latitude, longitude):
+        return {'display_name': 'Montreal, Quebec, Canada', 'address': {'city': 'Montreal', 'country_code': 'ca'}}
+
+
+def best_time(run, repeat):
+    # -> (best seconds, items produced by the last run)
+    best = None
+    for _ in range(repeat):
+        _normalize.cache_clear()
+        started = time.perf_counter()
+        items = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, items
+
+
+def run_stages(fixtures, events, repeat):
+    # -> {stage: {'items', 'seconds', 'per_second'}}
+    selectors = {source['name']: source['selectors'] for source in SOURCES}
+    listings = fixtures['listings']
+    driver = FixtureDriver(fixtures['pages'])
+    dates = [event.get('Date') for event in events if event.get('Date')]
+
+    def facebook():
+        url = listings['Facebook'][0]
+        driver.get(url)
+        cards = len(driver.soup.select(compile_plan(selectors['Facebook']).card_css))
+        return len(scrape_facebook_events(driver, url, selectors['Facebook'], target_count=cards) or [])
+
+    def eventbrite():
+        return len(scrape_eventbrite_events(driver, listings['Eventbrite'][0], selectors['Eventbrite']))
+
+    def normalize():
+        for date_str in dates:
+            extract_start_end_time(date_str)
+        return len(dates)
+
+    def dedup():
+        engine = DedupEngine()
+        for event in events:
+            engine.add(event)
+        return len(events)
+
+    stages = [('normalize_dates', normalize), ('dedup', dedup)]
+    if listings.get('Facebook'):
+        stages.insert(0, ('facebook_scrape', facebook))
+    if listings.get('Eventbrite'):
+        stages.insert(len(stages) - 2, ('eventbrite_scrape', eventbrite))
+
+    results = {}
+    for name, run in stages:
+        seconds, items = best_time(run, repeat)
+        results[name] = {'items': items, 'seconds': seconds, 'per_second': items / seconds if seconds else None}
+    return results
+
+
+def regressions(results, baseline, threshold=THRESHOLD):
+    # -> [(stage, baseline per second, current per second)] for stages slower than allowed
+    slower = []
+    for name, stage in results.items():
+        expected = baseline.get(name, {}).get('per_second')
+        if expected and stage['per_second'] < expected * (1 - threshold):
+            slower.append((name, expected, stage['per_second']))
+    return slower
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the scrape, date and dedup stages offline against recorded pages")
+    parser.add_argument('--fixtures', help="directory with manifest.json and recorded pages (default: pages built from the JSONs corpus)")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--baseline', default=BASELINE_FILE, help="throughput to compare against (default: %(default)s)")
+    parser.add_argument('--threshold', type=float, default=THRESHOLD, help="allowed slowdown before failing, as a fraction (default: %(default)s)")
+    parser.add_argument('--save-baseline', action='store_true', help="write this run's throughput as the new baseline")
+    args = parser.parse_args()
+
+    events = load_corpus()
+    fixtures = load_fixtures(args.fixtures) if args.fixtures else synthesize_fixtures(events)
+
+    # Nothing may leave the machine: no geocoder requests, no cache writes
+    scraper.geocoder.local = FixtureGeocoder(events)
+    scraper.geocode_cache.path = None
+
+    results = run_stages(fixtures, events, args.repeat)
+    print(f"{'stage':<20}{'items':>8}{'ms':>10}{'items/s':>12}")
+    for name, stage in results.items():
+        print(f"{name:<20}{stage['items']:>8}{stage['seconds'] * 1000:>10.1f}{stage['per_second']:>12.0f}")
+
+    if args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=4)
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    slower = regressions(results, baseline, args.threshold)
+    for name, expected, actual in slower:
+        print(f"REGRESSION {name}: {actual:.0f}/s against {expected:.0f}/s baseline")
+    if slower:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
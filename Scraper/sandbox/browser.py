@@ -0,0 +1,280 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.events import AbstractEventListener, EventFiringWebDriver
+
+MAX_RESTARTS = 2
+TAB_REUSE_LIMIT = 50
+SCROLL_POLL = 0.2
+SCROLL_STALL = 3.0  # seconds without growth before a feed counts as exhausted
+
+PAGE_STATE_JS = "return [document.body.scrollHeight, document.querySelectorAll(arguments[0]).length];"
+
+# Only the DOM and src attributes are scraped, never the rendered pixels
+BLOCKED_URLS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+    '*.woff', '*.woff2', '*.ttf', '*.otf',
+    '*.mp4', '*.webm', '*.mp3', '*.m4a',
+    '*.css',
+]
+
+
+def fast_chrome_options(headless=True):
+    chrome_options = Options()
+    if headless:
+        chrome_options.add_argument("--headless=new")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--blink-settings=imagesEnabled=false")
+    chrome_options.add_argument("--autoplay-policy=user-gesture-required")
+    # Return from driver.get() at DOMContentLoaded instead of waiting for every subresource
+    chrome_options.page_load_strategy = 'eager'
+    chrome_options.add_experimental_option('prefs', {
+        'profile.managed_default_content_settings.images': 2,
+        'profile.managed_default_content_settings.fonts': 2,
+        'profile.managed_default_content_settings.media_stream': 2,
+        'profile.default_content_setting_values.notifications': 2,
+    })
+    return chrome_options
+
+
+def block_resources(driver, urls=BLOCKED_URLS):
+    # Prefs do not cover stylesheets, fonts or media, so block those at the network layer
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': urls})
+
+
+def create_driver(headless=False, fast=False, tab_policy=None):
+    # tab_policy: a TabPolicy for this one browser, applied before each navigation
+    if fast:
+        driver = webdriver.Chrome(options=fast_chrome_options(headless))
+        block_resources(driver)
+    else:
+        chrome_options = Options()
+        if headless:
+            chrome_options.add_argument("--headless=new")
+        chrome_options.add_argument("--disable-gpu")
+        chrome_options.add_argument("--disable-dev-shm-usage")
+        driver = webdriver.Chrome(options=chrome_options)
+    # Waiting is done explicitly, per field (see waits.WaitPolicy)
+    driver.implicitly_wait(0)
+    if tab_policy is not None:
+        driver = EventFiringWebDriver(driver, TabListener(tab_policy))
+    return driver
+
+
+def create_headless_driver():
+    return create_driver(headless=True, fast=True)
+
+
+def close_extra_tabs(driver):
+    # Some detail links open with target=_blank; scraping always happens in the first tab
+    handles = driver.window_handles
+    if len(handles) > 1:
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+
+def recycle_tab(driver):
+    # A long-lived tab keeps growing (detached DOMs, caches); swap it for a fresh one
+    old_handle = driver.current_window_handle
+    driver.switch_to.new_window('tab')
+    new_handle = driver.current_window_handle
+    driver.switch_to.window(old_handle)
+    driver.close()
+    driver.switch_to.window(new_handle)
+
+
+class TabPolicy:
+    """Reuse one tab per browser and replace it every reuse_limit pages.
+
+    BrowserPool calls after_page() once a worker is done with an item; a
+    browser from create_driver(tab_policy=...) calls it before every get().
+    """
+
+    def __init__(self, reuse_limit=TAB_REUSE_LIMIT):
+        self.reuse_limit = reuse_limit
+        self.pages = {}
+
+    def after_page(self, driver):
+        close_extra_tabs(driver)
+        count = self.pages.get(id(driver), 0) + 1
+        if self.reuse_limit and count >= self.reuse_limit:
+            recycle_tab(driver)
+            count = 0
+        self.pages[id(driver)] = count
+
+
+class TabListener(AbstractEventListener):
+    # The page a driver is on is done with as soon as it navigates somewhere else
+    def __init__(self, tab_policy):
+        self.tab_policy = tab_policy
+        self.navigated = False
+
+    def before_navigate_to(self, url, driver):
+        if self.navigated:
+            self.tab_policy.after_page(driver)
+        self.navigated = True
+
+
+def scroll_until_loaded(driver, card_css, max_scroll=30, target_count=None, poll=SCROLL_POLL, stall_timeout=SCROLL_STALL):
+    """Scroll an infinite feed for as long as it keeps loading cards.
+
+    After each scroll the page height and the number of card_css matches are
+    polled every `poll` seconds, and the next scroll follows as soon as
+    either grows. Stops after max_scroll scrolls, once target_count cards
+    are on the page, or when nothing grows for stall_timeout seconds.
+    Returns how many new cards each scroll produced.
+    """
+    height, count = driver.execute_script(PAGE_STATE_JS, card_css)
+    produced = []
+    for _ in range(max_scroll):
+        if target_count and count >= target_count:
+            break
+        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+        deadline = time.monotonic() + stall_timeout
+        while True:
+            time.sleep(poll)
+            new_height, new_count = driver.execute_script(PAGE_STATE_JS, card_css)
+            grew = new_height > height or new_count > count
+            if grew or time.monotonic() >= deadline:
+                break
+        produced.append(new_count - count)
+        height, count = new_height, new_count
+        if not grew:
+            break
+    return produced
+
+
+class BrowserPool:
+    """N worker threads, each driving its own Chrome.
+
+    imap(fn, items) calls fn(driver, item) on the workers and yields the
+    results in input order; submit(fn, item) does the same for one item and
+    returns a Future. A worker whose browser dies is restarted and the
+    item retried up to max_restarts times; after that the item yields None.
+    Task and result queues are bounded so a long listing never piles up
+    parsed pages in memory.
+    """
+
+    def __init__(self, size, driver_factory=create_headless_driver, max_restarts=MAX_RESTARTS, tab_policy=None):
+        self.size = size
+        self.driver_factory = driver_factory
+        self.max_restarts = max_restarts
+        self.tab_policy = tab_policy if tab_policy is not None else TabPolicy()
+        self.restarts = 0
+        self._drivers = []
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._executor = None
+
+    def _acquire_driver(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        driver = self.driver_factory()
+        with self._lock:
+            self._drivers.append(driver)
+        return driver
+
+    def _release_driver(self, driver):
+        with self._lock:
+            self._idle.append(driver)
+
+    def _quit_driver(self, driver):
+        with self._lock:
+            if driver in self._drivers:
+                self._drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            # A crashed browser often can't even be quit cleanly
+            pass
+
+    def _run(self, fn, item, driver):
+        # -> (driver to keep using, result); restarts the browser on WebDriver errors
+        result = None
+        for attempt in range(self.max_restarts + 1):
+            try:
+                if driver is None:
+                    driver = self._acquire_driver()
+                result = fn(driver, item)
+                self.tab_policy.after_page(driver)
+                break
+            except WebDriverException as e:
+                print(f"Browser worker failed on {item!r}: {e.__class__.__name__}, restarting")
+                if driver is not None:
+                    self._quit_driver(driver)
+                driver = None
+                self.restarts += 1
+            except Exception as e:
+                print(f"Error while processing {item!r}: {e}")
+                break
+        return driver, result
+
+    def _worker(self, fn, tasks, results):
+        driver = None
+        while True:
+            task = tasks.get()
+            if task is None:
+                break
+            index, item = task
+            driver, result = self._run(fn, item, driver)
+            results.put((index, result))
+        if driver is not None:
+            self._release_driver(driver)
+
+    def _call(self, fn, item):
+        self._local.driver, result = self._run(fn, item, getattr(self._local, 'driver', None))
+        return result
+
+    def submit(self, fn, item):
+        # fn(driver, item) on one of size long-lived browser threads; -> concurrent.futures.Future
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.size)
+        return self._executor.submit(self._call, fn, item)
+
+    def imap(self, fn, items):
+        items = list(items)
+        tasks = queue.Queue(maxsize=self.size * 2)
+        results = queue.Queue(maxsize=self.size * 2)
+
+        def feed():
+            for task in enumerate(items):
+                tasks.put(task)
+            for _ in range(self.size):
+                tasks.put(None)
+
+        threads = [threading.Thread(target=feed, daemon=True)]
+        threads += [threading.Thread(target=self._worker, args=(fn, tasks, results), daemon=True) for _ in range(self.size)]
+        for thread in threads:
+            thread.start()
+
+        buffered = {}
+        next_index = 0
+        while next_index < len(items):
+            while next_index not in buffered:
+                index, result = results.get()
+                buffered[index] = result
+            yield buffered.pop(next_index)
+            next_index += 1
+
+        for thread in threads:
+            thread.join()
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for driver in list(self._drivers):
+            self._quit_driver(driver)
+        self._idle = []
@@ -0,0 +1,222 @@
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+from selenium.common.exceptions import WebDriverException
+import scraper
+from batch_dedup import load_events
+from browser import create_headless_driver
+from dedup import DedupEngine, cluster_summary
+from geocoding import SharedRateLimiter
+from metrics import metrics
+from scraper import city_gazetteer, city_sources, iter_eventbrite_events, iter_facebook_events, load_cities
+from seen_index import normalize_url
+from sinks import FORMATS, JsonlSink, open_sinks
+from workqueue import QUEUE_FILE, open_broker
+
+RESULTS_DIR = 'crawl_results'
+PAGES_PER_UNIT = 5
+MAX_PAGES = 40
+IDLE_POLL = 5  # seconds between lease attempts while other workers still hold units
+
+
+def shard(cities, source_names=None, max_pages=MAX_PAGES, pages_per_unit=PAGES_PER_UNIT):
+    # -> work units: the Facebook feed is one scroll per city, Eventbrite is split into page ranges
+    known_cities = load_cities()
+    units = []
+    for city in cities:
+        for source in city_sources(city, known_cities):
+            if source_names and source['name'] not in source_names:
+                continue
+            if source['name'] == 'Eventbrite':
+                for first_page in range(1, max_pages + 1, pages_per_unit):
+                    units.append({'source': source['name'], 'city': city, 'first_page': first_page, 'last_page': min(first_page + pages_per_unit - 1, max_pages)})
+            else:
+                units.append({'source': source['name'], 'city': city, 'first_page': None, 'last_page': None})
+    return units
+
+
+def run_unit(unit, driver, results_dir=RESULTS_DIR, max_scroll=30):
+    # Scrape one unit into results_dir/unit-<id>.jsonl; -> that path
+    source = next(source for source in city_sources(unit['city']) if source['name'] == unit['source'])
+    scraper.geocoder.local = city_gazetteer(unit['city'])
+    if unit['source'] == 'Facebook':
+        events = iter_facebook_events(driver, source['url'], source['selectors'], max_scroll, city=unit['city'])
+    else:
+        events = iter_eventbrite_events(driver, source['url'], source['selectors'], max_pages=unit['last_page'], first_page=unit['first_page'])
+
+    path = os.path.join(results_dir, f"unit-{unit['id']:05d}.jsonl")
+    # JsonlSink only renames the file into place once it is complete
+    sink = JsonlSink(path)
+    for event in events:
+        sink.write(event)
+        metrics.inc('events_scraped', source=unit['source'], city=unit['city'])
+    sink.close()
+    return path
+
+
+class Heartbeat:
+    """Renews a unit's lease every interval seconds until stopped.
+
+    Uses a broker of its own, since a SQLite connection stays on its thread.
+    `lost` is set when the lease turned out to belong to someone else.
+    """
+
+    def __init__(self, broker_url, unit_id, worker, interval):
+        self.broker_url = broker_url
+        self.unit_id = unit_id
+        self.worker = worker
+        self.interval = interval
+        self.lost = False
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        broker = open_broker(self.broker_url)
+        while not self._stop.wait(self.interval):
+            if not broker.heartbeat(self.unit_id, self.worker):
+                self.lost = True
+                break
+        broker.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stop.set()
+        self._thread.join()
+
+
+def work(broker_url=QUEUE_FILE, results_dir=RESULTS_DIR, driver_factory=create_headless_driver, max_scroll=30, rate_limiter=None):
+    # One worker process: lease, scrape and report units until none are left.
+    # rate_limiter is shared by all the workers, to keep their Nominatim traffic within its usage policy.
+    worker = f"{socket.gethostname()}-{os.getpid()}"
+    if rate_limiter is not None:
+        scraper.geocoder.bucket = rate_limiter
+    broker = open_broker(broker_url)
+    os.makedirs(results_dir, exist_ok=True)
+    driver = None
+    done = 0
+    while True:
+        unit = broker.lease(worker)
+        if unit is None:
+            if broker.counts().get('leased'):
+                # Another worker may still die and leave its unit to be retried
+                time.sleep(IDLE_POLL)
+                continue
+            break
+
+        print(f"[{worker}] {unit['source']} {unit['city']} pages {unit['first_page']}-{unit['last_page']} (attempt {unit['attempts']})")
+        try:
+            if driver is None:
+                driver = driver_factory()
+            with Heartbeat(broker_url, unit['id'], worker, broker.lease_seconds / 3) as heartbeat:
+                with metrics.timer('unit', source=unit['source']):
+                    path = run_unit(unit, driver, results_dir, max_scroll)
+            if heartbeat.lost or not broker.complete(unit['id'], worker, path):
+                print(f"[{worker}] lost the lease on unit {unit['id']}; its result is left to the new holder")
+            else:
+                done += 1
+        except Exception as e:
+            print(f"[{worker}] unit {unit['id']} failed: {e}")
+            metrics.inc('unit_failures', source=unit['source'])
+            broker.fail(unit['id'], worker, f"{e.__class__.__name__}: {e}")
+            if isinstance(e, WebDriverException) and driver is not None:
+                try:
+                    driver.quit()
+                except Exception:
+                    pass
+                driver = None
+
+    if driver is not None:
+        driver.quit()
+    scraper.geocoder.close()
+    broker.close()
+    metrics.write_json(os.path.join(results_dir, f"report-{worker}.json"))
+    print(f"[{worker}] finished {done} units")
+
+
+def merge(broker_url=QUEUE_FILE, formats=('json',)):
+    # Dedup every finished unit's events into unique_events / duplicate_events, as main() does
+    broker = open_broker(broker_url)
+    unique_sink = open_sinks(formats, 'unique_events')
+    duplicate_sink = open_sinks(formats, 'duplicate_events')
+    dedup = DedupEngine()
+    seen_urls = set()
+    unique = duplicates = 0
+    for path in broker.results():
+        for event in load_events(path):
+            # A unit retried after a lost lease can be in two files
+            url = normalize_url(event.get('EventUrl'))
+            if url in seen_urls:
+                continue
+            seen_urls.add(url)
+            if dedup.add(event) is None:
+                unique_sink.write(event)
+                unique += 1
+            else:
+                duplicate_sink.write(event)
+                duplicates += 1
+    unique_sink.close()
+    duplicate_sink.close()
+    clusters_sink = open_sinks(['json'], 'duplicate_clusters')
+    for cluster in dedup.clusters():
+        clusters_sink.write(cluster_summary(cluster))
+    clusters_sink.close()
+    failures = broker.failures()
+    broker.close()
+    print(f"Merged {unique} unique and {duplicates} duplicate events")
+    for unit in failures:
+        print(f"Failed: {unit['source']} {unit['city']} pages {unit['first_page']}-{unit['last_page']}: {unit['error']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl several cities in parallel worker processes through a shared work queue")
+    parser.add_argument('--queue', default=QUEUE_FILE, help="work queue, a SQLite path or broker URL (default: %(default)s)")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = commands.add_parser('enqueue', help="split the crawl of some cities into work units")
+    enqueue_parser.add_argument('cities', nargs='+')
+    enqueue_parser.add_argument('--sources', type=lambda value: value.split(','), help="comma-separated source names (default: all)")
+    enqueue_parser.add_argument('--max-pages', type=int, default=MAX_PAGES)
+    enqueue_parser.add_argument('--pages-per-unit', type=int, default=PAGES_PER_UNIT)
+
+    work_parser = commands.add_parser('work', help="run worker processes until the queue is drained")
+    work_parser.add_argument('--processes', type=int, default=os.cpu_count())
+    work_parser.add_argument('--results', default=RESULTS_DIR)
+
+    merge_parser = commands.add_parser('merge', help="deduplicate the finished units into one output")
+    merge_parser.add_argument('--output', type=lambda value: value.split(','), default=['json'], help=f"comma-separated output formats out of {', '.join(FORMATS)} (default: json)")
+
+    commands.add_parser('status', help="count units per state")
+    args = parser.parse_args()
+
+    if args.command == 'enqueue':
+        known_cities = load_cities()
+        unknown = [city for city in args.cities if city not in known_cities]
+        if unknown:
+            parser.error(f"unknown cities {', '.join(unknown)}; add their slugs to {scraper.CITIES_FILE}")
+        broker = open_broker(args.queue)
+        units = shard(args.cities, args.sources, args.max_pages, args.pages_per_unit)
+        print(f"Queued {broker.add(units)} new units out of {len(units)}")
+        broker.close()
+    elif args.command == 'work':
+        rate_limiter = SharedRateLimiter()
+        processes = [multiprocessing.Process(target=work, args=(args.queue, args.results), kwargs={'rate_limiter': rate_limiter}) for _ in range(args.processes)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+    elif args.command == 'merge':
+        merge(args.queue, args.output)
+    elif args.command == 'status':
+        broker = open_broker(args.queue)
+        print(broker.counts())
+        broker.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import re
+import time
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+LOCAL_TIMEZONE = ZoneInfo('America/Montreal')
+
+# English and French month names and the abbreviations both sites use.
+# Weekdays need no table: they carry nothing the date does not already say.
+MONTHS = {}
+for number, names in enumerate([
+    ('january', 'jan', 'janvier', 'janv'),
+    ('february', 'feb', 'fevrier', 'février', 'fevr', 'févr', 'fév', 'fev'),
+    ('march', 'mar', 'mars'),
+    ('april', 'apr', 'avril', 'avr'),
+    ('may', 'mai'),
+    ('june', 'jun', 'juin'),
+    ('july', 'jul', 'juillet', 'juil'),
+    ('august', 'aug', 'aout', 'août'),
+    ('september', 'sep', 'sept', 'septembre'),
+    ('october', 'oct', 'octobre'),
+    ('november', 'nov', 'novembre'),
+    ('december', 'dec', 'décembre', 'decembre', 'déc'),
+], start=1):
+    for name in names:
+        MONTHS[name] = number
+
+# Abbreviations as the sites print them; fixed offsets, since the abbreviation
+# already says whether daylight saving applies
+TIMEZONE_OFFSETS = {
+    'utc': 0, 'gmt': 0,
+    'nst': -3.5, 'ndt': -2.5,
+    'ast': -4, 'adt': -3,
+    'est': -5, 'edt': -4,
+    'cst': -6, 'cdt': -5,
+    'mst': -7, 'mdt': -6,
+    'pst': -8, 'pdt': -7,
+    'wet': 0, 'west': 1, 'bst': 1,
+    'cet': 1, 'cest': 2,
+    'eet': 2, 'eest': 3,
+    'ist': 5.5,
+}
+TIMEZONES = {name: timezone(timedelta(hours=hours)) for name, hours in TIMEZONE_OFFSETS.items()}
+
+# One pass over the (casefolded) text. The lookahead skips spaces and
+# punctuation without trying every alternative on them, the number-led
+# alternatives come first because most positions of a date string are digits,
+# and the explicit ranges are cheaper to test than \w and \d.
+TOKEN = re.compile(r'''
+    (?=[0-9a-zà-ÿ–—-])
+    (?:([0-9]{1,2})(?:[:h]([0-9]{2}))?\s*([ap])\.?m\b\.?                 # 12-hour time: hour, minute, a/p
+  | ([0-9]{1,2})(?:[:h]([0-9]{2})|h)\b                                 # 24-hour time: hour, minute
+  | ([0-9]{4}\b)                                                      # year
+  | ([0-9]{1,2}\b)                                                    # day
+  | ((?:utc|gmt)\s*[+\-−]\s*[0-9]{1,2}(?::?[0-9]{2})?)                 # offset
+  | ([a-zà-ÿ]+)                                                       # word
+  | ([–—-]))                                                         # range separator
+''', re.VERBOSE)
+SEPARATOR_WORDS = {'to', 'au'}
+YEARS_AHEAD = 8  # a yearless February 29 can be that far off
+
+OFFSET = re.compile(r'([+\-−])\s*(\d{1,2})(?::?(\d{2}))?')
+
+
+def _clock(hour, minute, meridiem):
+    # -> (hour, minute) on the 24-hour clock
+    hour, minute = int(hour), int(minute or 0)
+    if meridiem:
+        if hour == 12:
+            hour = 0
+        if meridiem == 'p':
+            hour += 12
+    return hour, minute
+
+
+def _parse_offset(text):
+    sign, hours, minutes = OFFSET.search(text).groups()
+    offset = timedelta(hours=int(hours), minutes=int(minutes or 0))
+    return timezone(-offset if sign in '-−' else offset)
+
+
+def _tokens(text):
+    # -> ([start parts, end parts], tzinfo or None)
+    halves = [{}, {}]
+    half = 0
+    tzinfo = None
+    for hour, minute, meridiem, hour_24, minute_24, year, day, offset, word, separator in TOKEN.findall(text):
+        parts = halves[half]
+        if hour:
+            parts.setdefault('time', _clock(hour, minute, meridiem))
+        elif hour_24:
+            parts.setdefault('time', _clock(hour_24, minute_24, None))
+        elif year:
+            parts['year'] = int(year)
+        elif day:
+            # "March 7 · 6 - 9pm": a second bare number is an hour that takes the end's am/pm
+            parts.setdefault('hour' if 'day' in parts else 'day', int(day))
+        elif offset:
+            tzinfo = _parse_offset(offset)
+        elif word in MONTHS:
+            # "mar. 5 avril": the French Tuesday reads as March, the real month comes after it
+            parts['month'] = MONTHS[word]
+        elif word in TIMEZONES:
+            tzinfo = TIMEZONES[word]
+        elif (separator or word in SEPARATOR_WORDS) and parts:
+            half = 1
+    return halves, tzinfo
+
+
+def _infer_year(start_parts, end_parts, reference):
+    # The first year in which the date exists and the event is not over yet as of reference.
+    # The year before is tried too, for an event from December still running in January.
+    month, day = start_parts['month'], start_parts['day']
+    last_month, last_day = end_parts.get('month', month), end_parts.get('day', day)
+    next_year = (last_month, last_day) < (month, day)
+    earliest = reference - timedelta(days=1)
+    for year in range(reference.year - 1, reference.year + YEARS_AHEAD + 1):
+        try:
+            date(year, month, day)
+            last = date(year + next_year, last_month, last_day)
+        except ValueError:
+            continue
+        if last >= earliest:
+            return year
+    return None
+
+
+def _start_time(start_parts, end_parts):
+    # -> (hour, minute) of the start, or None when the text gives none
+    if 'time' in start_parts:
+        return start_parts['time']
+    if 'hour' in start_parts and 'time' in end_parts:
+        hour = start_parts['hour']
+        end_hour = end_parts['time'][0]
+        if hour < 12 <= end_hour and hour + 12 <= end_hour:
+            hour += 12
+        return hour, 0
+    return None
+
+
+@lru_cache(maxsize=4096)
+def _normalize(text, reference):
+    # -> (start, end, StartTime, EndTime), as read_dates
+    (start_parts, end_parts), tzinfo = _tokens(text)
+    if 'month' not in start_parts or 'day' not in start_parts:
+        return None, None, None, None
+
+    year = start_parts.get('year') or end_parts.get('year') or _infer_year(start_parts, end_parts, reference)
+    start_time = _start_time(start_parts, end_parts)
+    tzinfo = tzinfo or LOCAL_TIMEZONE
+    try:
+        start = datetime(year, start_parts['month'], start_parts['day'], *(start_time or (0, 0)), tzinfo=tzinfo)
+    except (TypeError, ValueError):
+        return None, None, None, None
+
+    end = None
+    if 'time' in end_parts or 'day' in end_parts:
+        # The end inherits whatever date parts it leaves out from the start
+        hour, minute = end_parts.get('time', (0, 0))
+        try:
+            end = datetime(end_parts.get('year', year), end_parts.get('month', start.month), end_parts.get('day', start.day), hour, minute, tzinfo=tzinfo)
+        except ValueError:
+            end = None
+        if end is not None and end <= start and 'day' not in end_parts:
+            # "9:00 PM – 3:00 AM" ends the next morning
+            end += timedelta(days=1)
+        elif end is not None and end < start:
+            # "DEC 30 AT 9:00 PM – JAN 2 AT 1:00 AM" ends the next year
+            end = end.replace(year=end.year + 1)
+
+    return start, end, format_time(start) if start_time else None, format_time(end) if 'time' in end_parts else None
+
+
+# (timestamp of the next local midnight, today): date.today() costs as much as a
+# cached read_dates, and only changes at midnight
+_today = [0.0, None]
+
+
+def _reference_date(reference):
+    if reference is None:
+        if time.time() >= _today[0]:
+            today = date.today()
+            _today[:] = [datetime.combine(today + timedelta(days=1), datetime.min.time()).timestamp(), today]
+        return _today[1]
+    return reference.date() if isinstance(reference, datetime) else reference
+
+
+def read_dates(date_str, reference=None):
+    """(start, end, StartTime, EndTime) from a listing or event page date.
+
+    start and end are as in normalize_dates; the times are "9:30 PM" strings,
+    None when the text gives no time (start and end are then at midnight).
+    """
+    if not date_str:
+        return None, None, None, None
+    return _normalize(date_str.casefold(), _reference_date(reference))
+
+
+def iso_date(value, time_text):
+    # StartDateTime/EndDateTime: the full ISO datetime, or only the date when the text gave no time
+    if value is None:
+        return None
+    return value.isoformat() if time_text else value.date().isoformat()
+
+
+def normalize_dates(date_str, reference=None):
+    """Timezone-aware (start, end) datetimes from a listing or event page date.
+
+    Understands the English and French forms both sites print, e.g.
+    "SATURDAY, MARCH 9, 2024 AT 9:00 PM – 3:00 AM EDT",
+    "Débute le sam., 9 mars 2024 21:30 EDT" or "February 28 · 10pm - February 29 · 2:30am EST".
+    A missing year is the first one in which the date exists and the event is
+    not over as of reference (the date the text was scraped, default today);
+    missing zones are Montreal time. Either value is None when it cannot be read.
+    """
+    return read_dates(date_str, reference)[:2]
+
+
+def format_time(value):
+    # datetime -> "9:30 PM", the StartTime/EndTime style
+    if value is None:
+        return None
+    return f"{value.hour % 12 or 12}:{value.minute:02d} {'AM' if value.hour < 12 else 'PM'}"
+
+
+def _event_datetime(event, key, index, reference):
+    # The page's own ISO date, else the parsed Date text
+    value = event.get(key)
+    if value:
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+            return parsed if parsed.tzinfo else parsed.replace(tzinfo=LOCAL_TIMEZONE)
+        except ValueError:
+            pass
+    return normalize_dates(event.get('Date'), reference)[index]
+
+
+# reference: when the event was scraped, for Date texts without a year (default today)
+def event_start(event, reference=None):
+    return _event_datetime(event, 'StartDateTime', 0, reference)
+
+
+def event_end(event, reference=None):
+    return _event_datetime(event, 'EndDateTime', 1, reference)
@@ -0,0 +1,193 @@
+import argparse
+import json
+import re
+import zlib
+from collections import defaultdict
+from fuzzywuzzy import fuzz
+from unidecode import unidecode
+from dates import LOCAL_TIMEZONE, event_start
+from geocache import normalize_location
+
+SIMILARITY_THRESHOLD = 90
+SAME_VENUE_THRESHOLD = 75  # same place, same day: a looser title match is enough
+NUM_PERM = 64
+BANDS = 16  # 16 bands of 4 rows: pairs above ~0.5 Jaccard almost always collide
+SHINGLE_SIZE = 3
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+# Short forms that defeat both shingling and fuzz ("NY Party" vs "New Year Party")
+ABBREVIATIONS = {
+    'ny': 'new year',
+    'nye': 'new year eve',
+    'st': 'saint',
+    'ste': 'sainte',
+    'mtl': 'montreal',
+    'qc': 'quebec',
+    'fest': 'festival',
+    'w': 'with',
+    'ft': 'featuring',
+    'feat': 'featuring',
+    '&': 'and',
+}
+
+
+def _permutations(num_perm, seed=1):
+    # Fixed (a, b) pairs so signatures are comparable between runs
+    state = seed
+    permutations = []
+    for _ in range(num_perm):
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        a = state % MERSENNE_PRIME or 1
+        state = (state * 6364136223846793005 + 1442695040888963407) % (1 << 64)
+        permutations.append((a, state % MERSENNE_PRIME))
+    return permutations
+
+
+PERMUTATIONS = _permutations(NUM_PERM)
+
+
+def calculate_similarity(str1, str2):
+    return fuzz.token_sort_ratio(str1, str2)
+
+
+def normalize_title(title):
+    title = unidecode(str(title or '')).casefold().replace("'s ", ' ')
+    words = re.findall(r"[a-z0-9&]+", title)
+    return ' '.join(ABBREVIATIONS.get(word, word) for word in words)
+
+
+def shingles(text, size=SHINGLE_SIZE):
+    text = f" {text} "
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash(tokens):
+    hashes = [zlib.crc32(token.encode()) for token in tokens]
+    return [min((a * h + b) % MERSENNE_PRIME & MAX_HASH for h in hashes) for a, b in PERMUTATIONS]
+
+
+def lsh_keys(signature, bands=BANDS):
+    rows = len(signature) // bands
+    return [(band, tuple(signature[band * rows:(band + 1) * rows])) for band in range(bands)]
+
+
+def event_venue(event):
+    # Facebook nests the place under Location, Eventbrite keeps the name as a string
+    location = event.get('Location')
+    if isinstance(location, dict):
+        location = location.get('Location')
+    return normalize_location(location) if location else None
+
+
+def event_date(event):
+    # The local calendar day: "2024-03-10T01:30:00Z" and "MARCH 9 AT 9:30 PM EST" are the same evening
+    start = event_start(event)
+    return start.astimezone(LOCAL_TIMEZONE).date().isoformat() if start else None
+
+
+def block_key(event):
+    date = event_date(event)
+    if date is not None:
+        return ('date', date)
+    venue = event_venue(event)
+    if venue is not None:
+        return ('venue', venue)
+    return ('any',)
+
+
+class DedupEngine:
+    """Near-duplicate detection that stays close to linear in the number of events.
+
+    Events are only compared within a block (same start date, or same venue
+    when the date is unknown), and within a block only with events whose
+    MinHash signature over title shingles collides in at least one LSH band.
+    Survivors are confirmed with calculate_similarity. add() returns the
+    cluster id of the event it duplicates, or None for a new event. Only each
+    event's cluster_summary is kept, not the event itself.
+    """
+
+    def __init__(self, threshold=SIMILARITY_THRESHOLD, venue_threshold=SAME_VENUE_THRESHOLD):
+        self.threshold = threshold
+        self.venue_threshold = venue_threshold
+        self.events = []
+        self.titles = []
+        self.venues = []
+        self.cluster_of = []
+        self.members = defaultdict(list)
+        self._buckets = defaultdict(list)
+        self.compared = 0
+
+    def _is_match(self, index, title, venue):
+        self.compared += 1
+        numbers, other_numbers = set(re.findall(r'\d+', title)), set(re.findall(r'\d+', self.titles[index]))
+        if numbers and other_numbers and numbers != other_numbers:
+            # "Amoris 20 to 40" / "Amoris 30 to 50", "Fest 2024" / "Fest 2025"
+            return False
+        threshold = self.venue_threshold if venue is not None and venue == self.venues[index] else self.threshold
+        return calculate_similarity(title, self.titles[index]) >= threshold
+
+    def add(self, event):
+        index = len(self.events)
+        title = normalize_title(event.get('Title'))
+        venue = event_venue(event)
+        block = block_key(event)
+        keys = [(block, band) for band in lsh_keys(minhash(shingles(title)))]
+
+        candidates = []
+        for key in keys:
+            for other in self._buckets[key]:
+                if other not in candidates:
+                    candidates.append(other)
+
+        cluster = None
+        for other in candidates:
+            if self._is_match(other, title, venue):
+                cluster = self.cluster_of[other]
+                break
+
+        self.events.append(cluster_summary([event])[0])
+        self.titles.append(title)
+        self.venues.append(venue)
+        self.cluster_of.append(index if cluster is None else cluster)
+        self.members[self.cluster_of[index]].append(index)
+        for key in keys:
+            self._buckets[key].append(index)
+        return cluster
+
+    def clusters(self):
+        # Only groups with duplicates, as cluster summaries; the first member is the one that was kept
+        return [[self.events[index] for index in members] for members in self.members.values() if len(members) > 1]
+
+
+def cluster_summary(cluster):
+    return [{'Title': event.get('Title'), 'EventUrl': event.get('EventUrl')} for event in cluster]
+
+
+def find_duplicates(events, threshold=SIMILARITY_THRESHOLD):
+    engine = DedupEngine(threshold)
+    for event in events:
+        engine.add(event)
+    return engine
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Group near-duplicate events from one or more JSON files")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--threshold', type=int, default=SIMILARITY_THRESHOLD)
+    parser.add_argument('--output', default='duplicate_clusters.json')
+    args = parser.parse_args()
+
+    events = []
+    for path in args.paths:
+        with open(path) as f:
+            events.extend(json.load(f))
+
+    engine = find_duplicates(events, args.threshold)
+    clusters = engine.clusters()
+    with open(args.output, 'w') as f:
+        json.dump([cluster_summary(cluster) for cluster in clusters], f, indent=4)
+    print(f"{len(events)} events, {len(clusters)} duplicate clusters, {engine.compared} similarity checks -> {args.output}")
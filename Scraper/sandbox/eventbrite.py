@@ -1,6 +1,4 @@
 import json
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 import time
 from datetime import datetime
@@ -9,6 +7,14 @@ from geopy.geocoders import Nominatim
 import geopy.exc
 from unidecode import unidecode
 import re
+from browser import TabPolicy, create_driver
+from geocache import GeocodeCache
+from http_fetch import page_url
+from parsing import compile_plan
+from waits import EVENTBRITE_EVENT_OPTIONAL, EVENTBRITE_EVENT_REQUIRED, WaitPolicy
+
+geocode_cache = GeocodeCache()
+eventbrite_event_waits = WaitPolicy('eventbrite_event', EVENTBRITE_EVENT_REQUIRED, EVENTBRITE_EVENT_OPTIONAL)
 
 def scroll_to_bottom(driver, max_clicks=5):
     for _ in range(max_clicks):
@@ -155,20 +161,28 @@ def extract_start_end_time(date_str):
     return None, None
 
 def get_coordinates(location):
+    if location is None:
+        return None, None
+
+    hit, coordinates = geocode_cache.get_coordinates(location)
+    if hit:
+        return coordinates if coordinates is not None else (None, None)
+
     geolocator = Nominatim(user_agent="event_scraper")
     retries = 3
     delay = 2
 
-    location = unidecode(location)
+    query = unidecode(location)
 
     for _ in range(retries):
         try:
-            location = geolocator.geocode(location, addressdetails=True)
-            if location:
-                latitude = location.latitude
-                longitude = location.longitude
-                return latitude, longitude
+            location_result = geolocator.geocode(query, addressdetails=True)
+            if location_result:
+                coordinates = (location_result.latitude, location_result.longitude)
+                geocode_cache.put_coordinates(location, coordinates)
+                return coordinates
             else:
+                geocode_cache.put_coordinates(location, None)
                 return None, None
         except geopy.exc.GeocoderUnavailable as e:
             time.sleep(delay)
@@ -179,43 +193,38 @@ def open_google_maps(latitude, longitude):
     google_maps_url = f"https://www.google.com/maps/search/?api=1&query={latitude},{longitude}"
     return google_maps_url
 
-def get_previous_page_image_url(driver):
-    url = 'https://www.eventbrite.com/d/canada--montreal/all-events/?page=1'
-
-    driver.get(url)
-
-    if driver.page_source:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        img_tag = soup.find('img', class_='event-card-image')
-
-        if img_tag:
-            return img_tag['src']
-
-    return None
-
 def scrape_eventbrite_events(driver, url, selectors, max_pages=40):
-    driver.get(url)
-    driver.implicitly_wait(20)
+    listing_waits = WaitPolicy('eventbrite_listing', {'Cards': compile_plan(selectors).card_css})
 
     all_events = []
+    previous_links = None
 
-    for _ in range(max_pages):
+    for page in range(1, max_pages + 1):
+        # Pages are addressed as ?page=N, so the listing is never reloaded just to click Next
+        listing_waits.load(driver, url if page == 1 else page_url(url, page))
         page_content = driver.page_source
         webpage = BeautifulSoup(page_content, 'html.parser')
-        events = webpage.find_all(selectors['event']['tag'], class_=selectors['event'].get('class'))
+        events = [event for event in webpage.find_all(selectors['event']['tag'], class_=selectors['event'].get('class')) if event.find('a', href=True)]
+
+        # Past the last page there are no cards, or the last page's cards again
+        links = [event.find('a', href=True)['href'] for event in events]
+        if not links or links == previous_links:
+            break
+        previous_links = links
 
         for event in events:
             event_info = {}
             for key, selector in selectors.items():
                 if key != 'event':
                     element = event.find(selector['tag'], class_=selector.get('class'))
-                    event_info[key] = element.text.strip() if element else None
                     if key == 'ImageURL':
-                        img_element = event.find('img', class_='event-card__image')
-                        event_info[key] = img_element['src'] if img_element and 'src' in img_element.attrs else None
+                        # The card image is only on the listing, so keep it from here
+                        event_info[key] = element['src'] if element and 'src' in element.attrs else None
+                    else:
+                        event_info[key] = element.text.strip() if element else None
 
             event_link = event.find('a', href=True)['href']
-            driver.get(event_link)
+            eventbrite_event_waits.load(driver, event_link)
 
             event_page_content = driver.page_source
             event_page = BeautifulSoup(event_page_content, 'html.parser')
@@ -226,7 +235,6 @@ def scrape_eventbrite_events(driver, url, selectors, max_pages=40):
             date = event_page.find('span', class_='date-info__full-datetime').text.strip() if event_page.find('span', class_='date-info__full-datetime') else None
             location_element = event_page.find('p', class_='location-info__address-text')
             location = location_element.text.strip() if location_element else None
-            ImageURL = get_previous_page_image_url(driver)
 
             # Obtenha as coordenadas de latitude e longitude
             latitude, longitude = get_coordinates(location)
@@ -259,7 +267,6 @@ def scrape_eventbrite_events(driver, url, selectors, max_pages=40):
             event_info['Date'] = date
             event_info['StartTime'], event_info['EndTime'] = extract_start_end_time(date)
             event_info.update(format_location(location, 'Eventbrite'))
-            event_info['ImageURL'] = ImageURL
             event_info['Latitude'] = latitude  # Adiciona latitude
             event_info['Longitude'] = longitude  # Adiciona longitude
             event_info['Tags'] = tags
@@ -273,14 +280,6 @@ def scrape_eventbrite_events(driver, url, selectors, max_pages=40):
 
             all_events.append(event_info)
 
-            driver.back()
-
-        try:
-            next_button = driver.find_element_by_link_text('Next')
-            next_button.click()
-        except:
-            break
-
     return all_events
 
 def main():
@@ -304,12 +303,8 @@ def main():
         }
     ]
 
-    chrome_options = Options()
-    # Remova a opção "--headless" para mostrar o navegador
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-
-    driver = webdriver.Chrome(options=chrome_options)
+    # Passe headless=True para esconder o navegador
+    driver = create_driver(tab_policy=TabPolicy())
 
     all_events = []
     for source in sources:
@@ -1,16 +1,15 @@
 import json
 import re
-from selenium import webdriver
 from bs4 import BeautifulSoup
-import time
 from datetime import datetime
-import requests
 from geopy.geocoders import Nominatim
+from browser import TabPolicy, create_driver, scroll_until_loaded
+from geocache import GeocodeCache
+from parsing import compile_plan
+from waits import FACEBOOK_EVENT_OPTIONAL, FACEBOOK_EVENT_REQUIRED, WaitPolicy
 
-def scroll_to_bottom(driver, max_scroll=10):
-    for _ in range(max_scroll):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+geocode_cache = GeocodeCache()
+facebook_event_waits = WaitPolicy('facebook_event', FACEBOOK_EVENT_REQUIRED, FACEBOOK_EVENT_OPTIONAL)
 
 def format_date(date_str, source):
     if date_str is None:
@@ -31,11 +30,21 @@ def format_date(date_str, source):
         return None
 
 def get_coordinates(location):
+    if location is None:
+        return None, None
+
+    hit, coordinates = geocode_cache.get_coordinates(location)
+    if hit:
+        return coordinates if coordinates is not None else (None, None)
+
     geolocator = Nominatim(user_agent="event_scraper", timeout=30)  # Aumentando o tempo limite para 10 segundos
-    location = geolocator.geocode(location)
-    if location:
-        return location.latitude, location.longitude
+    location_result = geolocator.geocode(location)
+    if location_result:
+        coordinates = (location_result.latitude, location_result.longitude)
+        geocode_cache.put_coordinates(location, coordinates)
+        return coordinates
     else:
+        geocode_cache.put_coordinates(location, None)
         return None, None
 
 
@@ -44,13 +53,21 @@ def open_google_maps(latitude, longitude):
     return google_maps_url
 
 def get_location_details(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None, None, None
+
     try:
-        geolocator = Nominatim(user_agent="event_scraper")
-        location = geolocator.reverse((latitude, longitude), exactly_one=True)
-        if location:
-            address = location.address
-            city = location.raw.get('address', {}).get('city')
-            country_code = location.raw.get('address', {}).get('country_code')
+        hit, details = geocode_cache.get_reverse(latitude, longitude)
+        if not hit:
+            geolocator = Nominatim(user_agent="event_scraper")
+            location = geolocator.reverse((latitude, longitude), exactly_one=True)
+            details = {'display_name': location.address, 'address': location.raw.get('address', {})} if location else None
+            geocode_cache.put_reverse(latitude, longitude, details)
+
+        if details:
+            address = details['display_name']
+            city = details['address'].get('city')
+            country_code = details['address'].get('country_code')
 
             # Ajuste para Montreal e ca apenas se ambos forem None
             if city is None and country_code is None:
@@ -69,14 +86,15 @@ def get_location_details(latitude, longitude):
 
 
 def scrape_facebook_events(driver, url, selectors, max_scroll=30):
-    driver.get(url)
-    driver.implicitly_wait(20)
+    card_css = compile_plan(selectors).card_css
+    WaitPolicy('facebook_feed', {'Cards': card_css}).load(driver, url)
 
     all_events = []
     unique_event_titles = set()
 
-    # Rolar para baixo para carregar mais eventos
-    scroll_to_bottom(driver, max_scroll)
+    # Rolar para baixo enquanto novos eventos forem carregados
+    produced = scroll_until_loaded(driver, card_css, max_scroll)
+    print(f"Facebook: {sum(produced)} new cards over {len(produced)} scrolls {produced}")
 
     page_content = driver.page_source
     webpage = BeautifulSoup(page_content, 'html.parser')
@@ -89,8 +107,7 @@ def scrape_facebook_events(driver, url, selectors, max_scroll=30):
 
         event_url = 'https://www.facebook.com' + event_link['href'] if event_link['href'].startswith('/') else event_link['href']
 
-        driver.get(event_url)
-        time.sleep(1)
+        facebook_event_waits.load(driver, event_url)
 
         event_page_content = driver.page_source
         event_page = BeautifulSoup(event_page_content, 'html.parser')
@@ -175,8 +192,6 @@ def scrape_facebook_events(driver, url, selectors, max_scroll=30):
         all_events.append(event_info)
         unique_event_titles.add(event_title)
 
-        driver.back()
-
     return all_events if all_events else None
 
 
@@ -191,7 +206,7 @@ if __name__ == "__main__":
         }
     ]
 
-    driver = webdriver.Chrome()
+    driver = create_driver(tab_policy=TabPolicy())
 
     all_events = []
     for source in sources:
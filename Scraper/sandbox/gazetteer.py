@@ -0,0 +1,224 @@
+import argparse
+import bisect
+import csv
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+from geocache import normalize_location
+
+GAZETTEER_FILE = 'montreal.gaz'
+MAGIC = b'GAZ1'
+CELL_SIZE = 0.005  # degrees, ~550 m north-south in Montreal
+MAX_REVERSE_DISTANCE = 150  # metres
+
+HEADER = struct.Struct('<4sIIId')  # magic, records, keys, cells, cell size
+RECORD = struct.Struct('<ddII')  # lat, lon, details offset, details length
+KEY = struct.Struct('<QI')  # key hash, record index
+CELL = struct.Struct('<QII')  # cell id, first member, member count
+MEMBER = struct.Struct('<I')
+
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def lookup_keys(location):
+    # "1400 Maisonneuve Blvd W, Montreal, Quebec H3G 1M8" is looked up as the
+    # whole string, then with trailing comma-separated parts dropped
+    parts = [part.strip() for part in normalize_location(location).split(',')]
+    return [', '.join(parts[:i]) for i in range(len(parts), 0, -1) if parts[i - 1]]
+
+
+def cell_of(latitude, longitude, cell_size=CELL_SIZE):
+    return math.floor(latitude / cell_size), math.floor(longitude / cell_size)
+
+
+def cell_id(row, col):
+    return ((row + 2 ** 31) << 32) | (col + 2 ** 31)
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    # Equirectangular approximation, plenty for a few hundred metres
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6371000 * math.hypot(x, y)
+
+
+def _row_value(row, *names):
+    for name in names:
+        value = row.get(name)
+        if value:
+            return value.strip()
+    return None
+
+
+def read_places(csv_path):
+    # Accepts a plain CSV (name,address,latitude,longitude,city,country_code)
+    # or an OSM tag export (name,addr:housenumber,addr:street,lat,lon,addr:city)
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            latitude = _row_value(row, 'latitude', 'lat')
+            longitude = _row_value(row, 'longitude', 'lon')
+            if latitude is None or longitude is None:
+                continue
+
+            address = _row_value(row, 'address')
+            if address is None and _row_value(row, 'addr:street'):
+                address = ' '.join(filter(None, [_row_value(row, 'addr:housenumber'), _row_value(row, 'addr:street')]))
+
+            yield {
+                'name': _row_value(row, 'name'),
+                'address': address,
+                'latitude': float(latitude),
+                'longitude': float(longitude),
+                'city': _row_value(row, 'city', 'addr:city') or 'Montreal',
+                'country_code': (_row_value(row, 'country_code') or 'ca').lower(),
+            }
+
+
+def build_gazetteer(csv_path, index_path=GAZETTEER_FILE, cell_size=CELL_SIZE):
+    records = []
+    details = bytearray()
+    keys = {}
+    cells = {}
+
+    for place in read_places(csv_path):
+        if not place['name'] and not place['address']:
+            continue
+        index = len(records)
+        blob = json.dumps({
+            'display_name': ', '.join(filter(None, [place['name'], place['address'], place['city']])),
+            'address': {
+                'name': place['name'],
+                'road': place['address'],
+                'city': place['city'],
+                'country_code': place['country_code'],
+            },
+        }).encode('utf-8')
+        records.append((place['latitude'], place['longitude'], len(details), len(blob)))
+        details += blob
+
+        for text in (place['name'], place['address']):
+            if text:
+                # First place wins when a name is shared
+                keys.setdefault(key_hash(normalize_location(text)), index)
+
+        cells.setdefault(cell_id(*cell_of(place['latitude'], place['longitude'], cell_size)), []).append(index)
+
+    header_size = HEADER.size
+    tmp_path = index_path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), len(keys), len(cells), cell_size))
+        for record in records:
+            f.write(RECORD.pack(*record))
+        for hashed in sorted(keys):
+            f.write(KEY.pack(hashed, keys[hashed]))
+        first = 0
+        for cell in sorted(cells):
+            f.write(CELL.pack(cell, first, len(cells[cell])))
+            first += len(cells[cell])
+        for cell in sorted(cells):
+            for index in cells[cell]:
+                f.write(MEMBER.pack(index))
+        f.write(details)
+    os.replace(tmp_path, index_path)
+    return len(records)
+
+
+class Gazetteer:
+    """Read-only, memory-mapped venue/address index built by build_gazetteer.
+
+    geocode() answers an exact normalized name or address, reverse() the
+    nearest place within max_distance metres. Both return None on a miss so
+    callers can fall back to Nominatim.
+    """
+
+    def __init__(self, index_path=GAZETTEER_FILE, max_distance=MAX_REVERSE_DISTANCE):
+        self.max_distance = max_distance
+        self._file = open(index_path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.record_count, self.key_count, self.cell_count, self.cell_size = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{index_path} is not a gazetteer index")
+
+        self._records_at = HEADER.size
+        self._keys_at = self._records_at + self.record_count * RECORD.size
+        self._cells_at = self._keys_at + self.key_count * KEY.size
+        self._members_at = self._cells_at + self.cell_count * CELL.size
+        member_count = sum(CELL.unpack_from(self._map, self._cells_at + i * CELL.size)[2] for i in range(self.cell_count))
+        self._details_at = self._members_at + member_count * MEMBER.size
+
+        # Sorted hash/cell columns are tiny; keep them as lists so bisect works
+        self._key_hashes = [KEY.unpack_from(self._map, self._keys_at + i * KEY.size)[0] for i in range(self.key_count)]
+        self._cell_ids = [CELL.unpack_from(self._map, self._cells_at + i * CELL.size)[0] for i in range(self.cell_count)]
+
+    def _record(self, index):
+        return RECORD.unpack_from(self._map, self._records_at + index * RECORD.size)
+
+    def _details(self, index):
+        _, _, offset, length = self._record(index)
+        start = self._details_at + offset
+        return json.loads(self._map[start:start + length])
+
+    def _find_key(self, key):
+        hashed = key_hash(key)
+        i = bisect.bisect_left(self._key_hashes, hashed)
+        if i < self.key_count and self._key_hashes[i] == hashed:
+            return KEY.unpack_from(self._map, self._keys_at + i * KEY.size)[1]
+        return None
+
+    def _cell_members(self, cell):
+        i = bisect.bisect_left(self._cell_ids, cell)
+        if i == self.cell_count or self._cell_ids[i] != cell:
+            return
+        _, first, count = CELL.unpack_from(self._map, self._cells_at + i * CELL.size)
+        for j in range(first, first + count):
+            yield MEMBER.unpack_from(self._map, self._members_at + j * MEMBER.size)[0]
+
+    def geocode(self, location):
+        if location is None:
+            return None
+        for key in lookup_keys(location):
+            index = self._find_key(key)
+            if index is not None:
+                latitude, longitude, _, _ = self._record(index)
+                return latitude, longitude
+        return None
+
+    def reverse(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            return None
+        row, col = cell_of(latitude, longitude, self.cell_size)
+        best, best_distance = None, self.max_distance
+        for d_row in (-1, 0, 1):
+            for d_col in (-1, 0, 1):
+                for index in self._cell_members(cell_id(row + d_row, col + d_col)):
+                    place_lat, place_lon, _, _ = self._record(index)
+                    distance = distance_m(latitude, longitude, place_lat, place_lon)
+                    if distance <= best_distance:
+                        best, best_distance = index, distance
+        return self._details(best) if best is not None else None
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def load_gazetteer(index_path=GAZETTEER_FILE):
+    if not os.path.exists(index_path):
+        return None
+    return Gazetteer(index_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline Montreal gazetteer from a CSV/OSM extract")
+    parser.add_argument('csv_path')
+    parser.add_argument('index_path', nargs='?', default=GAZETTEER_FILE)
+    args = parser.parse_args()
+
+    count = build_gazetteer(args.csv_path, args.index_path)
+    print(f"Indexed {count} places into {args.index_path}")
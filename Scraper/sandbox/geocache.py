@@ -0,0 +1,140 @@
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from unidecode import unidecode
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+CACHE_FILE = 'geocache.json'
+TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+MAX_ENTRIES = 20000
+REVERSE_PRECISION = 4  # ~11 m, good enough to share a venue
+
+
+def normalize_location(location):
+    location = unidecode(str(location)).casefold()
+    location = re.sub(r'\s+', ' ', location)
+    return location.strip(' ,')
+
+
+def reverse_key(latitude, longitude, precision=REVERSE_PRECISION):
+    return f"{round(float(latitude), precision):.{precision}f},{round(float(longitude), precision):.{precision}f}"
+
+
+class GeocodeCache:
+    """On-disk LRU cache for forward and reverse geocoder results.
+
+    A value of None is a cached miss ("Nominatim found nothing") and expires
+    after negative_ttl instead of ttl. Several processes may share one file:
+    save() merges in what the others wrote since, under a file lock.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=TTL, negative_ttl=NEGATIVE_TTL, max_entries=MAX_ENTRIES, autosave=50):
+        self.path = path
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self.autosave = autosave
+        self.hits = 0
+        self.misses = 0
+        self._entries = {'geocode': OrderedDict(), 'reverse': OrderedDict()}
+        self._pending_writes = 0
+        self._lock = threading.RLock()
+        self._load()
+        atexit.register(self.save)
+
+    def _read(self):
+        if not self.path or not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable geocode cache {self.path}: {e}")
+            return {}
+
+    def _load(self):
+        data = self._read()
+        for namespace, entries in self._entries.items():
+            # Stored oldest-first, so the OrderedDict keeps the LRU order
+            for key, value, stored_at in data.get(namespace, []):
+                entries[key] = (value, stored_at)
+
+    def _merge(self, data):
+        # Entries other processes saved: ours win unless theirs are newer, theirs go to the cold end
+        for namespace, entries in self._entries.items():
+            saved = data.get(namespace, [])
+            for key, value, stored_at in reversed(saved):
+                if key not in entries:
+                    entries[key] = (value, stored_at)
+                    entries.move_to_end(key, last=False)
+                elif entries[key][1] < stored_at:
+                    entries[key] = (value, stored_at)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+
+    def _get(self, namespace, key):
+        with self._lock:
+            entries = self._entries[namespace]
+            if key not in entries:
+                self.misses += 1
+                return False, None
+            value, stored_at = entries[key]
+            ttl = self.ttl if value is not None else self.negative_ttl
+            if time.time() - stored_at > ttl:
+                del entries[key]
+                self.misses += 1
+                return False, None
+            entries.move_to_end(key)
+            self.hits += 1
+            return True, value
+
+    def _put(self, namespace, key, value):
+        with self._lock:
+            entries = self._entries[namespace]
+            entries[key] = (value, time.time())
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._pending_writes += 1
+            if self.autosave and self._pending_writes >= self.autosave:
+                self.save()
+
+    def get_coordinates(self, location):
+        hit, value = self._get('geocode', normalize_location(location))
+        return hit, (tuple(value) if value is not None else None)
+
+    def put_coordinates(self, location, coordinates):
+        self._put('geocode', normalize_location(location), list(coordinates) if coordinates is not None else None)
+
+    def get_reverse(self, latitude, longitude):
+        return self._get('reverse', reverse_key(latitude, longitude))
+
+    def put_reverse(self, latitude, longitude, details):
+        self._put('reverse', reverse_key(latitude, longitude), details)
+
+    def save(self):
+        with self._lock:
+            if not self.path or not self._pending_writes:
+                return
+            with open(self.path + '.lock', 'a') as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                self._merge(self._read())
+                data = {
+                    namespace: [[key, value, stored_at] for key, (value, stored_at) in entries.items()]
+                    for namespace, entries in self._entries.items()
+                }
+                tmp_path = f"{self.path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            self._pending_writes = 0
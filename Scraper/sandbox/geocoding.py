@@ -0,0 +1,258 @@
+import multiprocessing
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+import geopy.exc
+from geopy.geocoders import Nominatim
+from unidecode import unidecode
+from geocache import normalize_location, reverse_key
+
+# Nominatim usage policy: at most one request per second
+RATE = 1.0
+BURST = 1
+RETRIES = 5
+BASE_DELAY = 1.0
+MAX_DELAY = 30.0
+
+# Everything else from the service (a bad query, a ban, bad credentials) fails the same way again
+RETRYABLE_ERRORS = (
+    geopy.exc.GeocoderUnavailable,
+    geopy.exc.GeocoderTimedOut,
+    geopy.exc.GeocoderRateLimited,
+)
+
+
+def resolved(value):
+    # An already-completed Future, for answers that need no network
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class TokenBucket:
+    def __init__(self, rate=RATE, capacity=BURST):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class SharedRateLimiter:
+    """A TokenBucket stand-in shared by the processes started after it is made.
+
+    Hands out request slots 1 / rate seconds apart from one shared clock, so
+    any number of worker processes together stay within `rate`.
+    """
+
+    def __init__(self, rate=RATE):
+        self.interval = 1 / rate
+        self.next_slot = multiprocessing.Value('d', 0.0)
+
+    def acquire(self):
+        with self.next_slot.get_lock():
+            now = time.time()
+            slot = max(now, self.next_slot.value)
+            self.next_slot.value = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class GeocodingService:
+    """Background geocoder: one shared Nominatim client behind a token bucket.
+
+    geocode/reverse/locate return Futures immediately. Requests for the same
+    normalized address (or rounded coordinates) made while one is still
+    pending share a single Future, and cache hits never reach the queue.
+
+    local is an optional offline geocoder (see gazetteer.Gazetteer) with the
+    same geocode/reverse methods; it is asked first and Nominatim only on a
+    miss.
+    """
+
+    def __init__(self, cache=None, local=None, user_agent="event_scraper", rate=RATE, burst=BURST, retries=RETRIES, workers=1):
+        self.cache = cache
+        self.local = local
+        self.geolocator = Nominatim(user_agent=user_agent)
+        self.bucket = TokenBucket(rate, burst)
+        self.retries = retries
+        self.workers = workers
+        self.retried = 0
+        self._jobs = queue.Queue()
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+    def _start(self):
+        if self._threads:
+            return
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._run, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is None:
+                break
+            pending_key, future, fn = job
+            try:
+                future.set_result(fn())
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                with self._lock:
+                    self._pending.pop(pending_key, None)
+
+    def _submit(self, pending_key, fn):
+        with self._lock:
+            future = self._pending.get(pending_key)
+            if future is not None:
+                return future
+            future = Future()
+            self._pending[pending_key] = future
+        self._start()
+        self._jobs.put((pending_key, future, fn))
+        return future
+
+    def _call(self, fn, *args, **kwargs):
+        for attempt in range(self.retries):
+            self.bucket.acquire()
+            try:
+                return True, fn(*args, **kwargs)
+            except RETRYABLE_ERRORS as e:
+                self.retried += 1
+                retry_after = getattr(e, 'retry_after', None)
+                if retry_after:
+                    # Rate limited with a Retry-After: wait as long as asked, not less
+                    time.sleep(retry_after)
+                    continue
+                delay = min(MAX_DELAY, BASE_DELAY * 2 ** attempt)
+                time.sleep(delay + random.uniform(0, delay / 2))
+            except geopy.exc.GeocoderServiceError as e:
+                print(f"Geocoder error, not retried: {e}")
+                return False, None
+        return False, None
+
+    # The *_now helpers run on the worker thread and return None on a miss or
+    # when every retry failed; only definitive answers are cached. checked:
+    # the caller already asked the gazetteer and the cache, so that each
+    # lookup counts once in the cache's hits and misses.
+    def _geocode_now(self, location, checked=False):
+        if not checked:
+            if self.local is not None:
+                coordinates = self.local.geocode(location)
+                if coordinates is not None:
+                    return coordinates
+            if self.cache is not None:
+                hit, coordinates = self.cache.get_coordinates(location)
+                if hit:
+                    return coordinates
+
+        ok, result = self._call(self.geolocator.geocode, unidecode(location), addressdetails=True)
+        if not ok:
+            return None
+        coordinates = (result.latitude, result.longitude) if result else None
+        if self.cache is not None:
+            self.cache.put_coordinates(location, coordinates)
+        return coordinates
+
+    def _reverse_now(self, latitude, longitude, checked=False):
+        if not checked:
+            if self.local is not None:
+                details = self.local.reverse(latitude, longitude)
+                if details is not None:
+                    return details
+            if self.cache is not None:
+                hit, details = self.cache.get_reverse(latitude, longitude)
+                if hit:
+                    return details
+
+        ok, result = self._call(self.geolocator.reverse, (latitude, longitude), language='en', addressdetails=True)
+        if not ok:
+            return None
+        details = {'display_name': result.address, 'address': result.raw.get('address', {})} if result else None
+        if self.cache is not None:
+            self.cache.put_reverse(latitude, longitude, details)
+        return details
+
+    def geocode(self, location):
+        if location is None:
+            return resolved(None)
+        location = str(location)
+        if self.local is not None:
+            coordinates = self.local.geocode(location)
+            if coordinates is not None:
+                return resolved(coordinates)
+        if self.cache is not None:
+            hit, coordinates = self.cache.get_coordinates(location)
+            if hit:
+                return resolved(coordinates)
+        return self._submit(('geocode', normalize_location(location)), lambda: self._geocode_now(location, checked=True))
+
+    def reverse(self, latitude, longitude):
+        if latitude is None or longitude is None:
+            return resolved(None)
+        if self.local is not None:
+            details = self.local.reverse(latitude, longitude)
+            if details is not None:
+                return resolved(details)
+        if self.cache is not None:
+            hit, details = self.cache.get_reverse(latitude, longitude)
+            if hit:
+                return resolved(details)
+        return self._submit(('reverse', reverse_key(latitude, longitude)), lambda: self._reverse_now(latitude, longitude, checked=True))
+
+    def locate(self, location, coordinates=None):
+        # Forward then reverse geocode in one job: resolves to (coordinates, details).
+        # Known coordinates (e.g. from the page's schema.org geo) skip the forward step.
+        if coordinates is not None:
+            located = Future()
+
+            def chain(done):
+                if done.exception() is not None:
+                    located.set_exception(done.exception())
+                else:
+                    located.set_result((coordinates, done.result()))
+
+            self.reverse(*coordinates).add_done_callback(chain)
+            return located
+        if location is None:
+            return resolved((None, None))
+        location = str(location)
+        if self.local is not None:
+            coordinates = self.local.geocode(location)
+            details = self.local.reverse(*coordinates) if coordinates else None
+            if details is not None:
+                return resolved((coordinates, details))
+
+        def job():
+            coordinates = self._geocode_now(location)
+            details = self._reverse_now(*coordinates) if coordinates else None
+            return coordinates, details
+
+        return self._submit(('locate', normalize_location(location)), job)
+
+    def close(self):
+        for _ in self._threads:
+            self._jobs.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.cache is not None:
+            self.cache.save()
@@ -0,0 +1,72 @@
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from metrics import metrics
+
+CONCURRENCY = 8
+TIMEOUT = 20
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/122.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'en-CA,en;q=0.9,fr-CA;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+}
+
+
+def create_session(pool_size=CONCURRENCY, retries=3):
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504], allowed_methods=['GET'])
+    # One keep-alive connection per concurrent request, reused across pages
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    session.headers.update(HEADERS)
+    return session
+
+
+def page_url(url, page):
+    parts = urlsplit(url)
+    query = dict(parse_qsl(parts.query))
+    query['page'] = str(page)
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+class HttpFetcher:
+    """Fetches pages over a pooled requests.Session, concurrency pages at a time.
+
+    fetch returns the HTML or None on any HTTP/network error, so callers can
+    fall back to the browser for that page.
+    """
+
+    def __init__(self, session=None, concurrency=CONCURRENCY, timeout=TIMEOUT):
+        self.session = session or create_session(concurrency)
+        self.concurrency = concurrency
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def fetch(self, url):
+        try:
+            with metrics.timer('page_load', kind='http'):
+                response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            metrics.inc('pages_fetched', kind='http')
+            return response.text
+        except requests.RequestException as e:
+            print(f"HTTP fetch failed for {url}: {e}")
+            metrics.inc('fetch_errors', kind='http')
+            return None
+
+    def submit(self, url):
+        # -> concurrent.futures.Future of fetch(url)
+        return self._executor.submit(self.fetch, url)
+
+    def fetch_all(self, urls):
+        # Results come back in the order of urls
+        return self._executor.map(self.fetch, urls)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self.session.close()
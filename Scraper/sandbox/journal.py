@@ -0,0 +1,76 @@
+import json
+import os
+from seen_index import normalize_url
+
+JOURNAL_FILE = 'scrape_journal.jsonl'
+
+
+class Journal:
+    """Append-only JSONL checkpoint of a scrape run.
+
+    Every listing page (with its cards), the end of a listing and every
+    parsed detail page is written and fsync'ed as it happens. Opening with
+    resume=True replays the file so the scrapers can skip what is already
+    done; otherwise the previous journal is discarded.
+    """
+
+    def __init__(self, path=JOURNAL_FILE, resume=False):
+        self.path = path
+        self._sources = {}
+        if resume and os.path.exists(path):
+            self._replay()
+        self._file = open(path, 'a' if resume else 'w')
+
+    def _state(self, source):
+        return self._sources.setdefault(source, {'pages': {}, 'listing_done': False, 'events': {}})
+
+    def _replay(self):
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # A crash can leave the last line half-written
+                    continue
+                state = self._state(record['source'])
+                if record['type'] == 'page':
+                    state['pages'][record['page']] = record['cards']
+                elif record['type'] == 'listing_done':
+                    state['listing_done'] = True
+                elif record['type'] == 'event':
+                    state['events'][record['url']] = record['event']
+
+    def _write(self, record):
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def pages(self, source):
+        return dict(sorted(self._state(source)['pages'].items()))
+
+    def listing_done(self, source):
+        return self._state(source)['listing_done']
+
+    def events(self, source):
+        return self._state(source)['events']
+
+    def record_page(self, source, page, cards):
+        self._state(source)['pages'][page] = cards
+        self._write({'type': 'page', 'source': source, 'page': page, 'cards': cards})
+
+    def record_listing_done(self, source):
+        self._state(source)['listing_done'] = True
+        self._write({'type': 'listing_done', 'source': source})
+
+    def record_event(self, source, url, event):
+        url = normalize_url(url)
+        self._state(source)['events'][url] = event
+        self._write({'type': 'event', 'source': source, 'url': url, 'event': event})
+
+    def close(self):
+        self._file.close()
+
+    def finish(self):
+        # The run completed and its output is written; nothing left to resume
+        self.close()
+        os.remove(self.path)
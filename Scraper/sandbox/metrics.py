@@ -0,0 +1,164 @@
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+PERCENTILES = (50, 90, 95, 99)
+# Prometheus histogram buckets, in seconds: page loads and geocoding dominate the upper end
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MAX_SAMPLES = 50000  # per series; later samples replace random earlier ones
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items()))
+
+
+def _label_text(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in pairs) + '}'
+
+
+def percentile(sorted_values, p):
+    if not sorted_values:
+        return None
+    rank = (len(sorted_values) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(sorted_values) - 1)
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+class Histogram:
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = []
+        self.buckets = [0] * len(BUCKETS)
+
+    def observe(self, value):
+        self.count += 1
+        self.total += value
+        for index, bound in enumerate(BUCKETS):
+            if value <= bound:
+                self.buckets[index] += 1
+        if len(self.samples) < MAX_SAMPLES:
+            self.samples.append(value)
+        else:
+            # Reservoir sampling keeps the percentiles honest on long runs
+            slot = int.from_bytes(os.urandom(4), 'little') % self.count
+            if slot < MAX_SAMPLES:
+                self.samples[slot] = value
+
+    def summary(self):
+        values = sorted(self.samples)
+        summary = {'count': self.count, 'sum': self.total, 'mean': self.total / self.count if self.count else None}
+        for p in PERCENTILES:
+            summary[f'p{p}'] = percentile(values, p)
+        summary['max'] = values[-1] if values else None
+        return summary
+
+
+class Metrics:
+    """Counters, gauges and timing histograms for one scrape run.
+
+    Series are identified by a name plus optional keyword labels, e.g.
+    metrics.inc('pages_fetched', kind='facebook_event'). Histograms hold
+    durations in seconds; timer() and timed() record wall-clock time into
+    one. report() is a plain dict for the JSON run report; prometheus_text()
+    is the text exposition format.
+    """
+
+    def __init__(self):
+        self.started = time.time()
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self.gauges[_key(name, labels)] = value
+
+    def observe(self, name, value, **labels):
+        key = _key(name, labels)
+        with self._lock:
+            if key not in self.histograms:
+                self.histograms[key] = Histogram()
+            self.histograms[key].observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def timed(self, name, **labels):
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def report(self):
+        def series(items, value):
+            return [{'name': name, 'labels': dict(labels), **value(item)} for (name, labels), item in sorted(items, key=lambda entry: entry[0])]
+
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed': time.time() - self.started,
+                'counters': series(self.counters.items(), lambda value: {'value': value}),
+                'gauges': series(self.gauges.items(), lambda value: {'value': value}),
+                'timers': series(self.histograms.items(), lambda histogram: histogram.summary()),
+            }
+
+    def write_json(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.report(), f, indent=4)
+        os.replace(tmp_path, path)
+
+    def prometheus_text(self, prefix='scraper_'):
+        lines = []
+        with self._lock:
+            for kind, series in (('counter', self.counters), ('gauge', self.gauges)):
+                for name in sorted({name for name, _ in series}):
+                    metric = prefix + name + ('_total' if kind == 'counter' else '')
+                    lines.append(f"# TYPE {metric} {kind}")
+                    for (series_name, labels), value in sorted(series.items()):
+                        if series_name == name:
+                            lines.append(f"{metric}{_label_text(labels)} {value}")
+            for name in sorted({name for name, _ in self.histograms}):
+                metric = prefix + name + '_seconds'
+                lines.append(f"# TYPE {metric} histogram")
+                for (series_name, labels), histogram in sorted(self.histograms.items()):
+                    if series_name != name:
+                        continue
+                    for bound, count in zip(BUCKETS, histogram.buckets):
+                        lines.append(f"{metric}_bucket{_label_text(labels, [('le', bound)])} {count}")
+                    lines.append(f"{metric}_bucket{_label_text(labels, [('le', '+Inf')])} {histogram.count}")
+                    lines.append(f"{metric}_sum{_label_text(labels)} {histogram.total}")
+                    lines.append(f"{metric}_count{_label_text(labels)} {histogram.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path):
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(self.prometheus_text())
+        os.replace(tmp_path, path)
+
+
+# The registry the scraper modules share
+metrics = Metrics()
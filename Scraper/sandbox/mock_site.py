@@ -0,0 +1,210 @@
+import argparse
+import json
+import random
+import threading
+import time
+from html import escape
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from unidecode import unidecode
+from bench_pipeline import EVENTBRITE_CARD, EVENTBRITE_EVENT, FACEBOOK_CARD, FACEBOOK_EVENT, PAGINATION
+from scraper import SOURCES
+
+EVENT_COUNT = 200
+FEED_BATCH = 20  # Facebook cards per scroll
+LISTING_PAGE_SIZE = 20
+
+VENUES = [
+    ('Centre Bell', 45.4961, -73.5693),
+    ('Salle Pierre-Mercure', 45.5136, -73.5623),
+    ('MTELUS', 45.5104, -73.5634),
+    ('Olympia de Montréal', 45.5166, -73.5548),
+    ('Place des Arts', 45.5085, -73.5665),
+    ('Parc Jean-Drapeau', 45.5088, -73.5280),
+]
+TITLE_WORDS = ['Jazz', 'Night', 'Market', 'Comedy', 'Festival', 'Vinyl', 'Salsa', 'Tech', 'Meetup', 'Brunch', 'Open Mic', 'Cinema', 'Yoga']
+# The date formats both sites print, English and French
+DATE_FORMATS = [
+    '{weekday}, {month} {day}, 2024 AT {hour}:00 PM – {end}:00 PM EDT',
+    'Débute le sam., {day} mars 2024 {hour}:30 EDT',
+    '{month} {day} · {hour}pm - {end}pm EDT',
+]
+WEEKDAYS = ['MONDAY', 'TUESDAY', 'WEDNESDAY', 'THURSDAY', 'FRIDAY', 'SATURDAY', 'SUNDAY']
+MONTHS = ['MARCH', 'APRIL', 'MAY', 'JUNE']
+
+FEED_SCRIPT = '''<script>
+let loaded = {loaded}, loading = false;
+window.addEventListener('scroll', async () => {{
+    if (loading || loaded >= {total} || window.innerHeight + window.scrollY < document.body.scrollHeight - 200) return;
+    loading = true;
+    const response = await fetch('/_feed?offset=' + loaded);
+    document.getElementById('feed').insertAdjacentHTML('beforeend', await response.text());
+    loaded += {batch};
+    loading = false;
+}});
+</script>'''
+
+
+def synthetic_events(count=EVENT_COUNT, seed=0):
+    rng = random.Random(seed)
+    events = []
+    for index in range(count):
+        venue, latitude, longitude = rng.choice(VENUES)
+        hour = rng.randint(6, 9)
+        events.append({
+            'Title': f"{' '.join(rng.sample(TITLE_WORDS, 2))} #{index}",
+            'Date': rng.choice(DATE_FORMATS).format(weekday=rng.choice(WEEKDAYS), month=rng.choice(MONTHS), day=rng.randint(1, 28), hour=hour, end=hour + 2),
+            'Description': f"Synthetic event {index} at {venue}.",
+            'Location': venue,
+            'Latitude': latitude,
+            'Longitude': longitude,
+            'Price': f"{rng.randint(0, 80)},00 $",
+        })
+    return events
+
+
+class MockSite:
+    """A local stand-in for Facebook, Eventbrite and Nominatim.
+
+    Serves the explore feed (infinite scroll, FEED_BATCH cards at a time),
+    Eventbrite listings (?page=N, a pagination bar and a Next link), detail
+    pages with the class names the scrapers read, and /search and /reverse in
+    Nominatim's JSON format. Pages take `latency` seconds (±50%) and event
+    pages fail with a 500 at `error_rate`.
+    """
+
+    def __init__(self, events=None, latency=0.0, error_rate=0.0, host='127.0.0.1', port=0, seed=0):
+        self.events = events if events is not None else synthetic_events(seed=seed)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rng = random.Random(seed)
+        self.venues = {venue: (latitude, longitude) for venue, latitude, longitude in VENUES}
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def facebook_url(self, slug='montreal'):
+        return f"{self.base_url}/events/explore/{slug}/"
+
+    def eventbrite_url(self, slug='montreal'):
+        return f"{self.base_url}/d/{slug}/all-events/"
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _delay(self):
+        if self.latency:
+            time.sleep(self.latency * (0.5 + self.rng.random()))
+
+    def _fields(self, event):
+        return {key: escape(str(event[key])) for key in ('Title', 'Date', 'Description', 'Location', 'Price')}
+
+    def _feed_cards(self, offset):
+        card_class = SOURCES[0]['selectors']['event']['class']
+        return ''.join(
+            # min-height so that every batch makes the page scroll
+            FACEBOOK_CARD.format(card=card_class, url=f"{self.base_url}/events/{index}/", title=self._fields(event)['Title']).replace('<div ', '<div style="min-height: 120px" ', 1)
+            for index, event in enumerate(self.events[offset:offset + FEED_BATCH], start=offset)
+        )
+
+    def facebook_feed(self):
+        script = FEED_SCRIPT.format(loaded=FEED_BATCH, total=len(self.events), batch=FEED_BATCH)
+        return f'<html><body><div id="feed">{self._feed_cards(0)}</div>{script}</body></html>'
+
+    def eventbrite_listing(self, page):
+        card_class = SOURCES[1]['selectors']['event']['class']
+        page_count = max(1, -(-len(self.events) // LISTING_PAGE_SIZE))
+        first = (page - 1) * LISTING_PAGE_SIZE
+        cards = [
+            EVENTBRITE_CARD.format(card=card_class, url=f"{self.base_url}/e/{index}", **{key.lower(): value for key, value in self._fields(event).items() if key != 'Description'})
+            for index, event in enumerate(self.events[first:first + LISTING_PAGE_SIZE], start=first)
+        ]
+        if page <= page_count:
+            cards.append(PAGINATION.format(page=page, page_count=page_count))
+        if page < page_count:
+            cards.append(f'<a href="?page={page + 1}">Next</a>')
+        return '<html><body>' + ''.join(cards) + '</body></html>'
+
+    def event_page(self, template, index):
+        fields = self._fields(self.events[index])
+        return template.format(title=fields['Title'], date=fields['Date'], description=fields['Description'], location=fields['Location'])
+
+    def geocode(self, query):
+        # The geocoder sends queries through unidecode
+        for venue, (latitude, longitude) in self.venues.items():
+            if unidecode(venue).lower() in unidecode(query).lower():
+                return [self._place(venue, latitude, longitude)]
+        return []
+
+    def _place(self, name, latitude, longitude):
+        return {'lat': str(latitude), 'lon': str(longitude), 'display_name': f"{name}, Montréal, Québec, Canada", 'address': {'city': 'Montréal', 'country_code': 'ca'}}
+
+    def _handler(self):
+        site = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def _send(self, status, body, content_type='text/html; charset=utf-8'):
+                data = body.encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                parts = urlsplit(self.path)
+                path = parts.path.rstrip('/').split('/')[1:]
+                query = {name: values[0] for name, values in parse_qs(parts.query).items()}
+
+                if path[:1] == ['search']:
+                    return self._send(200, json.dumps(site.geocode(query.get('q', ''))), 'application/json')
+                if path[:1] == ['reverse']:
+                    latitude, longitude = float(query['lat']), float(query['lon'])
+                    return self._send(200, json.dumps(site._place('Downtown', latitude, longitude)), 'application/json')
+                if path[:1] == ['_feed']:
+                    return self._send(200, site._feed_cards(int(query.get('offset', 0))))
+
+                site._delay()
+                if path[:2] == ['events', 'explore']:
+                    return self._send(200, site.facebook_feed())
+                if path[:1] == ['d'] and path[-1:] == ['all-events']:
+                    return self._send(200, site.eventbrite_listing(int(query.get('page', 1))))
+
+                is_event = len(path) >= 2 and path[0] in ('events', 'e') and path[1].isdigit() and int(path[1]) < len(site.events)
+                if not is_event:
+                    return self._send(404, '<html><body>Not found</body></html>')
+                if site.rng.random() < site.error_rate:
+                    return self._send(500, '<html><body>Something went wrong</body></html>')
+                template = FACEBOOK_EVENT if path[0] == 'events' else EVENTBRITE_EVENT
+                return self._send(200, site.event_page(template, int(path[1])))
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve a local mock of the Facebook and Eventbrite event pages and of Nominatim")
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--events', type=int, default=EVENT_COUNT)
+    parser.add_argument('--latency', type=float, default=0.0, help="seconds per page, ±50%%")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of event pages answered with a 500")
+    args = parser.parse_args()
+
+    site = MockSite(synthetic_events(args.events), args.latency, args.error_rate, port=args.port)
+    print(f"Facebook feed: {site.facebook_url()}")
+    print(f"Eventbrite listing: {site.eventbrite_url()}")
+    print(f"Nominatim: {site.base_url}/search")
+    site.server.serve_forever()
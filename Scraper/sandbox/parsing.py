@@ -0,0 +1,132 @@
+import json
+from bs4 import BeautifulSoup, SoupStrainer
+from bs4.element import Tag
+
+try:
+    import lxml  # noqa: F401
+    PARSER = 'lxml'
+except ImportError:
+    PARSER = 'html.parser'
+
+try:
+    from selectolax.lexbor import LexborHTMLParser as HTMLParser
+except ImportError:
+    try:
+        from selectolax.parser import HTMLParser
+    except ImportError:
+        HTMLParser = None
+
+
+def make_soup(markup, parse_only=None, parser=None):
+    # lxml is several times faster than html.parser and builds the same tree for our selectors
+    return BeautifulSoup(markup, parser or PARSER, parse_only=parse_only)
+
+
+def available_backends():
+    backends = ['html.parser']
+    if PARSER == 'lxml':
+        backends.append('lxml')
+    if HTMLParser is not None:
+        backends.append('selectolax')
+    return backends
+
+
+def _classes(selector):
+    return frozenset((selector.get('class') or '').split())
+
+
+def _css(tag, classes):
+    return tag + ''.join('.' + name for name in sorted(classes))
+
+
+def _has_classes(classes):
+    # A class_ filter with CSS semantics: the element has all of classes, and maybe others.
+    # BeautifulSoup also calls it with the element's whole class string, which is the call that matters.
+    return lambda value: not classes or (value is not None and classes.issubset(value.split()))
+
+
+class SelectorPlan:
+    """A `selectors` dict compiled for listing pages.
+
+    extract(markup) returns one (event_info, href) pair per card, like the
+    per-field find() loop it replaces, but each card subtree is walked once
+    and, for the BeautifulSoup backends, only the cards are built at all
+    (SoupStrainer). ImageURL yields the src attribute, other fields the text.
+    Every backend, and card_css, matches an element carrying all of a
+    selector's classes, whatever other classes it has.
+    """
+
+    def __init__(self, selectors, backend=None):
+        self.backend = backend or ('selectolax' if HTMLParser is not None else PARSER)
+        if self.backend not in available_backends():
+            raise ValueError(f"Parser backend {self.backend!r} is not installed")
+        card = selectors['event']
+        self.card_tag = card['tag']
+        self.card_classes = _classes(card)
+        self.fields = [
+            (key, selector['tag'], _classes(selector), 'src' if key == 'ImageURL' else None)
+            for key, selector in selectors.items() if key != 'event'
+        ]
+        self.card_filter = _has_classes(self.card_classes)
+        self.strainer = SoupStrainer(self.card_tag, class_=self.card_filter)
+        self.card_css = _css(self.card_tag, self.card_classes)
+        self.field_css = {key: _css(tag, classes) for key, tag, classes, _ in self.fields}
+
+    def _matches(self, element, tag, classes):
+        return element.name == tag and classes.issubset(element.get('class') or ())
+
+    def _extract_card(self, card):
+        event_info = {key: None for key, _, _, _ in self.fields}
+        href = None
+        remaining = list(self.fields)
+        for element in card.descendants:
+            if not isinstance(element, Tag):
+                continue
+            if href is None and element.name == 'a' and element.get('href'):
+                href = element['href']
+            matched = [field for field in remaining if self._matches(element, field[1], field[2])]
+            for key, tag, classes, attr in matched:
+                event_info[key] = element.get(attr) if attr else element.text.strip()
+            for field in matched:
+                remaining.remove(field)
+            if not remaining and href is not None:
+                break
+        return event_info, href
+
+    def _extract_selectolax(self, markup):
+        cards = []
+        for card in HTMLParser(markup).css(self.card_css):
+            link = card.css_first('a[href]')
+            if link is None:
+                continue
+            event_info = {}
+            for key, _, _, attr in self.fields:
+                node = card.css_first(self.field_css[key])
+                if node is None:
+                    event_info[key] = None
+                else:
+                    event_info[key] = node.attributes.get(attr) if attr else node.text().strip()
+            cards.append((event_info, link.attributes['href']))
+        return cards
+
+    def extract(self, markup):
+        if self.backend == 'selectolax':
+            return self._extract_selectolax(markup)
+
+        soup = make_soup(markup, parse_only=self.strainer, parser=self.backend)
+        cards = []
+        for card in soup.find_all(self.card_tag, class_=self.card_filter):
+            event_info, href = self._extract_card(card)
+            if href is not None:
+                cards.append((event_info, href))
+        return cards
+
+
+_plans = {}
+
+
+def compile_plan(selectors, backend=None):
+    key = (json.dumps(selectors, sort_keys=True), backend)
+    if key not in _plans:
+        _plans[key] = SelectorPlan(selectors, backend)
+    return _plans[key]
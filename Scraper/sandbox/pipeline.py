@@ -0,0 +1,74 @@
+import asyncio
+import time
+from metrics import metrics
+
+QUEUE_SIZE = 32
+
+_DONE = object()
+
+
+class Stage:
+    """One step of a pipeline: `concurrency` copies of an async function.
+
+    work(item) returns what to hand to the next stage, or None to drop the
+    item. Each stage reads from an inbox of at most queue_size items, so a slow
+    stage holds back the ones before it instead of letting work pile up.
+    """
+
+    def __init__(self, name, work, concurrency=1, queue_size=QUEUE_SIZE):
+        self.name = name
+        self.work = work
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+
+
+async def _worker(stage, inbox, outbox):
+    while True:
+        item = await inbox.get()
+        if item is _DONE:
+            return
+        started = time.perf_counter()
+        try:
+            result = await stage.work(item)
+        except Exception as e:
+            print(f"Stage {stage.name} failed on {item!r}: {e}")
+            metrics.inc('stage_errors', stage=stage.name)
+            result = None
+        metrics.observe('stage', time.perf_counter() - started, stage=stage.name)
+        if result is not None and outbox is not None:
+            await outbox.put(result)
+
+
+async def _produce(producer, outbox):
+    try:
+        async for item in producer:
+            await outbox.put(item)
+    except Exception as e:
+        # One broken source must not stop the others
+        print(f"Producer failed: {e}")
+        metrics.inc('producer_errors')
+
+
+async def run_pipeline(producers, stages):
+    """Feed the items of every async iterable in producers through stages.
+
+    Producers run side by side into the first stage; returns once every
+    item has left the last one.
+    """
+    inboxes = [asyncio.Queue(maxsize=stage.queue_size) for stage in stages]
+    outboxes = inboxes[1:] + [None]
+
+    async def run_stage(stage, inbox, outbox, next_stage):
+        await asyncio.gather(*(_worker(stage, inbox, outbox) for _ in range(stage.concurrency)))
+        if next_stage is not None:
+            for _ in range(next_stage.concurrency):
+                await outbox.put(_DONE)
+
+    stage_tasks = [
+        asyncio.create_task(run_stage(stage, inbox, outbox, next_stage))
+        for stage, inbox, outbox, next_stage in zip(stages, inboxes, outboxes, stages[1:] + [None])
+    ]
+    await asyncio.gather(*(_produce(producer, inboxes[0]) for producer in producers))
+    for _ in range(stages[0].concurrency):
+        await inboxes[0].put(_DONE)
+    await asyncio.gather(*stage_tasks)
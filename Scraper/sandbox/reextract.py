@@ -0,0 +1,90 @@
+import argparse
+import os
+import time
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from archive import ARCHIVE_DIR, PageArchive
+from parsing import make_soup
+from scraper import SOURCES, EventbriteProducer, FacebookProducer, geocoder, parse_eventbrite_event_page, parse_eventbrite_listing, parse_facebook_event_page
+from seen_index import normalize_url
+from sinks import FORMATS, open_sinks
+
+KINDS = ('facebook_event', 'eventbrite_listing', 'eventbrite_event')
+CHUNK_SIZE = 16
+SOURCES_BY_NAME = {source['name']: source for source in SOURCES}
+
+worker_archive = None
+
+
+def open_worker_archive(root):
+    global worker_archive
+    worker_archive = PageArchive(root)
+
+
+def extract_page(page):
+    # One archived page through the scraper's own parsers; runs in a worker process.
+    # -> (kind, url, event fields or listing cards)
+    source_url, kind, fetched_at, digest = page
+    html = worker_archive.get(digest)
+    # Dates without a year are read as of the fetch, not as of today
+    fetched = datetime.fromtimestamp(fetched_at)
+    if kind == 'facebook_event':
+        return kind, source_url, parse_facebook_event_page(make_soup(html), source_url, fetched)
+    if kind == 'eventbrite_event':
+        return kind, source_url, parse_eventbrite_event_page(make_soup(html), source_url, fetched)
+    return kind, source_url, parse_eventbrite_listing(html, SOURCES_BY_NAME['Eventbrite']['selectors'])
+
+
+def reextract(root=ARCHIVE_DIR, workers=None):
+    # -> [(source name, event)] from the newest archived copy of every page
+    archive = PageArchive(root)
+    pages = archive.latest(KINDS)
+    archive.close()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=open_worker_archive, initargs=(root,)) as executor:
+        results = list(executor.map(extract_page, pages, chunksize=CHUNK_SIZE))
+
+    # Eventbrite events start from their listing card, as in iter_eventbrite_details
+    cards = {}
+    for kind, _, listing_cards in results:
+        if kind == 'eventbrite_listing':
+            for card, event_link in listing_cards:
+                cards[normalize_url(event_link)] = card
+
+    events = []
+    for kind, source_url, details in results:
+        if kind == 'facebook_event' and details is not None:
+            events.append(('Facebook', details))
+        elif kind == 'eventbrite_event':
+            event_info = dict(cards.get(normalize_url(source_url), {}))
+            event_info.update(details)
+            events.append(('Eventbrite', event_info))
+    return events
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-run the page parsers over the page archive, without a browser")
+    parser.add_argument('archive', nargs='?', default=ARCHIVE_DIR)
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--geocode', action='store_true', help="geocode the events again (cache and gazetteer first, as in a crawl)")
+    parser.add_argument('--output', type=lambda value: value.split(','), default=['json'], help=f"comma-separated output formats out of {', '.join(FORMATS)} (default: json)")
+    parser.add_argument('--stem', default='reextracted_events', help="output file name without extension (default: %(default)s)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    events = reextract(args.archive, args.workers)
+    print(f"Re-extracted {len(events)} events in {time.perf_counter() - started:.1f}s")
+
+    producers = {'Facebook': FacebookProducer(SOURCES_BY_NAME['Facebook']), 'Eventbrite': EventbriteProducer(SOURCES_BY_NAME['Eventbrite'])}
+    sink = open_sinks(args.output, args.stem)
+    for source_name, event_info in events:
+        if args.geocode:
+            producer = producers[source_name]
+            producer.finish(event_info, producer.locate(event_info).result())
+        sink.write(event_info)
+    sink.close()
+    geocoder.close()
+
+
+if __name__ == "__main__":
+    main()
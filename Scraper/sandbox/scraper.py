@@ -1,484 +1,849 @@
+import argparse
+import asyncio
 import json
+import os
 import re
-import time
-from datetime import datetime
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from fuzzywuzzy import fuzz
-from selenium.webdriver.chrome.options import Options
-import geopy
-from geopy.geocoders import Nominatim
-from unidecode import unidecode
-
-def calculate_similarity(str1, str2):
-    return fuzz.token_sort_ratio(str1, str2)
-
-def scroll_to_bottom(driver, max_scroll=10):
-    for _ in range(max_scroll):
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
-
-def format_date(date_str, source):
-    if date_str is None:
-        return None
-
-    date_str_lower = date_str.lower()
-    source_lower = source.lower()
-    # Facebook: SUNDAY, MARCH 3, 2024
-    if source_lower == 'facebook':
-        formatted_date = datetime.strptime(date_str, '%A, %B %d, %Y')
-        return formatted_date
-    # Eventbrite: Sunday, March 3
-    elif source_lower == 'eventbrite':
-        formatted_date = datetime.strptime(date_str, '%a, %b %d, %Y %I:%M %p - %a, %b %d, %Y %I:%M %p %Z')
-        return formatted_date
-    else:
-        return None
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from archive import PageArchive
+from browser import BrowserPool, TabPolicy, create_driver, scroll_until_loaded
+from dates import iso_date, read_dates
+from dedup import DedupEngine, cluster_summary
+from geocache import GeocodeCache
+from geocoding import GeocodingService, resolved
+from http_fetch import HttpFetcher, page_url
+from parsing import compile_plan, make_soup
+from pipeline import QUEUE_SIZE, Stage, run_pipeline
+from journal import JOURNAL_FILE, Journal
+from metrics import metrics
+from seen_index import SEEN_FILE, STALE_AFTER, SeenIndex, normalize_url
+from sinks import FORMATS, open_sinks
+from store import EventStore
+from structured import extract_structured_event, iso_time
+from waits import EVENTBRITE_EVENT_OPTIONAL, EVENTBRITE_EVENT_REQUIRED, FACEBOOK_EVENT_OPTIONAL, FACEBOOK_EVENT_REQUIRED, LatencyLog, WaitPolicy
+from gazetteer import GAZETTEER_FILE, load_gazetteer
+
+geocode_cache = GeocodeCache()
+gazetteers = {GAZETTEER_FILE: load_gazetteer()}  # offline indexes by path, each opened once
+geocoder = GeocodingService(geocode_cache, local=gazetteers[GAZETTEER_FILE])
+page_latency = LatencyLog()
+facebook_event_waits = WaitPolicy('facebook_event', FACEBOOK_EVENT_REQUIRED, FACEBOOK_EVENT_OPTIONAL, page_latency)
+eventbrite_event_waits = WaitPolicy('eventbrite_event', EVENTBRITE_EVENT_REQUIRED, EVENTBRITE_EVENT_OPTIONAL, page_latency)
+PAGINATION_CSS = '[data-spec*="pagination"], [data-testid*="pagination"], [class*="pagination"]'
+PAGE_COUNT = re.compile(r'\b\d+\s+(?:of|sur|de)\s+(\d+)\b')
+GEOCODE_CONCURRENCY = 16  # events waiting on the geocoder at once; cache and gazetteer hits return immediately
+
+# Set by main() with --archive; every page the parsers read is kept there
+page_archive = None
+
+def archive_page(url, kind, html):
+    if page_archive is not None and html:
+        page_archive.put(url, kind, html)
+    return html
 
 def get_coordinates(location):
     if location is None:
         print("Location is None!")
         return None, None
 
-    location = str(location)
-
-    print("Location before unidecode:", location)
-    location = unidecode(location)
-    print("Location after unidecode:", location)
-
-    geolocator = Nominatim(user_agent="event_scraper")
-    retries = 3
-    delay = 2
-
-    for _ in range(retries):
-        try:
-            location = geolocator.geocode(location, addressdetails=True)
-            if location:
-                latitude = location.latitude
-                longitude = location.longitude
-                return latitude, longitude
-            else:
-                return None, None
-        except geopy.exc.GeocoderUnavailable as e:
-            time.sleep(delay)
-
-    return None, None
+    with metrics.timer('geocode', call='get_coordinates'):
+        coordinates = geocoder.geocode(location).result()
+    return coordinates if coordinates is not None else (None, None)
 
 
 def open_google_maps(latitude, longitude):
     google_maps_url = f"https://www.google.com/maps/search/?api=1&query={latitude},{longitude}"
     return google_maps_url
 
-def get_location_details(latitude, longitude):
-    geolocator = Nominatim(user_agent="event_scraper")
-    retries = 3
-    delay = 2
-
-    for _ in range(retries):
-        try:
-            location = geolocator.reverse((latitude, longitude), language='en', addressdetails=True)
-            if location:
-                address = location.raw['address']
-                city = address.get('city', None)
-                country_code = address.get('country_code', None)
-                return address, city, country_code
-            else:
-                return None, None, None
-        except geopy.exc.GeocoderUnavailable as e:
-            time.sleep(delay)
+def location_details_from(details):
+    if details is None:
+        return None, None, None
 
-    return None, None, None
+    address = details['address']
+    return address, address.get('city', None), address.get('country_code', None)
 
+def get_location_details(latitude, longitude):
+    with metrics.timer('geocode', call='get_location_details'):
+        details = geocoder.reverse(latitude, longitude).result()
+    return location_details_from(details)
 
-#### FACEBOOK ####
-def scrape_facebook_events(driver, url, selectors, max_scroll=10):
-    driver.get(url)
-    driver.implicitly_wait(20)
-
-    all_events = []
-    unique_event_titles = set()
-
-    scroll_to_bottom(driver, max_scroll)
-
-    page_content = driver.page_source
-    webpage = BeautifulSoup(page_content, 'html.parser')
-    events = webpage.find_all(selectors['event']['tag'], class_=selectors['event'].get('class'))
 
-    for event in events:
-        event_link = event.find('a', href=True)
-        if not event_link:
-            continue
+#### FACEBOOK ####
+def fill_facebook_location(location, coordinates, details, fallback=(None, None)):
+    # fallback: the crawled city's (City, CountryCode), for places the reverse geocoder did not find
+    latitude, longitude = coordinates if coordinates is not None else (None, None)
+    address, city, country_code = location_details_from(details)
+
+    location['Latitude'] = latitude
+    location['Longitude'] = longitude
+    location['GoogleMaps_URL'] = open_google_maps(latitude, longitude)
+    location['Address'] = address
+    location['City'] = city
+    location['CountryCode'] = country_code
+
+    if city is None and country_code is None:
+        location['City'], location['CountryCode'] = fallback
+
+def find_text(page, tag, class_):
+    element = page.find(tag, class_=class_)
+    return element.text.strip() if element else None
+
+def find_attr(page, tag, class_, attr):
+    element = page.find(tag, class_=class_)
+    return element.get(attr) if element else None
+
+def parse_facebook_event_page(event_page, event_url, reference=None):
+    # reference: when the page was fetched, for dates without a year (default today)
+    # schema.org data first; the obfuscated class names only for what it lacks
+    structured = extract_structured_event(event_page)
+
+    event_title = structured.get('Title') or find_text(event_page, 'span', 'x1lliihq x6ikm8r x10wlt62 x1n2onr6')
+    if not event_title:
+        return None
 
-        event_url = 'https://www.facebook.com' + event_link['href'] if event_link['href'].startswith('/') else event_link['href']
+    location_text = structured.get('Location')
+    if location_text is None:
+        location_text = find_text(event_page, 'div', 'x1i10hfl xjbqb8w x1ejq31n xd10rxx x1sy0etr x17r0tee x972fbf xcfux6l x1qhh985 xm0m39n x9f619 x1ypdohk xt0psk2 xe8uvvx xdj266r x11i5rnm xat24cr x1mh8g0r xexx8yu x4uap5 x18d9i69 xkhd6sd x16tdsg8 x1hl2dhg xggy1nq x1a2a7pz xt0b8zv xzsf02u x1s688f') or find_text(event_page, 'span', 'xt0psk2')
+
+    address = find_text(event_page, 'span', 'x193iq5w xeuugli x13faqbe x1vvkbs xlh3980 xvmahel x1n0sxbx x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x3x7a5m x1f6kntn xvq8zen xo1l8bm xi81zsa x1yc453h')
+
+    # City and country are filled in by fill_facebook_location, and the
+    # coordinates too unless the page already carried them
+    location_details = {
+        'Location': {
+            'Location': location_text,
+            'Address': address,
+            'Latitude': structured.get('Latitude'),
+            'Longitude': structured.get('Longitude'),
+            'GoogleMaps_URL': None,
+            'City': None,
+            'CountryCode': None
+        }
+    }
 
-        driver.get(event_url)
-        time.sleep(1)
+    date_text = find_text(event_page, 'div', 'x1e56ztr x1xmf6yo')
 
-        event_page_content = driver.page_source
-        event_page = BeautifulSoup(event_page_content, 'html.parser')
+    if 'StartDateTime' in structured:
+        start_time, end_time = iso_time(structured.get('StartDateTime')), iso_time(structured.get('EndDateTime'))
+        start_datetime, end_datetime = structured.get('StartDateTime'), structured.get('EndDateTime')
+    else:
+        with metrics.timer('normalize_dates'):
+            start, end, start_time, end_time = read_dates(date_text, reference)
+        start_datetime, end_datetime = iso_date(start, start_time), iso_date(end, end_time)
+
+    organizer = find_text(event_page, 'span', 'xt0psk2')
+
+    return {
+        'Title': event_title,
+        'Description': structured.get('Description') or find_text(event_page, 'div', 'xdj266r x11i5rnm xat24cr x1mh8g0r x1vvkbs'),
+        'Date': date_text,
+        **location_details,
+        'ImageURL': structured.get('ImageURL') or find_attr(event_page, 'img', 'xz74otr x1ey2m1c x9f619 xds687c x5yr21d x10l6tqk x17qophe x13vifvy xh8yej3', 'src'),
+        'Organizer': structured.get('Organizer') or organizer,
+        'Organizer_IMG': find_attr(event_page, 'img', 'xz74otr', 'src'),
+        'EventUrl': event_url,
+        'StartTime': start_time,
+        'EndTime': end_time,
+        'StartDateTime': start_datetime,
+        'EndDateTime': end_datetime
+    }
+
+def fetch_facebook_event(driver, event_url):
+    facebook_event_waits.load(driver, event_url)
+
+    page_content = archive_page(event_url, 'facebook_event', driver.page_source)
+    with metrics.timer('parse', kind='facebook_event'):
+        event_page = make_soup(page_content)
+        return parse_facebook_event_page(event_page, event_url)
+
+def split_seen(items, seen, url_of=lambda item: item):
+    # Drop repeated URLs (the same event is listed with different aff= params),
+    # then reuse whatever the incremental index already has fresh
+    unique_items = {}
+    for item in items:
+        unique_items.setdefault(normalize_url(url_of(item)), item)
+    items = list(unique_items.values())
+    if seen is None:
+        return [], items
+    reused, remaining = seen.split(items, url_of)
+    metrics.inc('events_reused', len(reused))
+    return reused, remaining
+
+def fetch_details(fetch, urls, driver, pool=None, journal=None, source=None, fetch_all=None):
+    # Yields fetch(driver, url) for each url in order: from the pool when there
+    # is one, otherwise through this browser (or fetch_all(urls), in order, when
+    # given). Pages already in the journal are not fetched again, and new ones
+    # are journaled as soon as they are parsed.
+    done = journal.events(source) if journal is not None else {}
+    missing = [url for url in urls if normalize_url(url) not in done]
+    if fetch_all is not None:
+        fetched = fetch_all(missing)
+    elif pool:
+        fetched = pool.imap(fetch, missing)
+    else:
+        fetched = (fetch(driver, url) for url in missing)
 
-        event_title_elem = event_page.find('span', class_='x1lliihq x6ikm8r x10wlt62 x1n2onr6')
-        if event_title_elem:
-            event_title = event_title_elem.text.strip()
-            # if any(calculate_similarity(event_title, existing_title) >= 90 for existing_title in unique_event_titles):
-            if any(event_title == existing_title for existing_title in unique_event_titles):
-                continue
-        else:
+    for url in urls:
+        if normalize_url(url) in done:
+            yield done[normalize_url(url)]
             continue
+        result = next(fetched)
+        if journal is not None and result is not None:
+            journal.record_event(source, url, result)
+        yield result
+
+def drain_geocoded(pending, finish, wait=False):
+    # Yields events from the front of `pending` (event_info, future) whose
+    # geocoding is done, in scrape order; with wait=True, all of them
+    while pending and (wait or pending[0][1].done()):
+        event_info, future = pending.popleft()
+        with metrics.timer('geocode_wait'):
+            located = future.result()
+        finish(event_info, located)
+        yield event_info
+
+def facebook_listing(driver, url, selectors, max_scroll=30, journal=None, target_count=None):
+    # -> event page URLs from the feed, or from the journal when resuming
+    if journal is not None and journal.listing_done('Facebook'):
+        return [event_url for cards in journal.pages('Facebook').values() for event_url in cards]
+
+    plan = compile_plan(selectors)
+    WaitPolicy('facebook_feed', {'Cards': plan.card_css}, log=page_latency).load(driver, url)
+
+    with metrics.timer('scroll', kind='facebook_feed'):
+        produced = scroll_until_loaded(driver, plan.card_css, max_scroll, target_count)
+    print(f"Facebook: {sum(produced)} new cards over {len(produced)} scrolls {produced}")
+    metrics.inc('scrolls', len(produced), kind='facebook_feed')
+    metrics.inc('cards_loaded', sum(produced), kind='facebook_feed')
+
+    event_urls = []
+    page_content = archive_page(url, 'facebook_feed', driver.page_source)
+    with metrics.timer('parse', kind='facebook_feed'):
+        cards = plan.extract(page_content)
+    for _, event_href in cards:
+        event_url = 'https://www.facebook.com' + event_href if event_href.startswith('/') else event_href
+        event_urls.append(event_url)
+
+    if journal is not None:
+        journal.record_page('Facebook', 1, event_urls)
+        journal.record_listing_done('Facebook')
+    return event_urls
+
+def iter_facebook_events(driver, url, selectors, max_scroll=30, pool=None, seen=None, journal=None, target_count=None, city=None):
+    unique_event_titles = set()
+    pending_locations = deque()
+    fallback = city_defaults(city)
 
-        location_div = event_page.find('div', class_='x1i10hfl xjbqb8w x1ejq31n xd10rxx x1sy0etr x17r0tee x972fbf xcfux6l x1qhh985 xm0m39n x9f619 x1ypdohk xt0psk2 xe8uvvx xdj266r x11i5rnm xat24cr x1mh8g0r xexx8yu x4uap5 x18d9i69 xkhd6sd x16tdsg8 x1hl2dhg xggy1nq x1a2a7pz xt0b8zv xzsf02u x1s688f')
-        location_span = event_page.find('span', class_='xt0psk2')
-
-        location_text = location_div.text.strip() if location_div else (location_span.text.strip() if location_span else None)
-
-        if location_text:
-            latitude, longitude = get_coordinates(location_text)
-        else:
-            latitude, longitude = None, None
-
-        latitude, longitude = get_coordinates(location_text)
-
-        google_maps_url = open_google_maps(latitude, longitude)
-
-        address_span = event_page.find('span', class_='x193iq5w xeuugli x13faqbe x1vvkbs xlh3980 xvmahel x1n0sxbx x1lliihq x1s928wv xhkezso x1gmr53x x1cpjm7i x1fgarty x1943h6x x4zkp8e x3x7a5m x1f6kntn xvq8zen xo1l8bm xi81zsa x1yc453h')
-        address = address_span.text.strip() if address_span else None
+    def finish(event_info, located):
+        fill_facebook_location(event_info['Location'], *located, fallback)
+        if seen is not None:
+            seen.mark(event_info['EventUrl'], event_info)
 
-        location_details = {
-            'Location': {
-                'Location': location_text,
-                'Address': address,
-                'Latitude': latitude,
-                'Longitude': longitude,
-                'GoogleMaps_URL': google_maps_url,
-                'City': None,
-                'CountryCode': None
-            }
-        }
+    event_urls = facebook_listing(driver, url, selectors, max_scroll, journal, target_count)
 
-        address, city, country_code = get_location_details(latitude, longitude)
+    reused_events, event_urls = split_seen(event_urls, seen)
+    for event_info in reused_events:
+        unique_event_titles.add(event_info['Title'])
+        yield event_info
 
-        location_details['Location']['Address'] = address
-        location_details['Location']['City'] = city
-        location_details['Location']['CountryCode'] = country_code
+    event_infos = fetch_details(fetch_facebook_event, event_urls, driver, pool, journal, 'Facebook')
 
-        if city is None and country_code is None:
-            location_details['Location']['City'] = 'Montreal'
-            location_details['Location']['CountryCode'] = 'ca'
-
-        date_text = event_page.find('div', class_='x1e56ztr x1xmf6yo').text.strip() if event_page.find('div', class_='x1e56ztr x1xmf6yo') else None
+    for event_info in event_infos:
+        if event_info is None:
+            continue
 
-        # StartTime and EndTime with regex
-        if date_text:
-            match = re.search(r'(\d{1,2}:\d{2}\s?[AP]M)\s?–\s?(\d{1,2}:\d{2}\s?[AP]M)', date_text)
-            if match:
-                start_time, end_time = match.groups()
-            else:
-                if "at" in date_text.lower():
-                    start_time = re.search(r'(\d{1,2}:\d{2}\s?[AP]M)', date_text).group(1)
-                    end_time = None
-                else:
-                    start_time, end_time = None, None
-        else:
-            start_time, end_time = None, None
-
-        event_info = {
-            'Title': event_title,
-            'Description': event_page.find('div', class_='xdj266r x11i5rnm xat24cr x1mh8g0r x1vvkbs').text.strip() if event_page.find('div', class_='xdj266r x11i5rnm xat24cr x1mh8g0r x1vvkbs') else None,
-            'Date': date_text,
-            **location_details,
-            'ImageURL': event_page.find('img', class_='xz74otr x1ey2m1c x9f619 xds687c x5yr21d x10l6tqk x17qophe x13vifvy xh8yej3')['src'] if event_page.find('img', class_='xz74otr x1ey2m1c x9f619 xds687c x5yr21d x10l6tqk x17qophe x13vifvy xh8yej3') else None,
-            'Organizer': event_page.find('span', class_='xt0psk2').text.strip() if event_page.find('span', class_='xt0psk2') else None,
-            'Organizer_IMG': event_page.find('img', class_='xz74otr')['src'] if event_page.find('img', class_='xz74otr') else None,
-            'EventUrl': event_url,
-            'StartTime': start_time,
-            'EndTime': end_time
-        }
+        event_title = event_info['Title']
+        # Fuzzy matching happens across sources in main(); this only saves geocoding exact repeats
+        if event_title in unique_event_titles:
+            continue
 
-        all_events.append(event_info)
+        # Geocoded in the background; the event is emitted once that is done
+        location = event_info['Location']
+        known_coordinates = (location['Latitude'], location['Longitude']) if location['Latitude'] is not None else None
+        pending_locations.append((event_info, geocoder.locate(location['Location'], known_coordinates)))
         unique_event_titles.add(event_title)
 
-        driver.back()
+        yield from drain_geocoded(pending_locations, finish)
+
+    yield from drain_geocoded(pending_locations, finish, wait=True)
 
+def scrape_facebook_events(driver, url, selectors, max_scroll=30, pool=None, seen=None, journal=None, target_count=None, city=None):
+    all_events = list(iter_facebook_events(driver, url, selectors, max_scroll, pool, seen, journal, target_count, city))
     return all_events if all_events else None
 
 #### EVENTBRITE ####
 def extract_start_end_time(date_str):
-    if date_str is None:
-        return None, None
-
-    # If "-" is not present in the string, it means it is just a start time
-    if "-" not in date_str:
-        start_time_match = re.search(r'(\d{1,2}:\d{2}\s*(?:AM|PM)?)', date_str)
-        if start_time_match:
-            start_time = start_time_match.group(1)
-            return start_time.strip(), None
+    return read_dates(date_str)[2:]
+
+@metrics.timed('parse', kind='eventbrite_listing')
+def parse_eventbrite_listing(page_content, selectors):
+    # One pass per card over a tree holding only the cards, see parsing.SelectorPlan
+    return compile_plan(selectors).extract(page_content)
+
+def parse_eventbrite_event_page(event_page, event_link, reference=None):
+    event_info = {}
+
+    # schema.org data first; CSS selectors only for the fields it lacks
+    structured = extract_structured_event(event_page)
+
+    title = structured.get('Title') or find_text(event_page, 'h1', 'event-title css-0')
+    description = structured.get('Description') or find_text(event_page, 'p', 'summary')
+    price = structured.get('Price') or find_text(event_page, 'div', 'conversion-bar__panel-info')
+    date = find_text(event_page, 'span', 'date-info__full-datetime')
+    location = structured.get('Location') or find_text(event_page, 'p', 'location-info__address-text')
+
+    tags_elements = event_page.find_all('li', class_='tags-item inline')
+
+    tags = []
+    for tag_element in tags_elements:
+        tag_link = tag_element.find('a')
+        if tag_link:
+            tag_text = tag_link.text.strip().replace("#", "")  # Remove the "#"
+            tags.append(tag_text)
+
+    event_info['Tags'] = tags
+
+    organizer = structured.get('Organizer') or find_text(event_page, 'a', 'descriptive-organizer-info__name-link')
+    image_url_organizer = event_page.find('svg', class_='eds-avatar__background eds-avatar__background--has-border')
+    if image_url_organizer:
+        image_tag = image_url_organizer.find('image')
+        if image_tag:
+            event_info['Image URL Organizer'] = image_tag.get('xlink:href')
         else:
-            return None, None
-
-    # For events that start and end on different days
-    day_match = re.search(r'(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))\s*-\s*(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))', date_str)
-    if day_match:
-        start_time = day_match.group(1)
-        end_time = day_match.group(2)
-        return start_time.strip(), end_time.strip()
-
-    # Converta os dias da semana para inglês
-    date_str = re.sub(r'\b(?:lun(?:di)?|mon(?:day)?)\b', 'Monday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:mar(?:di)?|tue(?:sday)?)\b', 'Tuesday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:mer(?:credi)?|wed(?:nesday)?)\b', 'Wednesday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:jeu(?:di)?|thu(?:rsday)?)\b', 'Thursday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:ven(?:dredi)?|fri(?:day)?)\b', 'Friday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:sam(?:edi)?|sat(?:urday)?)\b', 'Saturday', date_str, flags=re.IGNORECASE)
-    date_str = re.sub(r'\b(?:dim(?:anche)?|sun(?:day)?)\b', 'Sunday', date_str, flags=re.IGNORECASE)
-
-    # Pattern for start and end time in the same day
-    same_day_match = re.search(r'(\w+, \w+ \d{1,2}, \d{4} \d{1,2}:\d{2} (?:AM|PM))\s*-\s*(\d{1,2}:\d{2} (?:AM|PM))', date_str)
-    if same_day_match:
-        start_time = same_day_match.group(1)
-        end_time = same_day_match.group(2)
-        return start_time.strip(), end_time.strip()
-
-    # AM/PM Format
-    am_pm_match = re.search(r'(\d{1,2}:\d{2}\s*(?:AM|PM))\s*-\s*(\d{1,2}:\d{2}\s*(?:AM|PM))', date_str)
-    if am_pm_match:
-        start_time, end_time = am_pm_match.groups()
-        return start_time.strip(), end_time.strip()
-
-    # 24hrs Format
-    hrs_24_match = re.search(r'(\d{1,2}:\d{2})\s*-\s*(\d{1,2}:\d{2})', date_str)
-    if hrs_24_match:
-        start_time, end_time = hrs_24_match.groups()
-        return start_time.strip(), end_time.strip()
-
-    # Handle times like "9pm" and "11pm"
-    pm_match = re.search(r'(\d{1,2})pm', date_str, flags=re.IGNORECASE)
-    if pm_match:
-        start_hour = int(pm_match.group(1))
-        if start_hour < 12:
-            start_hour += 12
-        start_time = f"{start_hour:02}:00"
-
-        # Assume the event ends after the start time
-        end_hour = start_hour + 2  # Adding 2 hours as a default duration
-        if end_hour >= 24:
-            end_hour -= 12
-        end_time = f"{end_hour:02}:00"
-
-        return start_time.strip(), end_time
-
-    # Handle times like "9am" and "11am"
-    am_match = re.search(r'(\d{1,2})am', date_str, flags=re.IGNORECASE)
-    if am_match:
-        start_hour = int(am_match.group(1))
-        if start_hour == 12:
-            start_hour = 0
-        start_time = f"{start_hour:02}:00"
-
-        # Assume the event ends after the start time
-        end_hour = start_hour + 2  # Adding 2 hours as a default duration
-        if end_hour >= 12:
-            end_hour -= 12
-        end_time = f"{end_hour:02}:00"
-
-        return start_time.strip(), end_time
-
-    return None, None
-
-def get_coordinates(location):
-    if location is None:
-        print("Location is None!")
-        return None, None
-
-    geolocator = Nominatim(user_agent="event_scraper")
-    retries = 3
-    delay = 2
-
-    location = unidecode(location) if location else None
-
-    for _ in range(retries):
-        try:
-            location = geolocator.geocode(location, addressdetails=True)
-            if location:
-                latitude = location.latitude
-                longitude = location.longitude
-                return latitude, longitude
-            else:
-                return None, None
-        except geopy.exc.GeocoderUnavailable as e:
-            time.sleep(delay)
-
-    return None, None
-
-
-def open_google_maps(latitude, longitude):
-    google_maps_url = f"https://www.google.com/maps/search/?api=1&query={latitude},{longitude}"
-    return google_maps_url
-
-def get_previous_page_image_url(driver):
-    url = 'https://www.eventbrite.com/d/canada--montreal/all-events/?page=1'
-
-    driver.get(url)
-
-    if driver.page_source:
-        soup = BeautifulSoup(driver.page_source, 'html.parser')
-        img_tag = soup.find('img', class_='event-card-image')
-
-        if img_tag:
-            return img_tag['src']
-
+            event_info['Image URL Organizer'] = None
+    else:
+        event_info['Image URL Organizer'] = None
+
+    event_info['Title'] = title
+    event_info['Description'] = description
+    event_info['Price'] = price
+    event_info['Date'] = date
+    if 'StartDateTime' in structured:
+        event_info['StartTime'], event_info['EndTime'] = iso_time(structured.get('StartDateTime')), iso_time(structured.get('EndDateTime'))
+        event_info['StartDateTime'] = structured.get('StartDateTime')
+        event_info['EndDateTime'] = structured.get('EndDateTime')
+    else:
+        with metrics.timer('normalize_dates'):
+            start, end, event_info['StartTime'], event_info['EndTime'] = read_dates(date, reference)
+        event_info['StartDateTime'] = iso_date(start, event_info['StartTime'])
+        event_info['EndDateTime'] = iso_date(end, event_info['EndTime'])
+    event_info['Location'] = location
+    event_info['Latitude'] = structured.get('Latitude')
+    event_info['Longitude'] = structured.get('Longitude')
+    event_info['Tags'] = tags
+    event_info['Organizer'] = organizer
+    event_info['EventUrl'] = event_link
+
+    return event_info
+
+def fetch_eventbrite_event(driver, event_link):
+    eventbrite_event_waits.load(driver, event_link)
+
+    page_content = archive_page(event_link, 'eventbrite_event', driver.page_source)
+    with metrics.timer('parse', kind='eventbrite_event'):
+        event_page = make_soup(page_content)
+        return parse_eventbrite_event_page(event_page, event_link)
+
+def listing_page_count(page_content):
+    # "1 of 12" in the pagination bar of a listing page; None when there is none
+    for element in make_soup(page_content).select(PAGINATION_CSS):
+        match = PAGE_COUNT.search(element.get_text(' '))
+        if match:
+            return int(match.group(1))
     return None
 
-def scrape_eventbrite_events(driver, url, selectors, max_pages=40):
-    driver.get(url)
-    driver.implicitly_wait(20)
-
-    all_events = []
-
-    for _ in range(max_pages):
-        page_content = driver.page_source
-        webpage = BeautifulSoup(page_content, 'html.parser')
-        events = webpage.find_all(selectors['event']['tag'], class_=selectors['event'].get('class'))
-
-        for event in events:
-            event_info = {}
-            for key, selector in selectors.items():
-                if key != 'event':
-                    element = event.find(selector['tag'], class_=selector.get('class'))
-                    event_info[key] = element.text.strip() if element else None
-                    if key == 'ImageURL':
-                        img_element = event.find('img', class_='event-card__image')
-                        event_info[key] = img_element['src'] if img_element and 'src' in img_element.attrs else None
-
-            event_link = event.find('a', href=True)['href']
-            driver.get(event_link)
-
-            event_page_content = driver.page_source
-            event_page = BeautifulSoup(event_page_content, 'html.parser')
-
-            title = event_page.find('h1', class_='event-title css-0').text.strip() if event_page.find('h1', class_='event-title css-0') else None
-            description = event_page.find('p', class_='summary').text.strip() if event_page.find('p', class_='summary') else None
-            price = event_page.find('div', class_='conversion-bar__panel-info').text.strip() if event_page.find('div', class_='conversion-bar__panel-info') else None
-            date = event_page.find('span', class_='date-info__full-datetime').text.strip() if event_page.find('span', class_='date-info__full-datetime') else None
-            location_element = event_page.find('p', class_='location-info__address-text')
-            location = location_element.text.strip() if location_element else None
-            ImageURL = get_previous_page_image_url(driver)
-
-            latitude, longitude = get_coordinates(location)
-
-            tags_elements = event_page.find_all('li', class_='tags-item inline')
-
-            tags = []
-            for tag_element in tags_elements:
-                tag_link = tag_element.find('a')
-                if tag_link:
-                    tag_text = tag_link.text.strip().replace("#", "")  # Remove the "#"
-                    tags.append(tag_text)
-
-            event_info['Tags'] = tags
-
-            organizer = event_page.find('a', class_='descriptive-organizer-info__name-link') if event_page.find('a', class_='descriptive-organizer-info__name-link') else None
-            image_url_organizer = event_page.find('svg', class_='eds-avatar__background eds-avatar__background--has-border')
-            if image_url_organizer:
-                image_tag = image_url_organizer.find('image')
-                if image_tag:
-                    event_info['Image URL Organizer'] = image_tag.get('xlink:href')
-                else:
-                    event_info['Image URL Organizer'] = None
-            else:
-                event_info['Image URL Organizer'] = None
-
-            event_info['Title'] = title
-            event_info['Description'] = description
-            event_info['Price'] = price
-            event_info['Date'] = date
-            event_info['StartTime'], event_info['EndTime'] = extract_start_end_time(date)
-            event_info['Location'] = location
-            event_info['ImageURL'] = ImageURL
-            event_info['Latitude'] = latitude
-            event_info['Longitude'] = longitude
-            event_info['Tags'] = tags
-            event_info['Organizer'] = organizer.text.strip() if organizer else None
-            event_info['EventUrl'] = event_link
-
-            if latitude is not None and longitude is not None:
-                map_url = open_google_maps(latitude, longitude)
-                event_info['GoogleMaps_URL'] = map_url
-
-            all_events.append(event_info)
-
-            driver.back()
-
-        try:
-            next_button = driver.find_element_by_link_text('Next')
-            next_button.click()
-        except:
+def load_eventbrite_listing(driver, listing_url, selectors):
+    WaitPolicy('eventbrite_listing', {'Cards': compile_plan(selectors).card_css}, log=page_latency).load(driver, listing_url)
+    return archive_page(listing_url, 'eventbrite_listing', driver.page_source)
+
+def eventbrite_listing(driver, url, selectors, max_pages=40, journal=None, pool=None, first_page=1):
+    # -> [(card fields, event link)] over listing pages first_page..max_pages, resuming after the last journaled one.
+    # Pages are addressed as ?page=N: the first one loaded says how many there are, the
+    # rest are loaded pool.size at a time (one by one without a pool) until one has no cards.
+    cards = []
+    start_page = first_page
+    if journal is not None:
+        for page, page_cards in journal.pages('Eventbrite').items():
+            cards.extend(page_cards)
+            start_page = page + 1
+        if journal.listing_done('Eventbrite'):
+            return cards
+
+    previous_links = set()
+
+    def add_page(page, page_content):
+        # -> False once a page has no cards, or the same ones as the page before (past the last page)
+        nonlocal previous_links
+        page_cards = parse_eventbrite_listing(page_content, selectors) if page_content else []
+        links = {normalize_url(event_link) for _, event_link in page_cards}
+        if not links or links == previous_links:
+            return False
+        previous_links = links
+        cards.extend(page_cards)
+        if journal is not None:
+            journal.record_page('Eventbrite', page, page_cards)
+        return True
+
+    start_content = load_eventbrite_listing(driver, url if start_page == 1 else page_url(url, start_page), selectors)
+    last_page = min(max_pages, listing_page_count(start_content) or max_pages)
+    more = add_page(start_page, start_content)
+
+    batch_size = pool.size if pool else 1
+    for batch_start in range(start_page + 1, last_page + 1, batch_size):
+        if not more:
             break
+        pages = range(batch_start, min(batch_start + batch_size, last_page + 1))
+        listing_urls = [page_url(url, page) for page in pages]
+        if pool:
+            page_contents = pool.imap(lambda pool_driver, listing_url: load_eventbrite_listing(pool_driver, listing_url, selectors), listing_urls)
+        else:
+            page_contents = (load_eventbrite_listing(driver, listing_url, selectors) for listing_url in listing_urls)
+        for page, page_content in zip(pages, page_contents):
+            more = more and add_page(page, page_content)
 
-    return all_events
+    if journal is not None:
+        journal.record_listing_done('Eventbrite')
+    return cards
 
+def iter_eventbrite_events(driver, url, selectors, max_pages=40, pool=None, seen=None, journal=None, first_page=1):
+    # Listing pass: collect every card first so the detail pages can be fetched in bulk
+    cards = eventbrite_listing(driver, url, selectors, max_pages, journal, pool, first_page)
 
-def main():
-    sources = [
-        {
-            'name': 'Facebook',
-            'url': 'https://www.facebook.com/events/explore/montreal-quebec/102184499823699/',
-            'selectors': {
-                'event': {'tag': 'div', 'class': 'x1qjc9v5 x9f619 x78zum5 xdt5ytf x5yr21d x6ikm8r x10wlt62 xexx8yu x10ogl3i xg8j3zb x1k2j06m xlyipyv xh8yej3'}
-            }
-        },
-        {
-            'name': 'Eventbrite',
-            'url': 'https://www.eventbrite.com/d/canada--montreal/all-events/',
-            'selectors': {
-                'event': {'tag': 'div', 'class': 'discover-search-desktop-card discover-search-desktop-card--hiddeable'},
-                'Title': {'tag': 'h2', 'class': 'event-card__title'},
-                'Description': {'tag': 'p', 'class': 'event-card__description'},
-                'Date': {'tag': 'p', 'class': 'event-card__date'},
-                'Location': {'tag': 'p', 'class': 'location-info__address-text'},
-                'Price': {'tag': 'p', 'class': 'event-card__price'},
-                'ImageURL': {'tag': 'img', 'class': 'event-card__image'},
-                'Tags': {'tag': 'ul', 'class': 'event-card__tags'},
-                'Organizer': {'tag': 'a', 'class': 'event-card__organizer'},
-                'Organizer_IMG': {'tag': 'svg', 'class': 'eds-avatar__background eds-avatar__background--has-border'}
-            }
-        }
-    ]
+    reused_events, cards = split_seen(cards, seen, url_of=lambda card: card[1])
 
-    chrome_options = Options()
+    event_links = [event_link for _, event_link in cards]
+    details = fetch_details(fetch_eventbrite_event, event_links, driver, pool, journal, 'Eventbrite')
 
-    driver = webdriver.Chrome(options=chrome_options)
+    yield from reused_events
+    yield from iter_eventbrite_details(cards, details, seen)
 
-    all_events = []
-    unique_event_titles = set()
-    duplicate_events = []
+def scrape_eventbrite_events(driver, url, selectors, max_pages=40, pool=None, seen=None, journal=None):
+    return list(iter_eventbrite_events(driver, url, selectors, max_pages, pool, seen, journal))
 
-    for source in sources:
-        if source['name'] == 'Facebook':
-            events = scrape_facebook_events(driver, source['url'], source['selectors'])
-        elif source['name'] == 'Eventbrite':
-            events = scrape_eventbrite_events(driver, source['url'], source['selectors'])
-        else:
-            print(f"Fonte não suportada: {source['name']}")
-            continue
+def iter_eventbrite_details(cards, details, seen=None):
+    pending_coordinates = deque()
 
-        if events:
-            for event in events:
-                event_title = event.get('Title')
-                if event_title not in unique_event_titles:
-                    unique_event_titles.add(event_title)
-                    all_events.append(event)
-                else:
-                    duplicate_events.append(event)
+    def finish(event_info, coordinates):
+        if coordinates is not None:
+            event_info['Latitude'], event_info['Longitude'] = coordinates
+            event_info['GoogleMaps_URL'] = open_google_maps(*coordinates)
+        if seen is not None:
+            seen.mark(event_info['EventUrl'], event_info)
 
-    # JSON File for unique events
-    with open('unique_events.json', 'w') as f:
-        json.dump(all_events, f, indent=4)
+    for (event_info, event_link), event_details in zip(cards, details):
+        if event_details is None:
+            continue
 
-    # JSON File for duplicate events
-    with open('duplicate_events.json', 'w') as f:
-        json.dump(duplicate_events, f, indent=4)
+        event_info.update(event_details)
+        if event_info['Latitude'] is not None and event_info['Longitude'] is not None:
+            coordinates = resolved((event_info['Latitude'], event_info['Longitude']))
+        else:
+            coordinates = geocoder.geocode(event_info['Location'])
+        pending_coordinates.append((event_info, coordinates))
+
+        yield from drain_geocoded(pending_coordinates, finish)
+
+    yield from drain_geocoded(pending_coordinates, finish, wait=True)
+
+def eventbrite_listing_http(fetcher, url, selectors, max_pages=40, driver=None, journal=None):
+    # -> [(card fields, event link)]; same page count discovery and journal as eventbrite_listing,
+    # then fetcher.concurrency listing pages at a time until one comes back empty
+    cards = []
+    start_page = 1
+    if journal is not None:
+        for page, page_cards in journal.pages('Eventbrite').items():
+            cards.extend(page_cards)
+            start_page = page + 1
+        if journal.listing_done('Eventbrite'):
+            return cards
+
+    def load_page(listing_url, page_content):
+        archive_page(listing_url, 'eventbrite_listing', page_content)
+        found = parse_eventbrite_listing(page_content, selectors) if page_content else []
+        if not found and driver is not None:
+            page_content = load_eventbrite_listing(driver, listing_url, selectors)
+            found = parse_eventbrite_listing(page_content, selectors)
+        return found, page_content
+
+    def add_page(page, found):
+        cards.extend(found)
+        if journal is not None:
+            journal.record_page('Eventbrite', page, found)
+
+    start_url = url if start_page == 1 else page_url(url, start_page)
+    found, start_content = load_page(start_url, fetcher.fetch(start_url))
+    more = bool(found)
+    if more:
+        add_page(start_page, found)
+        last_page = min(max_pages, listing_page_count(start_content) or max_pages)
+        for batch_start in range(start_page + 1, last_page + 1, fetcher.concurrency):
+            pages = range(batch_start, min(batch_start + fetcher.concurrency, last_page + 1))
+            listing_urls = [page_url(url, page) for page in pages]
+            for page, listing_url, page_content in zip(pages, listing_urls, fetcher.fetch_all(listing_urls)):
+                found, _ = load_page(listing_url, page_content)
+                more = more and bool(found)
+                if more:
+                    add_page(page, found)
+            if not more:
+                break
+
+    if journal is not None:
+        journal.record_listing_done('Eventbrite')
+    return cards
+
+def parse_eventbrite_http(event_link, page_content):
+    # -> the event details, or None when the page (if any) needs the browser
+    if not page_content:
+        return None
+    archive_page(event_link, 'eventbrite_event', page_content)
+    with metrics.timer('parse', kind='eventbrite_event'):
+        event_details = parse_eventbrite_event_page(make_soup(page_content), event_link)
+    return event_details if event_details['Title'] is not None else None
+
+def iter_eventbrite_events_http(fetcher, url, selectors, max_pages=40, driver=None, seen=None, journal=None):
+    # Same selectors, parsers and journal as iter_eventbrite_events, but pages come
+    # from plain HTTP; the browser (if given) is only used for pages that need JS
+    cards = eventbrite_listing_http(fetcher, url, selectors, max_pages, driver, journal)
+
+    reused_events, cards = split_seen(cards, seen, url_of=lambda card: card[1])
+
+    event_links = [event_link for _, event_link in cards]
+
+    def fetch_all(links):
+        for event_link, page_content in zip(links, fetcher.fetch_all(links)):
+            event_details = parse_eventbrite_http(event_link, page_content)
+            if event_details is None and driver is not None:
+                event_details = fetch_eventbrite_event(driver, event_link)
+            yield event_details
+
+    details = fetch_details(fetch_eventbrite_event, event_links, driver, journal=journal, source='Eventbrite', fetch_all=fetch_all)
+
+    yield from reused_events
+    yield from iter_eventbrite_details(cards, details, seen)
+
+def scrape_eventbrite_events_http(fetcher, url, selectors, max_pages=40, driver=None, seen=None, journal=None):
+    return list(iter_eventbrite_events_http(fetcher, url, selectors, max_pages, driver, seen, journal))
+
+
+#### PIPELINE ####
+class Job:
+    # One event on its way through the pipeline. card holds the listing fields,
+    # details the parsed page once known (from the journal, or the detail stage);
+    # reused events arrive complete and only pass through to the sink.
+    def __init__(self, producer, url=None, card=None, details=None, event=None):
+        self.producer = producer
+        self.url = url
+        self.card = card
+        self.details = details
+        self.event = event
+        self.reused = event is not None
+
+    def __repr__(self):
+        return f"Job({self.producer.name}, {self.url})"
+
+class FacebookProducer:
+    name = 'Facebook'
+
+    def __init__(self, source, max_scroll=30, target_count=None):
+        self.source = source
+        self.max_scroll = max_scroll
+        self.target_count = target_count
+        self.titles = set()
+        self.fallback = city_defaults(source.get('city'))
+
+    def listing(self, driver, journal=None, pool=None):
+        event_urls = facebook_listing(driver, self.source['url'], self.source['selectors'], self.max_scroll, journal, self.target_count)
+        return [({}, event_url) for event_url in event_urls]
+
+    async def fetch(self, url, browser):
+        return await browser(fetch_facebook_event, url)
+
+    def accept(self, event_info):
+        # Exact repeats are dropped before they cost a geocode, as in iter_facebook_events
+        if event_info['Title'] in self.titles:
+            return False
+        self.titles.add(event_info['Title'])
+        return True
+
+    def locate(self, event_info):
+        location = event_info['Location']
+        known_coordinates = (location['Latitude'], location['Longitude']) if location['Latitude'] is not None else None
+        return geocoder.locate(location['Location'], known_coordinates)
+
+    def finish(self, event_info, located):
+        fill_facebook_location(event_info['Location'], *located, self.fallback)
+
+class EventbriteProducer:
+    name = 'Eventbrite'
+
+    def __init__(self, source, max_pages=40, fetcher=None):
+        self.source = source
+        self.max_pages = max_pages
+        self.fetcher = fetcher
+
+    def listing(self, driver, journal=None, pool=None):
+        if self.fetcher is not None:
+            return eventbrite_listing_http(self.fetcher, self.source['url'], self.source['selectors'], self.max_pages, driver, journal)
+        return eventbrite_listing(driver, self.source['url'], self.source['selectors'], self.max_pages, journal, pool)
+
+    async def fetch(self, url, browser):
+        if self.fetcher is not None:
+            event_details = parse_eventbrite_http(url, await asyncio.wrap_future(self.fetcher.submit(url)))
+            if event_details is not None:
+                return event_details
+        return await browser(fetch_eventbrite_event, url)
+
+    def accept(self, event_info):
+        return True
+
+    def locate(self, event_info):
+        if event_info['Latitude'] is not None and event_info['Longitude'] is not None:
+            return resolved((event_info['Latitude'], event_info['Longitude']))
+        return geocoder.geocode(event_info['Location'])
+
+    def finish(self, event_info, coordinates):
+        if coordinates is not None:
+            event_info['Latitude'], event_info['Longitude'] = coordinates
+            event_info['GoogleMaps_URL'] = open_google_maps(*coordinates)
+
+async def scrape_pipeline(producers, emit, driver, pool=None, seen=None, journal=None, detail_concurrency=None, geocode_concurrency=GEOCODE_CONCURRENCY, queue_size=QUEUE_SIZE):
+    # Listing -> detail -> geocode -> emit(event, source name), each stage with
+    # its own concurrency and a bounded inbox. The main browser is only ever
+    # used from one thread; detail pages go to the pool when there is one.
+    loop = asyncio.get_running_loop()
+    main_browser = ThreadPoolExecutor(max_workers=1)
+
+    async def browser(fn, item):
+        if pool:
+            return await asyncio.wrap_future(pool.submit(fn, item))
+        return await loop.run_in_executor(main_browser, fn, driver, item)
+
+    async def produce(producer):
+        cards = await loop.run_in_executor(main_browser, producer.listing, driver, journal, pool)
+        reused_events, cards = split_seen(cards, seen, url_of=lambda card: card[1])
+        done = journal.events(producer.name) if journal is not None else {}
+        for event_info in reused_events:
+            yield Job(producer, event=event_info)
+        for card, event_link in cards:
+            yield Job(producer, event_link, card, done.get(normalize_url(event_link)))
+
+    async def detail(job):
+        if job.reused:
+            return job
+        if job.details is None:
+            job.details = await job.producer.fetch(job.url, browser)
+            if job.details is None:
+                return None
+            if journal is not None:
+                journal.record_event(job.producer.name, job.url, job.details)
+        job.event = job.card
+        job.event.update(job.details)
+        return job if job.producer.accept(job.event) else None
+
+    async def locate(job):
+        if job.reused:
+            return job
+        with metrics.timer('geocode_wait'):
+            located = await asyncio.wrap_future(job.producer.locate(job.event))
+        job.producer.finish(job.event, located)
+        if seen is not None:
+            seen.mark(job.event['EventUrl'], job.event)
+        return job
+
+    async def sink(job):
+        emit(job.event, job.producer.name)
+
+    if detail_concurrency is None:
+        detail_concurrency = pool.size if pool else 1
+    stages = [
+        Stage('detail', detail, detail_concurrency, queue_size),
+        Stage('geocode', locate, geocode_concurrency, queue_size),
+        Stage('sink', sink, 1, queue_size),
+    ]
+    try:
+        await run_pipeline([produce(producer) for producer in producers], stages)
+    finally:
+        main_browser.shutdown(wait=True)
+
+
+# Each site's slug for a city in its listing URL. More cities can be added in
+# cities.json, e.g. {"toronto": {"Facebook": "toronto-ontario/<page id>", "Eventbrite": "canada--toronto", "name": "Toronto", "country_code": "ca"}}
+# name and country_code fill in places the reverse geocoder did not find;
+# gazetteer is the city's offline index, if it has one (see gazetteer.py).
+CITIES = {
+    'montreal': {'Facebook': 'montreal-quebec/102184499823699', 'Eventbrite': 'canada--montreal', 'name': 'Montreal', 'country_code': 'ca', 'gazetteer': GAZETTEER_FILE},
+}
+CITIES_FILE = 'cities.json'
+DEFAULT_CITY = 'montreal'
+
+def load_cities(path=CITIES_FILE):
+    cities = dict(CITIES)
+    if os.path.exists(path):
+        with open(path) as f:
+            cities.update(json.load(f))
+    return cities
+
+def city_sources(city, cities=None):
+    # SOURCES with their listing URLs pointed at city; sites without a slug for it are left out
+    slugs = (cities or load_cities())[city]
+    return [{**source, 'url': source['url_template'].format(slug=slugs[source['name']]), 'city': city} for source in SOURCES if source['name'] in slugs]
+
+def city_defaults(city=None, cities=None):
+    # -> (City, CountryCode) for events of city whose place the reverse geocoder did not find
+    entry = (cities or load_cities()).get(city or DEFAULT_CITY, {})
+    return entry.get('name', city), entry.get('country_code')
+
+def city_gazetteer(city, cities=None):
+    # The offline index of city's places, or None; the geocoder should only ask the crawled city's
+    path = (cities or load_cities()).get(city, {}).get('gazetteer')
+    if path not in gazetteers:
+        gazetteers[path] = load_gazetteer(path) if path else None
+    return gazetteers[path]
+
+SOURCES = [
+    {
+        'name': 'Facebook',
+        'url_template': 'https://www.facebook.com/events/explore/{slug}/',
+        'url': 'https://www.facebook.com/events/explore/montreal-quebec/102184499823699/',
+        'selectors': {
+            'event': {'tag': 'div', 'class': 'x1qjc9v5 x9f619 x78zum5 xdt5ytf x5yr21d x6ikm8r x10wlt62 xexx8yu x10ogl3i xg8j3zb x1k2j06m xlyipyv xh8yej3'}
+        }
+    },
+    {
+        'name': 'Eventbrite',
+        'url_template': 'https://www.eventbrite.com/d/{slug}/all-events/',
+        'url': 'https://www.eventbrite.com/d/canada--montreal/all-events/',
+        'selectors': {
+            'event': {'tag': 'div', 'class': 'discover-search-desktop-card discover-search-desktop-card--hiddeable'},
+            'Title': {'tag': 'h2', 'class': 'event-card__title'},
+            'Description': {'tag': 'p', 'class': 'event-card__description'},
+            'Date': {'tag': 'p', 'class': 'event-card__date'},
+            'Location': {'tag': 'p', 'class': 'location-info__address-text'},
+            'Price': {'tag': 'p', 'class': 'event-card__price'},
+            'ImageURL': {'tag': 'img', 'class': 'event-card__image'},
+            'Tags': {'tag': 'ul', 'class': 'event-card__tags'},
+            'Organizer': {'tag': 'a', 'class': 'event-card__organizer'},
+            'Organizer_IMG': {'tag': 'svg', 'class': 'eds-avatar__background eds-avatar__background--has-border'}
+        }
+    }
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Scrape a city's events from Facebook and Eventbrite")
+    parser.add_argument('--city', default=DEFAULT_CITY, help=f"city to scrape, out of {CITIES_FILE} and the built-in ones (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=1, help="headless Chrome workers for detail pages (default: 1, reuse the main browser)")
+    parser.add_argument('--fast', action='store_true', help="block images, fonts, media and CSS and return from page loads at DOMContentLoaded")
+    parser.add_argument('--headless', action='store_true', help="run the main browser headless")
+    parser.add_argument('--http', action='store_true', help="fetch Eventbrite over plain HTTP, using the browser only for pages that need JS")
+    parser.add_argument('--incremental', action='store_true', help=f"reuse events scraped recently (kept in {SEEN_FILE}) instead of reloading their pages")
+    parser.add_argument('--resume', action='store_true', help=f"continue an interrupted run from its checkpoint journal ({JOURNAL_FILE})")
+    parser.add_argument('--output', type=lambda value: value.split(','), default=['json'], help=f"comma-separated output formats out of {', '.join(FORMATS)} (default: json)")
+    parser.add_argument('--rotate-every', type=int, default=None, help="start a new .jsonl/.jsonl.gz segment every N events")
+    parser.add_argument('--max-events', type=int, default=None, help="stop scrolling the Facebook feed once this many cards are loaded")
+    parser.add_argument('--store', metavar='PATH', help="also upsert every event into a SQLite store (e.g. events.db)")
+    parser.add_argument('--report', default='run_report.json', help="where to write the JSON run report of timings and counters (default: %(default)s)")
+    parser.add_argument('--prometheus', metavar='PATH', help="also write the run metrics in Prometheus text format")
+    parser.add_argument('--pipeline', action='store_true', help="run listing, detail pages, geocoding and output as concurrent stages instead of one source at a time")
+    parser.add_argument('--queue-size', type=int, default=QUEUE_SIZE, help="with --pipeline, items each stage may have waiting (default: %(default)s)")
+    parser.add_argument('--archive', metavar='DIR', help="keep the HTML of every fetched page in a compressed archive, for reextract.py")
+    parser.add_argument('--stale-after', type=float, default=STALE_AFTER / 86400, help="days before an already-scraped event is fetched again (default: %(default)s)")
+    return parser.parse_args()
 
-    driver.quit()
+def main():
+    args = parse_args()
+    cities = load_cities()
+    if args.city not in cities:
+        raise SystemExit(f"Unknown city {args.city!r}; add its slugs to {CITIES_FILE}")
+    sources = city_sources(args.city, cities)
+    geocoder.local = city_gazetteer(args.city, cities)
+
+    global page_archive
+    # Browsers, files and threads are released even when the scrape fails, so a crash
+    # or Ctrl-C leaves no Chrome behind and the journal and outputs are usable
+    with ExitStack() as resources:
+        if args.archive:
+            page_archive = PageArchive(args.archive)
+            resources.callback(page_archive.close)
+        resources.callback(geocoder.close)
+
+        driver = create_driver(headless=args.headless, fast=args.fast, tab_policy=TabPolicy())
+        resources.callback(driver.quit)
+        pool = BrowserPool(args.workers) if args.workers > 1 else None
+        if pool:
+            resources.callback(pool.close)
+        fetcher = HttpFetcher() if args.http else None
+        if fetcher:
+            resources.callback(fetcher.close)
+        seen = SeenIndex(stale_after=args.stale_after * 86400) if args.incremental else None
+        if seen:
+            resources.callback(seen.save)
+        # A failed run only closes its journal, for --resume; a complete one finishes it below
+        journal = Journal(resume=args.resume)
+        resources.callback(journal.close)
+
+        dedup = DedupEngine()
+        with ExitStack() as outputs:
+            # Events are written as they arrive instead of being collected first
+            unique_sink = open_sinks(args.output, 'unique_events', args.rotate_every)
+            outputs.callback(unique_sink.close)
+            duplicate_sink = open_sinks(args.output, 'duplicate_events', args.rotate_every)
+            outputs.callback(duplicate_sink.close)
+            store = EventStore(args.store, city=city_defaults(args.city, cities)[0]) if args.store else None
+            if store:
+                outputs.callback(store.close)
+
+            def emit(event, source_name):
+                if store:
+                    store.write(event)
+                if dedup.add(event) is None:
+                    unique_sink.write(event)
+                    metrics.inc('events_emitted', source=source_name)
+                else:
+                    duplicate_sink.write(event)
+                    metrics.inc('duplicates', source=source_name)
+
+            if args.pipeline:
+                producers = []
+                for source in sources:
+                    if source['name'] == 'Facebook':
+                        producers.append(FacebookProducer(source, target_count=args.max_events))
+                    elif source['name'] == 'Eventbrite':
+                        producers.append(EventbriteProducer(source, fetcher=fetcher))
+                    else:
+                        print(f"Fonte não suportada: {source['name']}")
+                detail_concurrency = max(args.workers, fetcher.concurrency if fetcher else 1)
+                asyncio.run(scrape_pipeline(producers, emit, driver, pool, seen, journal, detail_concurrency, queue_size=args.queue_size))
+            else:
+                for source in sources:
+                    if source['name'] == 'Facebook':
+                        events = iter_facebook_events(driver, source['url'], source['selectors'], pool=pool, seen=seen, journal=journal, target_count=args.max_events, city=args.city)
+                    elif source['name'] == 'Eventbrite' and fetcher:
+                        events = iter_eventbrite_events_http(fetcher, source['url'], source['selectors'], driver=driver, seen=seen, journal=journal)
+                    elif source['name'] == 'Eventbrite':
+                        events = iter_eventbrite_events(driver, source['url'], source['selectors'], pool=pool, seen=seen, journal=journal)
+                    else:
+                        print(f"Fonte não suportada: {source['name']}")
+                        continue
+
+                    for event in events:
+                        emit(event, source['name'])
+
+        clusters_sink = open_sinks(['json'], 'duplicate_clusters')
+        for cluster in dedup.clusters():
+            clusters_sink.write(cluster_summary(cluster))
+        clusters_sink.close()
+        journal.finish()
+
+    metrics.set('geocode_cache_hits', geocode_cache.hits)
+    metrics.set('geocode_cache_misses', geocode_cache.misses)
+    metrics.set('geocoder_retries', geocoder.retried)
+    metrics.set('browser_restarts', pool.restarts if pool else 0)
+    metrics.set('dedup_comparisons', dedup.compared)
+    metrics.write_json(args.report)
+    if args.prometheus:
+        metrics.write_prometheus(args.prometheus)
+    page_latency.print_summary()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,76 @@
+import json
+import os
+import time
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+SEEN_FILE = 'seen_urls.json'
+STALE_AFTER = 7 * 24 * 3600
+
+# Query parameters that only track where the click came from
+TRACKING_PARAMS = {'aff', 'acontext', 'ref', 'refid', 'fbclid', 'gclid', '_nc_cat', '__tn__', 'keep'}
+TRACKING_PREFIXES = ('utm_', '_nc_', 'mibextid')
+
+
+def _is_tracking(name):
+    name = name.lower()
+    return name in TRACKING_PARAMS or name.startswith(TRACKING_PREFIXES)
+
+
+def normalize_url(url):
+    if url is None:
+        return None
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith('eventbrite.') or host.startswith('www.eventbrite.'):
+        # The same event is served on .ca, .com, .fr, ...
+        host = 'www.eventbrite.com'
+    elif host in ('facebook.com', 'm.facebook.com', 'web.facebook.com'):
+        host = 'www.facebook.com'
+    query = sorted((name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if not _is_tracking(name))
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit(('https', host, path, urlencode(query), ''))
+
+
+class SeenIndex:
+    """Persistent map of normalized EventUrl -> last scraped time and event.
+
+    Events scraped less than stale_after seconds ago are reused instead of
+    fetching their detail page again.
+    """
+
+    def __init__(self, path=SEEN_FILE, stale_after=STALE_AFTER):
+        self.path = path
+        self.stale_after = stale_after
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def is_fresh(self, url):
+        entry = self.entries.get(normalize_url(url))
+        return entry is not None and time.time() - entry['last_scraped'] < self.stale_after
+
+    def event(self, url):
+        entry = self.entries.get(normalize_url(url))
+        return entry['event'] if entry else None
+
+    def mark(self, url, event):
+        self.entries[normalize_url(url)] = {'last_scraped': time.time(), 'event': event}
+
+    def split(self, items, url_of=lambda item: item):
+        # -> (events reused from the index, items whose detail page must be fetched)
+        reused, remaining = [], []
+        for item in items:
+            if self.is_fresh(url_of(item)):
+                reused.append(self.event(url_of(item)))
+            else:
+                remaining.append(item)
+        return reused, remaining
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,122 @@
+import gzip
+import json
+import os
+import textwrap
+
+FORMATS = ['json', 'jsonl', 'jsonl.gz']
+GZIP_FLUSH_EVERY = 50
+
+
+class JsonlSink:
+    """One JSON event per line, flushed as it is written.
+
+    The file being written is `<path>.part`, so consumers can tail it during
+    the crawl; it is renamed to its final name only when complete. With
+    rotate_every=N a segment is finalized every N events
+    (events.0001.jsonl, events.0002.jsonl, ...).
+    """
+
+    suffix = '.jsonl'
+
+    def __init__(self, path, rotate_every=None):
+        self.path = path
+        self.rotate_every = rotate_every
+        self.count = 0
+        self.segment = 0
+        self._file = None
+        self._segment_path = None
+
+    def _open(self, path):
+        return open(path, 'w', encoding='utf-8')
+
+    def _next_segment_path(self):
+        if not self.rotate_every:
+            return self.path
+        self.segment += 1
+        stem = self.path[:-len(self.suffix)] if self.path.endswith(self.suffix) else self.path
+        return f"{stem}.{self.segment:04d}{self.suffix}"
+
+    def _finalize(self):
+        if self._file is None:
+            return
+        self._file.close()
+        os.replace(self._segment_path + '.part', self._segment_path)
+        self._file = None
+
+    def _flush(self):
+        self._file.flush()
+
+    def write(self, event):
+        if self._file is None:
+            self._segment_path = self._next_segment_path()
+            self._file = self._open(self._segment_path + '.part')
+        self._file.write(json.dumps(event, ensure_ascii=False) + '\n')
+        self.count += 1
+        self._flush()
+        if self.rotate_every and self.count % self.rotate_every == 0:
+            self._finalize()
+
+    def close(self):
+        if self._file is None and not self.rotate_every and self.count == 0:
+            # Still produce an (empty) file so a run always has its output
+            self._segment_path = self.path
+            self._file = self._open(self.path + '.part')
+        self._finalize()
+
+
+class GzipJsonlSink(JsonlSink):
+    suffix = '.jsonl.gz'
+
+    def _open(self, path):
+        return gzip.open(path, 'wt', encoding='utf-8')
+
+    def _flush(self):
+        # A gzip flush ends a deflate block; doing it per line would wreck the ratio
+        if self.count % GZIP_FLUSH_EVERY == 0:
+            self._file.flush()
+
+
+class PrettyJsonSink:
+    """Streams the same indented JSON array json.dump(events, f, indent=4) writes."""
+
+    def __init__(self, path):
+        self.path = path
+        self.count = 0
+        self._file = open(path + '.part', 'w')
+
+    def write(self, event):
+        self._file.write('[\n' if self.count == 0 else ',\n')
+        self._file.write(textwrap.indent(json.dumps(event, indent=4), '    '))
+        self.count += 1
+
+    def close(self):
+        self._file.write('\n]' if self.count else '[]')
+        self._file.close()
+        os.replace(self.path + '.part', self.path)
+
+
+class MultiSink:
+    def __init__(self, sinks):
+        self.sinks = sinks
+
+    def write(self, event):
+        for sink in self.sinks:
+            sink.write(event)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def open_sinks(formats, stem, rotate_every=None):
+    sinks = []
+    for output_format in formats:
+        if output_format == 'json':
+            sinks.append(PrettyJsonSink(stem + '.json'))
+        elif output_format == 'jsonl':
+            sinks.append(JsonlSink(stem + '.jsonl', rotate_every))
+        elif output_format == 'jsonl.gz':
+            sinks.append(GzipJsonlSink(stem + '.jsonl.gz', rotate_every))
+        else:
+            raise ValueError(f"Unknown output format: {output_format}")
+    return MultiSink(sinks)
@@ -0,0 +1,234 @@
+import argparse
+import json
+import math
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from dates import LOCAL_TIMEZONE, event_end, event_start
+from gazetteer import distance_m
+from seen_index import normalize_url
+
+STORE_FILE = 'events.db'
+BATCH_SIZE = 100
+BUCKET_SIZE = 0.02  # degrees, ~2.2 km north-south
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS events (
+    url TEXT PRIMARY KEY,
+    source TEXT,
+    title TEXT,
+    description TEXT,
+    start_at TEXT,
+    end_at TEXT,
+    city TEXT,
+    latitude REAL,
+    longitude REAL,
+    geo_bucket INTEGER,
+    scraped_at REAL,
+    data TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_start_at ON events(start_at);
+CREATE INDEX IF NOT EXISTS idx_events_city ON events(city, start_at);
+CREATE INDEX IF NOT EXISTS idx_events_source ON events(source, start_at);
+CREATE INDEX IF NOT EXISTS idx_events_geo_bucket ON events(geo_bucket, start_at);
+'''
+
+FTS_SCHEMA = '''
+CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(title, description, content='events', content_rowid='rowid');
+CREATE TRIGGER IF NOT EXISTS events_ai AFTER INSERT ON events BEGIN
+    INSERT INTO events_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_ad AFTER DELETE ON events BEGIN
+    INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS events_au AFTER UPDATE ON events BEGIN
+    INSERT INTO events_fts(events_fts, rowid, title, description) VALUES ('delete', old.rowid, old.title, old.description);
+    INSERT INTO events_fts(rowid, title, description) VALUES (new.rowid, new.title, new.description);
+END;
+'''
+
+UPSERT = '''
+INSERT INTO events (url, source, title, description, start_at, end_at, city, latitude, longitude, geo_bucket, scraped_at, data)
+VALUES (:url, :source, :title, :description, :start_at, :end_at, :city, :latitude, :longitude, :geo_bucket, :scraped_at, :data)
+ON CONFLICT(url) DO UPDATE SET
+    source = excluded.source,
+    title = excluded.title,
+    description = excluded.description,
+    start_at = excluded.start_at,
+    end_at = excluded.end_at,
+    city = excluded.city,
+    latitude = excluded.latitude,
+    longitude = excluded.longitude,
+    geo_bucket = excluded.geo_bucket,
+    scraped_at = excluded.scraped_at,
+    data = excluded.data
+'''
+
+
+def bucket_id(row, col):
+    # Fits a signed SQLite INTEGER, unlike the gazetteer's unsigned cell ids
+    return row * 100000 + col
+
+
+def geo_bucket(latitude, longitude):
+    if latitude is None or longitude is None:
+        return None
+    return bucket_id(math.floor(latitude / BUCKET_SIZE), math.floor(longitude / BUCKET_SIZE))
+
+
+def source_of(url):
+    host = normalize_url(url).split('/')[2]
+    return host.split('.')[-2] if host.count('.') else host
+
+
+def _iso(value):
+    # Stored as ISO-8601 in UTC, so that string order is time order across offsets.
+    # All-day dates count from local midnight, naive times are local time.
+    if not value:
+        return None
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=LOCAL_TIMEZONE)
+    return value.astimezone(timezone.utc).isoformat()
+
+
+def weekend(now=None):
+    # -> [start, end) from Saturday 00:00 to Monday 00:00 local time of the current or coming weekend
+    now = now or datetime.now(LOCAL_TIMEZONE)
+    saturday = (now + timedelta(days=5 - now.weekday())).replace(hour=0, minute=0, second=0, microsecond=0)
+    return saturday, saturday + timedelta(days=2)
+
+
+def event_row(event, city=None):
+    # Facebook nests the place under Location, Eventbrite keeps it top-level and
+    # names no city, so those rows take city (the crawled one)
+    location = event.get('Location') if isinstance(event.get('Location'), dict) else event
+    latitude, longitude = location.get('Latitude'), location.get('Longitude')
+    return {
+        'url': normalize_url(event['EventUrl']),
+        'source': source_of(event['EventUrl']),
+        'title': event.get('Title'),
+        'description': event.get('Description'),
+        'start_at': _iso(event_start(event)),
+        'end_at': _iso(event_end(event)),
+        'city': location.get('City') or city,
+        'latitude': latitude,
+        'longitude': longitude,
+        'geo_bucket': geo_bucket(latitude, longitude),
+        'scraped_at': time.time(),
+        'data': json.dumps(event),
+    }
+
+
+class EventStore:
+    """Embedded SQLite store of scraped events, one row per normalized URL.
+
+    write() buffers events and upserts them batch_size at a time in a single
+    transaction, so it can sit in the scrape loop like any other sink. city is
+    stored for events that do not name their own.
+    """
+
+    def __init__(self, path=STORE_FILE, batch_size=BATCH_SIZE, city=None):
+        self.path = path
+        self.city = city
+        self.batch_size = batch_size
+        self._batch = []
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.executescript(SCHEMA)
+        try:
+            self.connection.executescript(FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5; search() falls back to LIKE
+            self.has_fts = False
+
+    def write(self, event):
+        if not event.get('EventUrl'):
+            return
+        self._batch.append(event_row(event, self.city))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self._batch:
+            return
+        with self.connection:
+            self.connection.executemany(UPSERT, self._batch)
+        self._batch = []
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def _events(self, sql, params=()):
+        return [json.loads(data) for (data,) in self.connection.execute(sql, params)]
+
+    def between(self, start, end, city=None, source=None):
+        sql = 'SELECT data FROM events WHERE start_at >= ? AND start_at < ?'
+        params = [_iso(start), _iso(end)]
+        if city is not None:
+            sql += ' AND city = ?'
+            params.append(city)
+        if source is not None:
+            sql += ' AND source = ?'
+            params.append(source)
+        return self._events(sql + ' ORDER BY start_at', params)
+
+    def near(self, latitude, longitude, radius_m, start=None, end=None):
+        # Candidate buckets from the index, exact distance in Python
+        radius_deg = radius_m / 1000 / 111
+        row_reach = math.ceil(radius_deg / BUCKET_SIZE) + 1
+        # A degree of longitude shrinks with cos(latitude): measure it at the circle's edge nearest the pole
+        col_reach = math.ceil(radius_deg / math.cos(math.radians(min(89, abs(latitude) + radius_deg))) / BUCKET_SIZE) + 1
+        row, col = math.floor(latitude / BUCKET_SIZE), math.floor(longitude / BUCKET_SIZE)
+        buckets = [bucket_id(row + d_row, col + d_col) for d_row in range(-row_reach, row_reach + 1) for d_col in range(-col_reach, col_reach + 1)]
+
+        sql = f"SELECT data, latitude, longitude FROM events WHERE geo_bucket IN ({','.join('?' * len(buckets))})"
+        params = list(buckets)
+        if start is not None:
+            sql += ' AND start_at >= ?'
+            params.append(_iso(start))
+        if end is not None:
+            sql += ' AND start_at < ?'
+            params.append(_iso(end))
+
+        return [
+            json.loads(data)
+            for data, event_lat, event_lon in self.connection.execute(sql + ' ORDER BY start_at', params)
+            if distance_m(latitude, longitude, event_lat, event_lon) <= radius_m
+        ]
+
+    def search(self, text, limit=50):
+        if self.has_fts:
+            return self._events('SELECT events.data FROM events_fts JOIN events ON events.rowid = events_fts.rowid WHERE events_fts MATCH ? ORDER BY rank LIMIT ?', (text, limit))
+        pattern = f"%{text}%"
+        return self._events('SELECT data FROM events WHERE title LIKE ? OR description LIKE ? LIMIT ?', (pattern, pattern, limit))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Query the scraped events store")
+    parser.add_argument('path', nargs='?', default=STORE_FILE)
+    parser.add_argument('--search', help="full-text search over titles and descriptions")
+    parser.add_argument('--near', help="LAT,LON; only events within --radius metres")
+    parser.add_argument('--radius', type=float, default=2000)
+    parser.add_argument('--weekend', action='store_true', help="only events starting this weekend")
+    parser.add_argument('--city')
+    args = parser.parse_args()
+
+    store = EventStore(args.path)
+    start, end = weekend() if args.weekend else (None, None)
+    if args.search:
+        events = store.search(args.search)
+    elif args.near:
+        latitude, longitude = (float(value) for value in args.near.split(','))
+        events = store.near(latitude, longitude, args.radius, start, end)
+    elif start is not None:
+        events = store.between(start, end, city=args.city)
+    else:
+        parser.error("one of --search, --near or --weekend is required")
+    for event in events:
+        print(event.get('StartDateTime'), event.get('Title'), event.get('EventUrl'))
+    store.close()
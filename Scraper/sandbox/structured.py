@@ -0,0 +1,131 @@
+import json
+from datetime import datetime
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def _is_event(item):
+    # schema.org has MusicEvent, SocialEvent, EducationEvent, ...
+    return any(str(kind).endswith('Event') for kind in _as_list(item.get('@type')))
+
+
+def _iter_events(data):
+    for item in _as_list(data):
+        if not isinstance(item, dict):
+            continue
+        if _is_event(item):
+            yield item
+        yield from _iter_events(item.get('@graph'))
+
+
+def find_jsonld_events(soup):
+    for script in soup.find_all('script', type='application/ld+json'):
+        try:
+            data = json.loads(script.string or '')
+        except ValueError:
+            continue
+        yield from _iter_events(data)
+
+
+def _first(value):
+    if isinstance(value, list):
+        return value[0] if value else None
+    return value
+
+
+def _text(value, key='name'):
+    # A list stands for its first item, an object (Person, ImageObject, ...) for its key or url
+    value = _first(value)
+    if isinstance(value, dict):
+        value = value.get(key) or value.get('url')
+    if value is None:
+        return None
+    value = str(value).strip()
+    return value or None
+
+
+def _float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _address_text(address):
+    address = _first(address)
+    if isinstance(address, dict):
+        parts = [address.get(key) for key in ('streetAddress', 'addressLocality', 'addressRegion', 'postalCode')]
+        return ', '.join(str(part).strip() for part in parts if part) or None
+    return _text(address)
+
+
+def _price_text(offers):
+    prices = []
+    currency = None
+    for offer in _as_list(offers):
+        if not isinstance(offer, dict):
+            continue
+        currency = currency or offer.get('priceCurrency')
+        for key in ('price', 'lowPrice', 'highPrice'):
+            price = _float(offer.get(key))
+            if price is not None:
+                prices.append(price)
+    if not prices:
+        return None
+    low, high = min(prices), max(prices)
+    if high == 0:
+        return 'Free'
+    currency = f" {currency}" if currency else ''
+    if low == high:
+        return f"{low:.2f}{currency}"
+    return f"{low:.2f}{currency} - {high:.2f}{currency}"
+
+
+def event_fields(event):
+    fields = {
+        'Title': _text(event.get('name')),
+        'Description': _text(event.get('description')),
+        'StartDateTime': _text(event.get('startDate')),
+        'EndDateTime': _text(event.get('endDate')),
+        'Price': _price_text(event.get('offers')),
+        'ImageURL': _text(event.get('image'), 'url'),
+        'Organizer': _text(event.get('organizer')),
+    }
+
+    locations = [place for place in _as_list(event.get('location')) if isinstance(place, dict)]
+    if locations:
+        place = locations[0]
+        name = _text(place.get('name'))
+        address = _address_text(place.get('address'))
+        fields['Location'] = ', '.join(part for part in (name, address) if part) or None
+
+        geo = place.get('geo') or {}
+        latitude, longitude = _float(geo.get('latitude')), _float(geo.get('longitude'))
+        if latitude is not None and longitude is not None:
+            fields['Latitude'], fields['Longitude'] = latitude, longitude
+
+    return {key: value for key, value in fields.items() if value is not None}
+
+
+def extract_structured_event(soup):
+    # Fields of the first schema.org Event on the page; missing ones are left out
+    for event in find_jsonld_events(soup):
+        return event_fields(event)
+    return {}
+
+
+def iso_time(value):
+    # "2024-03-09T21:30:00-04:00" -> "9:30 PM", the StartTime/EndTime style used elsewhere
+    if value is None:
+        return None
+    try:
+        parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        return None
+    if 'T' not in value:
+        return None
+    return parsed.strftime('%I:%M %p').lstrip('0')
@@ -0,0 +1,65 @@
+from datetime import date
+import pytest
+from dates import iso_date, read_dates
+
+# As of which yearless dates are read
+REFERENCE = date(2024, 2, 20)
+
+# Date texts as the fixtures in JSONs/ hold them -> (StartDateTime, EndDateTime, StartTime, EndTime)
+CASES = [
+    # Facebook, English
+    ('SATURDAY, MARCH 9, 2024 AT 9:30 PM EST', ('2024-03-09T21:30:00-05:00', None, '9:30 PM', None)),
+    ('SATURDAY, MARCH 30, 2024 AT 12:00 PM – 6:00 PM EDT', ('2024-03-30T12:00:00-04:00', '2024-03-30T18:00:00-04:00', '12:00 PM', '6:00 PM')),
+    ('TUESDAY, MAY 21, 2024 AT 8:00 PM – 12:00 AM EDT', ('2024-05-21T20:00:00-04:00', '2024-05-22T00:00:00-04:00', '8:00 PM', '12:00 AM')),
+    ('FRIDAY, APRIL 12, 2024 AT 9:00 PM – 6:00 AM EDT', ('2024-04-12T21:00:00-04:00', '2024-04-13T06:00:00-04:00', '9:00 PM', '6:00 AM')),
+    ('THURSDAY, FEBRUARY 29, 2024 AT 5:00 PM EST', ('2024-02-29T17:00:00-05:00', None, '5:00 PM', None)),
+    ('MAR 23 AT 2:00 PM – MAR 24 AT 8:00 PM EDT', ('2024-03-23T14:00:00-04:00', '2024-03-24T20:00:00-04:00', '2:00 PM', '8:00 PM')),
+    ('APR 12 AT 5:00 PM – APR 14 AT 5:00 PM EEST', ('2024-04-12T17:00:00+03:00', '2024-04-14T17:00:00+03:00', '5:00 PM', '5:00 PM')),
+    ('SATURDAY, MARCH 9, 2024 AT 6:30 PM IST', ('2024-03-09T18:30:00+05:30', None, '6:30 PM', None)),
+    # Eventbrite, English
+    ('Sat, Mar 16, 2024 6:00 PM - 10:00 PM EDT', ('2024-03-16T18:00:00-04:00', '2024-03-16T22:00:00-04:00', '6:00 PM', '10:00 PM')),
+    ('Fri, Mar 15, 2024 9:00 PM - Sat, Mar 16, 2024 2:00 AM EDT', ('2024-03-15T21:00:00-04:00', '2024-03-16T02:00:00-04:00', '9:00 PM', '2:00 AM')),
+    ('February 28 · 10pm - February 29 · 2:30am EST', ('2024-02-28T22:00:00-05:00', '2024-02-29T02:30:00-05:00', '10:00 PM', '2:30 AM')),
+    ('March 23 · 9pm - March 24 · 11pm EDT', ('2024-03-23T21:00:00-04:00', '2024-03-24T23:00:00-04:00', '9:00 PM', '11:00 PM')),
+    # Eventbrite, French
+    ('Débute le sam., 9 mars 2024 17:00 EST', ('2024-03-09T17:00:00-05:00', None, '5:00 PM', None)),
+    ('dim. 3 mars 2024 14:00 - 16:30 EST', ('2024-03-03T14:00:00-05:00', '2024-03-03T16:30:00-05:00', '2:00 PM', '4:30 PM')),
+    ('mer. 13 mars 2024 08:30 - 16:45 UTC−4', ('2024-03-13T08:30:00-04:00', '2024-03-13T16:45:00-04:00', '8:30 AM', '4:45 PM')),
+    ('jeu. 7 mars 2024 22:00 - ven. 8 mars 2024 03:00 UTC−5', ('2024-03-07T22:00:00-05:00', '2024-03-08T03:00:00-05:00', '10:00 PM', '3:00 AM')),
+    ('mar. 5 avril 2024 19h', ('2024-04-05T19:00:00-04:00', None, '7:00 PM', None)),
+    # No time: dates only, and no made-up midnight
+    ('Mar 9 - 10', ('2024-03-09', '2024-03-10', None, None)),
+    ('SATURDAY, MARCH 9, 2024', ('2024-03-09', None, None, None)),
+    # A bare start hour takes the end's am/pm
+    ('Thursday, March 7 · 6 - 9pm EST', ('2024-03-07T18:00:00-05:00', '2024-03-07T21:00:00-05:00', '6:00 PM', '9:00 PM')),
+    ('Sunday, March 10 · 9 - 11am EDT', ('2024-03-10T09:00:00-04:00', '2024-03-10T11:00:00-04:00', '9:00 AM', '11:00 AM')),
+    # Unreadable
+    ('', (None, None, None, None)),
+    ('Happening now', (None, None, None, None)),
+]
+
+
+@pytest.mark.parametrize('text, expected', CASES)
+def test_read_dates(text, expected):
+    start, end, start_time, end_time = read_dates(text, REFERENCE)
+    assert (iso_date(start, start_time), iso_date(end, end_time), start_time, end_time) == expected
+
+
+# Yearless dates take the first year in which they exist and are not over yet
+YEAR_CASES = [
+    ('FEB 29 AT 8:00 PM – MAR 3 AT 1:00 AM EST', date(2026, 10, 18), 2028),
+    ('MAR 23 AT 2:00 PM – MAR 24 AT 8:00 PM EDT', date(2026, 10, 18), 2027),
+    ('MAR 23 AT 2:00 PM – MAR 24 AT 8:00 PM EDT', date(2024, 2, 20), 2024),
+    # Still running on the reference date
+    ('MAR 1 AT 5:00 PM – MAR 3 AT 9:00 PM EST', date(2024, 3, 2), 2024),
+    ('DEC 30 AT 9:00 PM – JAN 2 AT 1:00 AM EST', date(2024, 1, 1), 2023),
+    # A year in the text always wins
+    ('THURSDAY, FEBRUARY 29, 2024 AT 5:00 PM – 8:00 PM EST', date(2026, 10, 18), 2024),
+]
+
+
+@pytest.mark.parametrize('text, reference, year', YEAR_CASES)
+def test_missing_year(text, reference, year):
+    start, end, _, _ = read_dates(text, reference)
+    assert start.year == year
+    assert end > start
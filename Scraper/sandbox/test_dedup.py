@@ -0,0 +1,41 @@
+import pytest
+from dedup import DedupEngine
+
+
+def event(title, start='2024-03-09T21:00:00-05:00', venue='Club Soda'):
+    return {'Title': title, 'StartDateTime': start, 'Location': venue, 'EventUrl': f"https://example.com/{title}/{start}/{venue}"}
+
+
+# (first event, second event, whether the second is a duplicate of the first)
+CASES = [
+    # Case, punctuation and the sites' short forms
+    (event('Jazz Night at Casa'), event('JAZZ NIGHT AT CASA!'), True),
+    (event('NY Party 2024'), event('New Year Party 2024'), True),
+    # The same evening, once in UTC and once in Montreal time
+    (event('Jazz Night at Casa'), event('Jazz Night at Casa', start='2024-03-10T01:30:00Z'), True),
+    # Same place and day: a looser title match is enough
+    (event('Open Mic Comedy Night', venue='Studio 88'), event('Open Mic Comedy Night Montreal', venue='Studio 88'), True),
+    (event('Open Mic Comedy Night', venue='Studio 88'), event('Open Mic Comedy Night Montreal', venue='Bar Le Ritz'), False),
+    # Different numbers are different events, however close the rest is
+    (event('Amoris 20 to 40'), event('Amoris 30 to 50'), False),
+    (event('Fest 2024'), event('Fest 2025'), False),
+    # Another day
+    (event('Jazz Night at Casa'), event('Jazz Night at Casa', start='2024-03-10T21:00:00-05:00'), False),
+]
+
+
+@pytest.mark.parametrize('first, second, duplicate', CASES)
+def test_match(first, second, duplicate):
+    engine = DedupEngine()
+    assert engine.add(first) is None
+    assert (engine.add(second) == 0) == duplicate
+
+
+def test_clusters_keep_summaries_only():
+    engine = DedupEngine()
+    events = [event('Jazz Night at Casa'), event('Salsa Social'), event('JAZZ NIGHT AT CASA!')]
+    assert [engine.add(e) for e in events] == [None, None, 0]
+    assert engine.clusters() == [[
+        {'Title': 'Jazz Night at Casa', 'EventUrl': events[0]['EventUrl']},
+        {'Title': 'JAZZ NIGHT AT CASA!', 'EventUrl': events[2]['EventUrl']},
+    ]]
@@ -0,0 +1,57 @@
+import os
+from journal import Journal
+
+CARDS = [[{'Title': 'Jazz night'}, 'https://www.eventbrite.ca/e/jazz-night-1']]
+
+
+def test_resume_replays_pages_and_events(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    journal.record_page('Eventbrite', 2, CARDS)
+    journal.record_page('Eventbrite', 1, CARDS)
+    journal.record_event('Eventbrite', 'https://www.eventbrite.ca/e/jazz-night-1?aff=ebdssbdestsearch', {'Title': 'Jazz night'})
+    journal.record_page('Facebook', 1, ['https://www.facebook.com/events/1/'])
+    journal.record_listing_done('Facebook')
+    journal.close()
+
+    journal = Journal(path, resume=True)
+    assert list(journal.pages('Eventbrite')) == [1, 2]
+    assert not journal.listing_done('Eventbrite')
+    assert journal.listing_done('Facebook')
+    # Events are keyed by their normalized URL (no tracking parameters, one Eventbrite domain)
+    assert journal.events('Eventbrite') == {'https://www.eventbrite.com/e/jazz-night-1': {'Title': 'Jazz night'}}
+    # and what is recorded after resuming is kept too
+    journal.record_listing_done('Eventbrite')
+    journal.close()
+    assert Journal(path, resume=True).listing_done('Eventbrite')
+
+
+def test_half_written_last_line_is_skipped(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    journal.record_page('Eventbrite', 1, CARDS)
+    journal.close()
+    with open(path, 'a') as f:
+        f.write('{"type": "page", "source": "Eventbrite", "pa')
+
+    journal = Journal(path, resume=True)
+    assert list(journal.pages('Eventbrite')) == [1]
+    journal.close()
+
+
+def test_new_run_truncates_and_finish_removes(tmp_path):
+    path = str(tmp_path / 'journal.jsonl')
+    journal = Journal(path)
+    journal.record_page('Eventbrite', 1, CARDS)
+    journal.close()
+
+    # Without resume the previous run's journal is discarded
+    journal = Journal(path)
+    assert journal.pages('Eventbrite') == {}
+    journal.close()
+    assert os.path.getsize(path) == 0
+    assert Journal(path, resume=True).pages('Eventbrite') == {}
+
+    journal = Journal(path, resume=True)
+    journal.finish()
+    assert not os.path.exists(path)
@@ -0,0 +1,61 @@
+import gzip
+import json
+import os
+import pytest
+from sinks import GzipJsonlSink, JsonlSink, PrettyJsonSink, open_sinks
+
+EVENTS = [{'Title': f"Event {number}", 'Description': 'Café'} for number in range(5)]
+
+
+def read_jsonl(path):
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize('sink_class, name', [(JsonlSink, 'events.jsonl'), (GzipJsonlSink, 'events.jsonl.gz')])
+def test_jsonl_is_renamed_from_part_on_close(tmp_path, sink_class, name):
+    path = str(tmp_path / name)
+    sink = sink_class(path)
+    for event in EVENTS:
+        sink.write(event)
+    assert os.path.exists(path + '.part')
+    assert not os.path.exists(path)
+
+    sink.close()
+    assert not os.path.exists(path + '.part')
+    assert read_jsonl(path) == EVENTS
+
+
+def test_rotation_finalizes_each_segment(tmp_path):
+    sink = JsonlSink(str(tmp_path / 'events.jsonl'), rotate_every=2)
+    for event in EVENTS:
+        sink.write(event)
+    # Two full segments are final, the third is still being written
+    assert sorted(os.listdir(tmp_path)) == ['events.0001.jsonl', 'events.0002.jsonl', 'events.0003.jsonl.part']
+
+    sink.close()
+    assert sorted(os.listdir(tmp_path)) == ['events.0001.jsonl', 'events.0002.jsonl', 'events.0003.jsonl']
+    segments = [read_jsonl(str(tmp_path / name)) for name in sorted(os.listdir(tmp_path))]
+    assert segments == [EVENTS[0:2], EVENTS[2:4], EVENTS[4:]]
+
+
+def test_pretty_json_matches_json_dump(tmp_path):
+    path = str(tmp_path / 'events.json')
+    sink = PrettyJsonSink(path)
+    for event in EVENTS:
+        sink.write(event)
+    assert not os.path.exists(path)
+    sink.close()
+
+    with open(path) as f:
+        assert f.read() == json.dumps(EVENTS, indent=4)
+
+
+def test_empty_run_still_writes_its_outputs(tmp_path):
+    stem = str(tmp_path / 'unique_events')
+    open_sinks(['json', 'jsonl'], stem).close()
+    with open(stem + '.json') as f:
+        assert json.load(f) == []
+    assert read_jsonl(stem + '.jsonl') == []
+    assert not [name for name in os.listdir(tmp_path) if name.endswith('.part')]
@@ -0,0 +1,77 @@
+from datetime import datetime, timezone
+from dates import LOCAL_TIMEZONE
+from store import EventStore, weekend
+
+
+def eventbrite_event(url, start):
+    # As iter_eventbrite_details leaves it: the place is top-level and has no City
+    return {'Title': 'Jazz night', 'Description': None, 'Date': None, 'Location': 'Casa del Popolo', 'Latitude': 45.52, 'Longitude': -73.58,
+            'EventUrl': url, 'StartDateTime': start}
+
+
+def facebook_event(url, start, city):
+    return {'Title': 'Vernissage', 'Description': None, 'Date': None, 'EventUrl': url, 'StartDateTime': start,
+            'Location': {'Location': 'Galerie', 'City': city, 'CountryCode': 'ca', 'Latitude': 45.5, 'Longitude': -73.57}}
+
+
+def test_eventbrite_events_take_the_crawled_city(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), city='Montreal')
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/jazz-night-1', '2024-03-09T21:00:00-05:00'))
+    store.write(facebook_event('https://www.facebook.com/events/2/', '2024-03-09T20:00:00-05:00', 'Laval'))
+    store.flush()
+
+    start, end = datetime(2024, 3, 9, tzinfo=LOCAL_TIMEZONE), datetime(2024, 3, 11, tzinfo=LOCAL_TIMEZONE)
+    assert [event['Title'] for event in store.between(start, end, city='Montreal')] == ['Jazz night']
+    assert [event['Title'] for event in store.between(start, end, city='Laval')] == ['Vernissage']
+    store.close()
+
+
+def test_start_times_compare_across_offsets(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'))
+    # 01:30Z on Saturday is still Friday evening in Montreal
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/late-friday-1', '2024-03-09T01:30:00Z'))
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/saturday-2', '2024-03-09T20:00:00-05:00'))
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/sunday-3', '2024-03-10T23:30:00-04:00'))
+    store.flush()
+
+    start, end = weekend(datetime(2024, 3, 6, 12, 0, tzinfo=LOCAL_TIMEZONE))
+    assert [event['EventUrl'] for event in store.between(start, end)] == [
+        'https://www.eventbrite.ca/e/saturday-2',
+        'https://www.eventbrite.ca/e/sunday-3',
+    ]
+    # Naive bounds are local time, aware ones may be in any zone
+    assert len(store.between(datetime(2024, 3, 9), datetime(2024, 3, 11))) == 2
+    assert len(store.between(datetime(2024, 3, 9, 1, tzinfo=timezone.utc), datetime(2024, 3, 9, 2, tzinfo=timezone.utc))) == 1
+    store.close()
+
+
+def test_upsert_keeps_one_row_per_url(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), batch_size=1)
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/jazz-night-1?aff=ebdssbdestsearch', '2024-03-09T21:00:00-05:00'))
+    store.write({**eventbrite_event('https://www.eventbrite.ca/e/jazz-night-1', '2024-03-09T22:00:00-05:00'), 'Title': 'Jazz night (late show)'})
+    # Events without a URL cannot be keyed and are left out
+    store.write({'Title': 'No link'})
+    store.close()
+
+    store = EventStore(str(tmp_path / 'events.db'))
+    events = store.between(datetime(2024, 3, 1), datetime(2024, 4, 1))
+    assert [(event['Title'], event['StartDateTime']) for event in events] == [('Jazz night (late show)', '2024-03-09T22:00:00-05:00')]
+    store.close()
+
+
+def test_between_filters_by_source_and_area(tmp_path):
+    store = EventStore(str(tmp_path / 'events.db'), city='Montreal')
+    store.write(eventbrite_event('https://www.eventbrite.ca/e/jazz-night-1', '2024-03-09T21:00:00-05:00'))
+    store.write(facebook_event('https://www.facebook.com/events/2/', '2024-03-09T20:00:00-05:00', 'Montreal'))
+    store.write(facebook_event('https://www.facebook.com/events/3/', '2024-03-16T20:00:00-04:00', 'Montreal'))
+    store.flush()
+
+    start, end = datetime(2024, 3, 9), datetime(2024, 3, 10)
+    assert [event['Title'] for event in store.between(start, end)] == ['Vernissage', 'Jazz night']
+    assert [event['Title'] for event in store.between(start, end, source='eventbrite')] == ['Jazz night']
+    assert [event['Title'] for event in store.between(start, end, source='facebook')] == ['Vernissage']
+    # Both are within 2 km of the Plateau, the second Facebook event is a week later
+    assert len(store.near(45.51, -73.575, 2000, start, end)) == 2
+    assert len(store.near(45.51, -73.575, 2000)) == 3
+    assert store.near(45.6, -73.575, 2000) == []
+    store.close()
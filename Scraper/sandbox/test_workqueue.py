@@ -0,0 +1,77 @@
+import pytest
+from workqueue import SQLiteBroker, open_broker
+
+UNITS = [
+    {'source': 'Eventbrite', 'city': 'montreal', 'first_page': 1, 'last_page': 5},
+    {'source': 'Eventbrite', 'city': 'montreal', 'first_page': 6, 'last_page': 10},
+    {'source': 'Facebook', 'city': 'montreal', 'first_page': None, 'last_page': None},
+]
+
+
+def broker(tmp_path, **options):
+    return SQLiteBroker(str(tmp_path / 'queue.db'), **options)
+
+
+def test_units_are_added_once(tmp_path):
+    queue = broker(tmp_path)
+    assert queue.add(UNITS) == 3
+    # Unpaged units too, although their page columns are NULL
+    assert queue.add(UNITS) == 0
+    assert queue.counts() == {'pending': 3}
+
+
+def test_lease_complete(tmp_path):
+    queue = broker(tmp_path)
+    queue.add(UNITS)
+    leased = [queue.lease('worker-1') for _ in UNITS]
+    assert [unit['first_page'] for unit in leased] == [1, 6, None]
+    assert queue.lease('worker-1') is None
+
+    assert queue.complete(leased[0]['id'], 'worker-1', 'part-1.jsonl')
+    # Only the worker holding the lease can end it
+    assert not queue.complete(leased[1]['id'], 'worker-2', 'part-2.jsonl')
+    assert queue.counts() == {'done': 1, 'leased': 2}
+    assert queue.results() == ['part-1.jsonl']
+
+
+def test_expired_lease_goes_to_another_worker(tmp_path):
+    queue = broker(tmp_path, lease_seconds=-1)
+    queue.add(UNITS[:1])
+    first = queue.lease('worker-1')
+    second = queue.lease('worker-2')
+    assert second['id'] == first['id']
+    assert second['attempts'] == 2
+    # The first worker lost its lease and can no longer report on the unit
+    assert not queue.heartbeat(first['id'], 'worker-1')
+    assert not queue.complete(first['id'], 'worker-1', 'stale.jsonl')
+    assert queue.complete(second['id'], 'worker-2', 'part-1.jsonl')
+
+
+def test_expired_leases_stop_at_max_attempts(tmp_path):
+    queue = broker(tmp_path, lease_seconds=-1, max_attempts=2)
+    queue.add(UNITS[:1])
+    assert queue.lease('worker-1')['attempts'] == 1
+    assert queue.lease('worker-2')['attempts'] == 2
+    assert queue.lease('worker-3') is None
+    assert queue.counts() == {'failed': 1}
+    assert queue.failures()[0]['error'] == 'lease expired'
+
+
+def test_failed_units_are_retried_up_to_max_attempts(tmp_path):
+    queue = broker(tmp_path, max_attempts=2)
+    queue.add(UNITS[:1])
+    unit = queue.lease('worker-1')
+    assert queue.fail(unit['id'], 'worker-1', 'TimeoutException')
+    assert queue.counts() == {'pending': 1}
+
+    unit = queue.lease('worker-1')
+    assert queue.fail(unit['id'], 'worker-1', 'TimeoutException')
+    assert queue.counts() == {'failed': 1}
+    assert queue.lease('worker-1') is None
+    assert queue.failures()[0]['error'] == 'TimeoutException'
+
+
+def test_open_broker(tmp_path):
+    assert isinstance(open_broker(f"sqlite://{tmp_path / 'queue.db'}"), SQLiteBroker)
+    with pytest.raises(ValueError):
+        open_broker('redis://localhost')
@@ -0,0 +1,125 @@
+import threading
+import time
+from selenium.common.exceptions import TimeoutException
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+from metrics import metrics
+
+REQUIRED_TIMEOUT = 10
+OPTIONAL_TIMEOUT = 0.5  # many pages simply don't have these
+POLL = 0.1
+
+# The detail-page elements the parsers read, as CSS selectors. The title can
+# also come from the JSON-LD block, so either one satisfies the wait.
+JSONLD = 'script[type="application/ld+json"]'
+FACEBOOK_EVENT_REQUIRED = {'Title': f'span.x1lliihq.x6ikm8r.x10wlt62.x1n2onr6, {JSONLD}'}
+FACEBOOK_EVENT_OPTIONAL = {
+    'Date': 'div.x1e56ztr.x1xmf6yo',
+    'Description': 'div.xdj266r.x11i5rnm.xat24cr.x1mh8g0r.x1vvkbs',
+}
+EVENTBRITE_EVENT_REQUIRED = {'Title': f'h1.event-title, {JSONLD}'}
+EVENTBRITE_EVENT_OPTIONAL = {
+    'Date': 'span.date-info__full-datetime',
+    'Location': 'p.location-info__address-text',
+}
+
+
+class LatencyLog:
+    """Per-page load and wait times, grouped by kind of page.
+
+    Every record also feeds the run metrics (pages_fetched, page_load and
+    field_wait histograms, field_missing).
+    """
+
+    def __init__(self):
+        self.pages = []
+        self._lock = threading.Lock()
+
+    def record(self, kind, url, load, waits):
+        with self._lock:
+            self.pages.append({'kind': kind, 'url': url, 'load': load, 'waits': waits})
+        metrics.inc('pages_fetched', kind=kind)
+        metrics.observe('page_load', load, kind=kind)
+        for field, (found, seconds) in waits.items():
+            metrics.observe('field_wait', seconds, kind=kind, field=field)
+            if not found:
+                metrics.inc('field_missing', kind=kind, field=field)
+
+    def summary(self):
+        # -> {kind: {'pages', 'load_mean', 'load_max', 'fields': {name: {'mean', 'max', 'missing'}}}}
+        kinds = {}
+        for page in self.pages:
+            kinds.setdefault(page['kind'], []).append(page)
+        summary = {}
+        for kind, pages in kinds.items():
+            loads = [page['load'] for page in pages]
+            fields = {}
+            for page in pages:
+                for name, (found, seconds) in page['waits'].items():
+                    field = fields.setdefault(name, {'times': [], 'missing': 0})
+                    field['times'].append(seconds)
+                    field['missing'] += not found
+            summary[kind] = {
+                'pages': len(pages),
+                'load_mean': sum(loads) / len(loads),
+                'load_max': max(loads),
+                'fields': {
+                    name: {'mean': sum(field['times']) / len(field['times']), 'max': max(field['times']), 'missing': field['missing']}
+                    for name, field in fields.items()
+                },
+            }
+        return summary
+
+    def print_summary(self):
+        for kind, stats in self.summary().items():
+            print(f"{kind}: {stats['pages']} pages, load {stats['load_mean']:.2f}s avg / {stats['load_max']:.2f}s max")
+            for name, field in stats['fields'].items():
+                print(f"    wait {name}: {field['mean']:.2f}s avg / {field['max']:.2f}s max, missing on {field['missing']}")
+
+
+class WaitPolicy:
+    """Explicit waits for the elements a page is scraped for.
+
+    `required` and `optional` map field names to CSS selectors. Required
+    fields get a long timeout; optional ones only a short one, and only once
+    the required ones showed up, so a missing optional field costs at most
+    optional_timeout. Drivers keep a zero implicit wait, so these are the
+    only waits. Every load() is recorded in `log` under `kind`.
+    """
+
+    def __init__(self, kind, required, optional=None, log=None, required_timeout=REQUIRED_TIMEOUT, optional_timeout=OPTIONAL_TIMEOUT, poll=POLL):
+        self.kind = kind
+        self.required = required
+        self.optional = optional or {}
+        self.log = log
+        self.required_timeout = required_timeout
+        self.optional_timeout = optional_timeout
+        self.poll = poll
+
+    def _wait_for(self, driver, selector, timeout):
+        started = time.perf_counter()
+        try:
+            WebDriverWait(driver, timeout, poll_frequency=self.poll).until(EC.presence_of_element_located((By.CSS_SELECTOR, selector)))
+            found = True
+        except TimeoutException:
+            found = False
+        return found, time.perf_counter() - started
+
+    def wait(self, driver):
+        # -> {field: (found, seconds waited)}
+        waits = {name: self._wait_for(driver, selector, self.required_timeout) for name, selector in self.required.items()}
+        if all(found for found, _ in waits.values()):
+            for name, selector in self.optional.items():
+                waits[name] = self._wait_for(driver, selector, self.optional_timeout)
+        return waits
+
+    def load(self, driver, url):
+        # driver.get(url) and wait; -> True when every required field is there
+        started = time.perf_counter()
+        driver.get(url)
+        load = time.perf_counter() - started
+        waits = self.wait(driver)
+        if self.log is not None:
+            self.log.record(self.kind, url, load, waits)
+        return all(waits[name][0] for name in self.required)
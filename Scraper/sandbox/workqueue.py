@@ -0,0 +1,132 @@
+import sqlite3
+import time
+
+QUEUE_FILE = 'crawl_queue.db'
+LEASE_SECONDS = 300
+MAX_ATTEMPTS = 3
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS units (
+    id INTEGER PRIMARY KEY,
+    source TEXT NOT NULL,
+    city TEXT NOT NULL,
+    first_page INTEGER,
+    last_page INTEGER,
+    state TEXT NOT NULL DEFAULT 'pending',
+    worker TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    result TEXT
+);
+-- Page ranges are NULL for units that are not paged, and NULLs never collide in a plain UNIQUE
+CREATE UNIQUE INDEX IF NOT EXISTS idx_units_unit ON units(source, city, ifnull(first_page, 0), ifnull(last_page, 0));
+CREATE INDEX IF NOT EXISTS idx_units_state ON units(state, lease_expires);
+'''
+
+UNIT_COLUMNS = ('id', 'source', 'city', 'first_page', 'last_page', 'attempts')
+
+
+class SQLiteBroker:
+    """Durable queue of crawl units in one SQLite file, shared by local processes.
+
+    A unit is a (source, city, first_page, last_page) slice of the crawl.
+    lease() hands it to one worker for lease_seconds; the worker keeps it with
+    heartbeat() and ends it with complete() or fail(). A unit whose lease ran
+    out (the worker died or hung) is leased again, up to max_attempts times in
+    all, after which it is parked as 'failed'.
+    """
+
+    def __init__(self, path=QUEUE_FILE, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        # Autocommit, with explicit BEGIN IMMEDIATE where a read decides a write
+        self.connection = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+
+    def add(self, units):
+        # units: dicts with source, city, first_page, last_page; -> how many were new
+        before = self.connection.total_changes
+        self.connection.execute('BEGIN IMMEDIATE')
+        self.connection.executemany(
+            'INSERT OR IGNORE INTO units (source, city, first_page, last_page) VALUES (:source, :city, :first_page, :last_page)',
+            units,
+        )
+        self.connection.execute('COMMIT')
+        return self.connection.total_changes - before
+
+    def lease(self, worker):
+        # -> the next unit (a dict of UNIT_COLUMNS), or None when nothing is available right now
+        now = time.time()
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            self.connection.execute(
+                "UPDATE units SET state = 'failed', worker = NULL, lease_expires = NULL, error = coalesce(error, 'lease expired') "
+                "WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, self.max_attempts),
+            )
+            row = self.connection.execute(
+                f"SELECT {', '.join(UNIT_COLUMNS)} FROM units "
+                "WHERE state = 'pending' OR (state = 'leased' AND lease_expires < ?) ORDER BY id LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE units SET state = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 WHERE id = ?",
+                    (worker, now + self.lease_seconds, row[0]),
+                )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        if row is None:
+            return None
+        unit = dict(zip(UNIT_COLUMNS, row))
+        unit['attempts'] += 1
+        return unit
+
+    def _update_own(self, sql, params, unit_id, worker):
+        # -> False when the lease is no longer this worker's
+        cursor = self.connection.execute(sql + " WHERE id = ? AND worker = ? AND state = 'leased'", (*params, unit_id, worker))
+        return cursor.rowcount == 1
+
+    def heartbeat(self, unit_id, worker):
+        return self._update_own('UPDATE units SET lease_expires = ?', (time.time() + self.lease_seconds,), unit_id, worker)
+
+    def complete(self, unit_id, worker, result):
+        return self._update_own("UPDATE units SET state = 'done', lease_expires = NULL, error = NULL, result = ?", (result,), unit_id, worker)
+
+    def fail(self, unit_id, worker, error):
+        return self._update_own(
+            "UPDATE units SET state = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, worker = NULL, lease_expires = NULL, error = ?",
+            (self.max_attempts, error), unit_id, worker,
+        )
+
+    def counts(self):
+        # -> {state: number of units}
+        return dict(self.connection.execute('SELECT state, count(*) FROM units GROUP BY state'))
+
+    def results(self):
+        # Result locations of the finished units, in unit order
+        return [result for (result,) in self.connection.execute("SELECT result FROM units WHERE state = 'done' ORDER BY id")]
+
+    def failures(self):
+        return [dict(zip(UNIT_COLUMNS + ('error',), row)) for row in self.connection.execute(f"SELECT {', '.join(UNIT_COLUMNS)}, error FROM units WHERE state = 'failed' ORDER BY id")]
+
+    def close(self):
+        self.connection.close()
+
+
+# Other brokers (e.g. one on a shared database or message queue, for workers on
+# several machines) only need the methods above and an entry here
+BROKERS = {'sqlite': SQLiteBroker}
+
+
+def open_broker(url=QUEUE_FILE, **options):
+    # 'sqlite://crawl_queue.db', or a bare path for the local SQLite queue
+    scheme, location = url.split('://', 1) if '://' in url else ('sqlite', url)
+    if scheme not in BROKERS:
+        raise ValueError(f"Unknown work queue broker: {scheme}")
+    return BROKERS[scheme](location, **options)